@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -115,6 +117,8 @@ if os.getenv("USE_SQLITE") == "1":
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # The background rendition thread writes concurrently with requests
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
         }
     }
 else:
@@ -129,6 +133,40 @@ else:
         }
     }
 
+# Cache shared by every worker process (throttling, API responses, config).
+# Redis when REDIS_URL is set; otherwise a file-based cache that needs no services.
+# The test runner gets a private in-memory cache, so tests that clear it never
+# touch the developer's cache (or flush a shared Redis database).
+TESTING = sys.argv[1:2] == ["test"]
+if TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "trades-cms-tests",
+        }
+    }
+elif os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "trades-cms-cache")),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Hard cap for the legacy unpaginated lists (/api/services/, /api/projects/)
+API_MAX_LIST_RESULTS = int(os.getenv("API_MAX_LIST_RESULTS", 200))
+
+# Seconds a cached public API response may be served (invalidated earlier by signals)
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 300))
+
 # CORS (allow your web app origin)
 if DEBUG:
     # Dev-friendly CORS/CSRF settings; restrict in production
@@ -163,9 +201,27 @@ if os.getenv("USE_S3") == "1":
     AWS_S3_ADDRESSING_STYLE = "virtual"
     AWS_DEFAULT_ACL = None
 
+# Renditions pre-generated for the API (hero/gallery + srcset widths)
+RENDITION_SPECS = [
+    "width-1200|format-webp",
+    "width-800|format-webp",
+    "width-480|format-webp",
+]
+# Process pool size used by `manage.py prewarm_renditions`
+RENDITION_WORKERS = int(os.getenv("RENDITION_WORKERS", 2))
+
+# Add an area's computed neighbors when its boundary or center changes (website.neighbors)
+GEOAREA_AUTO_NEIGHBORS = os.getenv("GEOAREA_AUTO_NEIGHBORS", "1") == "1"
+
+# Public origin of the site in sitemap URLs (website.sitemaps)
+SITEMAP_BASE_URL = os.getenv("SITEMAP_BASE_URL", "http://localhost:3000")
+
 # Wagtail API v2
 WAGTAILAPI_BASE_URL = os.getenv("WAGTAILAPI_BASE_URL", "http://localhost:8000")
 
+# Origin serving /sitemaps/<file> (this CMS), used by the sitemap index (website.sitemaps)
+SITEMAP_FILES_BASE_URL = os.getenv("SITEMAP_FILES_BASE_URL", WAGTAILAPI_BASE_URL)
+
 # Security (prod recommended)
 CSRF_COOKIE_SECURE = not DEBUG
 SESSION_COOKIE_SECURE = not DEBUG
@@ -173,7 +229,7 @@ SECURE_HSTS_SECONDS = 0 if DEBUG else 3600
 
 # DRF config
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'website.pagination.LimitPageNumberPagination',
     'PAGE_SIZE': 24,
     'DEFAULT_THROTTLE_RATES': {
         'leads': '10/hour',
@@ -22,6 +22,7 @@ from wagtail.documents import urls as wagtaildocs_urls
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.images import urls as wagtailimages_urls
 from wagtail import urls as wagtail_urls
+from website.sitemaps import sitemap_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -30,6 +31,8 @@ urlpatterns = [
     path("documents/", include(wagtaildocs_urls)),
     path("images/", include(wagtailimages_urls)),
     path("cms/", include(wagtailadmin_urls)),  # Wagtail admin at /cms
+    path("sitemap.xml", sitemap_file, name="sitemap-index"),
+    path("sitemaps/<str:name>", sitemap_file, name="sitemap-file"),
     path("", include(wagtail_urls)),  # Optional public pages routing
 ]
 
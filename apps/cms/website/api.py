@@ -7,6 +7,7 @@ from .views import (
     ServiceAreaViewSet,
     LeadViewSet,
     ConfigViewSet,
+    HomeView,
     config_view,
 )
 
@@ -36,11 +37,15 @@ if HAS_LOCAL and ServiceCoverageViewSet is not None:
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("home/", HomeView.as_view(), name="home"),
 ]
 
 # Add coverage detail endpoint if ServiceCoverage exists
 if HAS_LOCAL:
-    from .views import coverage_detail
+    from .views import coverage_detail, LandingView
     urlpatterns.append(
         path("coverage/<str:service>/<str:city>/", coverage_detail, name="coverage-detail")
     )
+    urlpatterns.append(
+        path("landing/<str:service>/<str:city>/", LandingView.as_view(), name="landing")
+    )
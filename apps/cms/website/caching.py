@@ -0,0 +1,136 @@
+"""Shared-cache helpers for the public API.
+
+Responses are grouped into namespaces ("services", "projects", ...). Each
+namespace has a version stored in the shared cache; cache keys embed the
+versions a response depends on, so bumping a namespace from a signal handler
+invalidates every cached response built from it, in every worker process.
+
+Versions are millisecond timestamps of the last change rather than counters,
+so a version lost to cache eviction never comes back with an old value.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+VERSION_KEY = 'api:ns:%s'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_versions(*namespaces):
+    """Current version of each namespace, initialising unknown ones."""
+    keys = [VERSION_KEY % ns for ns in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _now_ms(), None)
+            found[key] = cache.get(key) or _now_ms()
+    return [found[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under the given namespaces."""
+    now = _now_ms()
+    for ns in namespaces:
+        key = VERSION_KEY % ns
+        current = cache.get(key) or 0
+        cache.set(key, max(now, current + 1), None)
+
+
+def request_fingerprint(request):
+    """Digest of host + path + sorted query string."""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = f'{request.get_host()}{request.path}?{query}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def _wants_html(request):
+    return 'text/html' in request.META.get('HTTP_ACCEPT', '') or request.GET.get('format') == 'api'
+
+
+def _request_versions(request, namespaces):
+    # etag_func and last_modified_func both need the versions; read them once
+    memo = request.__dict__.setdefault('_api_versions', {})
+    key = tuple(namespaces)
+    if key not in memo:
+        memo[key] = get_versions(*namespaces)
+    return memo[key]
+
+
+def conditional(*namespaces):
+    """``condition`` decorator deriving ETag/Last-Modified from namespace versions.
+
+    The ETag is strong: a given version of the namespaces plus the same URL and
+    representation always renders the same bytes. Matching requests get a 304
+    before any view code or serializer runs.
+    """
+    def etag(request, *args, **kwargs):
+        versions = '.'.join(str(v) for v in _request_versions(request, namespaces))
+        kind = 'html' if _wants_html(request) else 'json'
+        return f'{versions}-{kind}-{request_fingerprint(request)[:16]}'
+
+    def last_modified(request, *args, **kwargs):
+        newest = max(_request_versions(request, namespaces))
+        return datetime.fromtimestamp(newest / 1000, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match/If-Modified-Since from ``cache_namespaces`` versions."""
+
+    cache_namespaces = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.cache_namespaces or request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        parent = super().dispatch
+        view = conditional(*self.cache_namespaces)(lambda req, *a, **kw: parent(req, *a, **kw))
+        return view(request, *args, **kwargs)
+
+
+class CachedResponseMixin:
+    """Read-through cache of full JSON responses for read-only viewsets.
+
+    ``cache_namespaces`` lists the namespaces the response is built from; the
+    key combines their versions with the request path and query string. The
+    browsable API (HTML) is never cached.
+    """
+
+    cache_namespaces = ()
+    cache_timeout = None
+
+    def _response_cache_key(self, request):
+        if request.method not in ('GET', 'HEAD') or not self.cache_namespaces or _wants_html(request):
+            return None
+        versions = '.'.join(str(v) for v in _request_versions(request, self.cache_namespaces))
+        return f'api:resp:{versions}:{request_fingerprint(request)}'
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self._response_cache_key(request)
+        if key:
+            hit = cache.get(key)
+            if hit is not None:
+                content, content_type = hit
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if key and response.status_code == 200:
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            content_type = response.get('Content-Type', '')
+            if content_type.startswith('application/json'):
+                timeout = self.cache_timeout or getattr(settings, 'API_CACHE_TIMEOUT', 300)
+                cache.set(key, (response.content, content_type), timeout)
+                response['X-Cache'] = 'MISS'
+        return response
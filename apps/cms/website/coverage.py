@@ -0,0 +1,151 @@
+"""Bulk generation of ServiceCoverage rows for service × GeoArea combinations.
+
+Rows are built in memory from a content template (``{service}`` and
+``{city}`` placeholders), their quality metrics are computed up front (the
+same rules as ``ServiceCoverage.refresh_quality``, from the template text
+instead of bound blocks), and inserted with ``bulk_create``. Pairs that
+already exist are read per batch and left alone; if a concurrent writer
+creates one in between, the batch is rolled back and retried. Each batch
+commits on its own, and the returned count is exactly the rows inserted.
+"""
+import copy
+import json
+from itertools import islice, product
+
+from django.db import IntegrityError, transaction
+
+from . import caching, sitemaps
+from .streams import count_words, walk
+
+DEFAULT_TEMPLATE = {
+    "unique_intro": "<p>{service} in {city}: local crews, upfront pricing and a clean job site.</p>",
+    "pain_points_local": [
+        {"type": "point", "value": {"title": "Fast scheduling in {city}", "text": "<p>Most {city} visits are booked within the week.</p>"}},
+        {"type": "point", "value": {"title": "Local codes", "text": "<p>We work to the requirements that apply in {city}.</p>"}},
+    ],
+    "process_steps_local": [
+        {"type": "step", "value": {"title": "Visit", "text": "<p>We measure and review your {service} project on site.</p>"}},
+        {"type": "step", "value": {"title": "Quote", "text": "<p>A written quote for {service} in {city}.</p>"}},
+        {"type": "step", "value": {"title": "Install", "text": "<p>Installation and cleanup by our own team.</p>"}},
+    ],
+    "permits_local": [],
+    "starting_price_local": "",
+    "cta_local": "Get a {service} quote in {city}",
+}
+STREAM_FIELDS = ("pain_points_local", "process_steps_local", "permits_local")
+TEXT_FIELDS = ("unique_intro", "starting_price_local", "cta_local")
+BATCH_SIZE = 1000
+INSERT_ATTEMPTS = 3
+
+
+def load_template(path=None):
+    if not path:
+        return copy.deepcopy(DEFAULT_TEMPLATE)
+    with open(path, encoding="utf-8") as fh:
+        template = json.load(fh)
+    return {**copy.deepcopy(DEFAULT_TEMPLATE), **template}
+
+
+def _fill(value, names):
+    if isinstance(value, str):
+        return value.replace("{service}", names["service"]).replace("{city}", names["city"])
+    if isinstance(value, list):
+        return [_fill(v, names) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, names) for k, v in value.items()}
+    return value
+
+
+def quality_metrics(content, hero_media_id=None):
+    """(word_count, module_count, image_count) of filled template content."""
+    words = count_words(content.get("unique_intro"))
+    modules = images = 0
+    for field in STREAM_FIELDS:
+        found = walk(content.get(field) or [])
+        words += found.word_count
+        modules += found.module_count
+        images += found.inline_images
+    if hero_media_id:
+        images += 1
+    return words, modules, images
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _insert(chunk):
+    """Insert the rows of ``chunk`` whose pair does not exist yet; returns how many were inserted."""
+    from .models_local import ServiceCoverage
+
+    for attempt in range(INSERT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # ignore_conflicts would hide which rows were skipped (and the count), so filter first
+                existing = set(
+                    ServiceCoverage.objects.filter(
+                        service_id__in={row.service_id for row in chunk},
+                        geoarea_id__in={row.geoarea_id for row in chunk},
+                    ).values_list("service_id", "geoarea_id")
+                )
+                new = [row for row in chunk if (row.service_id, row.geoarea_id) not in existing]
+                ServiceCoverage.objects.bulk_create(new)
+                return len(new)
+        except IntegrityError:
+            # A pair was created concurrently; re-read and try again
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+
+
+def generate(services, geoareas, template=None, status="draft", batch_size=BATCH_SIZE):
+    """Create missing coverages for every (service, geoarea); returns the number created.
+
+    ``services`` are ServicePages, ``geoareas`` GeoAreas (or querysets of them).
+    """
+    from .models import Testimonial
+    from .models_local import ServiceCoverage
+
+    template = template or load_template()
+    services = [(s.pk, s.title) for s in services]
+    geoareas = [(g.pk, g.name) for g in geoareas]
+    if not services or not geoareas:
+        return 0
+    with_testimonials = set(
+        Testimonial.objects.filter(geoarea_id__in=[pk for pk, _name in geoareas])
+        .values_list("geoarea_id", flat=True).distinct()
+    )
+    hero = template.get("hero_media")
+
+    def rows():
+        for (service_id, service_name), (geoarea_id, city_name) in product(services, geoareas):
+            content = _fill({k: template.get(k) for k in STREAM_FIELDS + TEXT_FIELDS}, {
+                "service": service_name, "city": city_name,
+            })
+            words, modules, images = quality_metrics(content, hero)
+            base_ok = (
+                words >= ServiceCoverage.QUALITY_MIN_WORDS
+                and modules >= ServiceCoverage.QUALITY_MIN_MODULES
+                and images >= ServiceCoverage.QUALITY_MIN_IMAGES
+            )
+            yield ServiceCoverage(
+                service_id=service_id, geoarea_id=geoarea_id, status=status,
+                unique_intro=content["unique_intro"] or "",
+                pain_points_local=content["pain_points_local"] or [],
+                process_steps_local=content["process_steps_local"] or [],
+                permits_local=content["permits_local"] or [],
+                starting_price_local=content["starting_price_local"] or "",
+                cta_local=content["cta_local"] or "",
+                hero_media_id=hero,
+                word_count=words, module_count=modules, image_count=images,
+                quality_ok=base_ok and geoarea_id in with_testimonials,
+            )
+
+    created = sum(_insert(chunk) for chunk in _chunks(rows(), batch_size))
+    if created:
+        # bulk_create sends no post_save
+        caching.bump("coverage")
+        if status == "ready":
+            sitemaps.mark_dirty("coverage")
+    return created
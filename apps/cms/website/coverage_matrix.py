@@ -0,0 +1,106 @@
+"""Readiness of every service × GeoArea coverage in one compact payload.
+
+The grid has one row per service and one column per area (both sorted by
+id), read with a single ordered query over ``ServiceCoverage``. Each cell is
+a small bit set:
+
+* ``EXISTS`` (1): a coverage row exists
+* ``READY`` (2): its status is "ready"
+* ``QUALITY`` (4): it passes the quality thresholds
+
+so a publishable page is ``READY | QUALITY`` on top of ``EXISTS`` (7).
+Cells are sent run-length encoded (``[value, run, value, run, ...]`` in
+row-major order), or as one base64 bitmap per flag with ``encoding=bitmap``.
+Built payloads are kept in the shared cache under the "coverage" namespace
+version, so any coverage, service or area change rebuilds them.
+"""
+import base64
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import get_versions
+
+EXISTS = 1
+READY = 2
+QUALITY = 4
+FLAGS = (("exists", EXISTS), ("ready", READY), ("quality_ok", QUALITY))
+ENCODINGS = ("rle", "bitmap")
+
+
+def rle(cells):
+    """``[value, run, value, run, ...]`` for a flat cell sequence."""
+    out = []
+    prev, run = None, 0
+    for value in cells:
+        if value == prev:
+            run += 1
+            continue
+        if run:
+            out += (prev, run)
+        prev, run = value, 1
+    if run:
+        out += (prev, run)
+    return out
+
+
+def unrle(pairs):
+    cells = []
+    for i in range(0, len(pairs), 2):
+        cells += [pairs[i]] * pairs[i + 1]
+    return cells
+
+
+def bitmap(cells, flag):
+    """Base64 of the cells having ``flag``; bit ``i % 8`` of byte ``i // 8`` is cell ``i``."""
+    packed = bytearray((len(cells) + 7) // 8)
+    for i, value in enumerate(cells):
+        if value & flag:
+            packed[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(packed)).decode("ascii")
+
+
+def build(encoding="rle"):
+    """Uncached matrix payload (one query)."""
+    from .models_local import ServiceCoverage
+
+    rows = (
+        ServiceCoverage.objects.order_by("service_id", "geoarea_id")
+        .values_list("service_id", "service__slug", "geoarea_id", "geoarea__slug", "status", "quality_ok")
+    )
+    services, areas, found = {}, {}, {}
+    for service_id, service_slug, geoarea_id, geoarea_slug, status, quality_ok in rows.iterator(chunk_size=5000):
+        services[service_id] = service_slug
+        areas[geoarea_id] = geoarea_slug
+        found[(service_id, geoarea_id)] = EXISTS | (READY if status == "ready" else 0) | (QUALITY if quality_ok else 0)
+
+    service_ids = list(services)  # already ordered by the query
+    area_ids = sorted(areas)
+    cells = [found.get((s, a), 0) for s in service_ids for a in area_ids]
+    payload = {
+        "services": [{"id": pk, "slug": services[pk]} for pk in service_ids],
+        "geoareas": [{"id": pk, "slug": areas[pk]} for pk in area_ids],
+        "flags": {name: bit for name, bit in FLAGS},
+        "encoding": encoding,
+        "counts": {
+            "coverages": len(found),
+            "ready": sum(1 for v in found.values() if v & READY),
+            "publishable": sum(1 for v in found.values() if v & (READY | QUALITY) == READY | QUALITY),
+        },
+    }
+    if encoding == "bitmap":
+        payload["bitmaps"] = {name: bitmap(cells, bit) for name, bit in FLAGS}
+    else:
+        payload["cells"] = rle(cells)
+    return payload
+
+
+def get_matrix(encoding="rle"):
+    """Matrix payload, cached per "coverage" namespace version."""
+    (version,) = get_versions("coverage")
+    key = f"coverage:matrix:{version}:{encoding}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build(encoding)
+        cache.set(key, payload, getattr(settings, "API_CACHE_TIMEOUT", 300))
+    return payload
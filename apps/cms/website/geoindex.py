@@ -0,0 +1,134 @@
+"""In-process spatial index over GeoArea centers.
+
+Centers are projected onto the unit sphere (x, y, z) and stored in a KD-tree,
+so straight-line (chord) distance orders points exactly like great-circle
+distance and nothing special happens at the antimeridian. Plain Python, no
+PostGIS: works the same on the SQLite and Postgres configurations.
+
+The tree is built lazily from the table and tagged with the shared
+"geoareas" namespace version (bumped on every GeoArea save/delete), so each
+worker rebuilds its copy on the first query after a change.
+"""
+import heapq
+import math
+import threading
+
+from .caching import get_versions
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_xyz(lat, lng):
+    phi, lam = math.radians(lat), math.radians(lng)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class KDTree:
+    """Static 3-d tree; ``nearest`` answers k-nearest and radius-bounded queries."""
+
+    def __init__(self, points):
+        # points: [((x, y, z), item)]
+        self._tree = self._build(list(points), 0)
+        self.size = len(points)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (
+            points[mid][0],
+            points[mid][1],
+            axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, xyz, k, max_chord=None):
+        """Up to ``k`` ``(chord, item)`` pairs closest to ``xyz``, nearest first."""
+        if k <= 0 or self._tree is None:
+            return []
+        bound = math.inf if max_chord is None else max_chord * max_chord
+        heap = []  # max-heap on squared distance: (-d2, tiebreak, item)
+        qx, qy, qz = xyz
+        counter = 0
+
+        def visit(node):
+            nonlocal bound, counter
+            if node is None:
+                return
+            point, item, axis, left, right = node
+            dx, dy, dz = point[0] - qx, point[1] - qy, point[2] - qz
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 <= bound:
+                counter += 1
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, counter, item))
+                else:
+                    heapq.heappushpop(heap, (-d2, counter, item))
+                if len(heap) == k:
+                    bound = min(bound, -heap[0][0])
+            delta = xyz[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            visit(near)
+            if delta * delta <= bound:
+                visit(far)
+
+        visit(self._tree)
+        return [(math.sqrt(-d2), item) for d2, _c, item in sorted(heap, reverse=True)]
+
+
+_index = None  # (version, KDTree)
+_lock = threading.Lock()
+
+
+def _build_index():
+    from .models_local import GeoArea
+
+    rows = (
+        GeoArea.objects.exclude(center_lat=None).exclude(center_lng=None)
+        .values_list("id", "slug", "name", "type", "center_lat", "center_lng")
+    )
+    points = []
+    for pk, slug, name, type_, lat, lng in rows.iterator():
+        lat, lng = float(lat), float(lng)
+        item = {"id": pk, "slug": slug, "name": name, "type": type_, "center_lat": lat, "center_lng": lng}
+        points.append((to_xyz(lat, lng), item))
+    return KDTree(points)
+
+
+def get_index():
+    global _index
+    (version,) = get_versions("geoareas")
+    entry = _index
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    tree = _build_index()
+    with _lock:
+        _index = (version, tree)
+    return tree
+
+
+def nearby(lat, lng, limit=10, radius_km=None):
+    """GeoAreas closest to a coordinate as dicts with ``distance_km``, nearest first."""
+    max_chord = km_to_chord(radius_km) if radius_km else None
+    results = []
+    for chord, item in get_index().nearest(to_xyz(lat, lng), limit, max_chord):
+        results.append(dict(item, distance_km=round(chord_to_km(chord), 3)))
+    return results
+
+
+def clear():
+    global _index
+    with _lock:
+        _index = None
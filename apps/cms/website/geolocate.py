@@ -0,0 +1,271 @@
+"""Point-in-polygon resolution of coordinates to GeoAreas.
+
+``GeoArea.geojson`` (Polygon / MultiPolygon, bare or wrapped in a Feature or
+FeatureCollection) is parsed once into flat ``array('d')`` rings. Area
+bounding boxes go into a bulk-loaded (Sort-Tile-Recursive) R-tree; a lookup
+walks the tree to the few boxes containing the point and only runs exact
+ray casting on those.
+
+Like ``website.geoindex``, the parsed index lives in process memory and is
+tagged with the shared "geoareas" namespace version, so a GeoArea save or
+delete in any process triggers a rebuild on the next lookup.
+"""
+import json
+import logging
+import math
+import threading
+from array import array
+
+from .caching import get_versions
+
+logger = logging.getLogger(__name__)
+
+NODE_CAPACITY = 16
+
+
+# ---- GeoJSON parsing ----
+# Editors paste geojson by hand: anything that is not the expected shape is skipped
+def _items(value):
+    return value if isinstance(value, list) else []
+
+
+def _geometries(obj):
+    if not isinstance(obj, dict):
+        return
+    kind = obj.get("type")
+    if kind == "FeatureCollection":
+        for feature in _items(obj.get("features")):
+            yield from _geometries(feature)
+    elif kind == "Feature":
+        yield from _geometries(obj.get("geometry"))
+    elif kind == "GeometryCollection":
+        for geometry in _items(obj.get("geometries")):
+            yield from _geometries(geometry)
+    elif kind == "Polygon":
+        yield _items(obj.get("coordinates"))
+    elif kind == "MultiPolygon":
+        yield from (_items(polygon) for polygon in _items(obj.get("coordinates")))
+
+
+def _ring(points):
+    flat = array("d")
+    for point in _items(points):
+        try:
+            x, y = float(point[0]), float(point[1])
+        except (TypeError, ValueError, KeyError, IndexError):
+            continue
+        if math.isfinite(x) and math.isfinite(y):
+            flat.append(x)
+            flat.append(y)
+    return flat
+
+
+def parse_polygons(geojson):
+    """Polygons as lists of rings; a ring is ``array('d', [lng0, lat0, lng1, lat1, ...])``.
+
+    Raises ``ValueError`` for text that is not JSON; malformed members are skipped.
+    """
+    if not geojson:
+        return []
+    data = json.loads(geojson) if isinstance(geojson, str) else geojson
+    polygons = []
+    for rings in _geometries(data):
+        parsed = [flat for flat in map(_ring, rings) if len(flat) >= 6]
+        if parsed:
+            polygons.append(parsed)
+    return polygons
+
+
+def polygons_bbox(polygons):
+    xs = [ring[i] for polygon in polygons for ring in polygon[:1] for i in range(0, len(ring), 2)]
+    ys = [ring[i] for polygon in polygons for ring in polygon[:1] for i in range(1, len(ring), 2)]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+# ---- Exact test ----
+def ring_contains(ring, x, y):
+    """Even-odd ray casting against a flat ring."""
+    inside = False
+    n = len(ring)
+    x1, y1 = ring[n - 2], ring[n - 1]
+    for i in range(0, n, 2):
+        x2, y2 = ring[i], ring[i + 1]
+        if (y2 > y) != (y1 > y) and x < (x1 - x2) * (y - y2) / (y1 - y2) + x2:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def polygons_contain(polygons, x, y):
+    for outer, *holes in polygons:
+        if ring_contains(outer, x, y) and not any(ring_contains(hole, x, y) for hole in holes):
+            return True
+    return False
+
+
+# ---- R-tree ----
+def _union(boxes):
+    return (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes),
+    )
+
+
+class RTree:
+    """Static R-tree over ``(bbox, item)`` entries, bulk-loaded with STR."""
+
+    def __init__(self, entries, capacity=NODE_CAPACITY):
+        self.capacity = capacity
+        # node: (bbox, children, is_leaf); leaf children are (bbox, item)
+        level = [(bbox, item) for bbox, item in entries]
+        leaf = True
+        self.root = None
+        if not level:
+            return
+        while True:
+            nodes = [(_union([c[0] for c in group]), group, leaf) for group in self._pack(level)]
+            if len(nodes) == 1:
+                self.root = nodes[0]
+                return
+            level, leaf = nodes, False
+
+    def _pack(self, level):
+        cap = self.capacity
+        slices = max(1, math.ceil(math.sqrt(math.ceil(len(level) / cap))))
+        per_slice = slices * cap
+        level = sorted(level, key=lambda e: e[0][0] + e[0][2])
+        for start in range(0, len(level), per_slice):
+            column = sorted(level[start:start + per_slice], key=lambda e: e[0][1] + e[0][3])
+            for i in range(0, len(column), cap):
+                yield column[i:i + cap]
+
+    def query_point(self, x, y):
+        """Items whose bounding box contains the point."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            (minx, miny, maxx, maxy), children, leaf = stack.pop()
+            if not (minx <= x <= maxx and miny <= y <= maxy):
+                continue
+            if leaf:
+                for (bminx, bminy, bmaxx, bmaxy), item in children:
+                    if bminx <= x <= bmaxx and bminy <= y <= bmaxy:
+                        found.append(item)
+            else:
+                stack.extend(children)
+        return found
+
+    def query_bbox(self, bbox):
+        """Items whose bounding box intersects ``bbox``."""
+        if self.root is None:
+            return []
+        qminx, qminy, qmaxx, qmaxy = bbox
+        found = []
+        stack = [self.root]
+        while stack:
+            (minx, miny, maxx, maxy), children, leaf = stack.pop()
+            if maxx < qminx or minx > qmaxx or maxy < qminy or miny > qmaxy:
+                continue
+            if leaf:
+                for (bminx, bminy, bmaxx, bmaxy), item in children:
+                    if not (bmaxx < qminx or bminx > qmaxx or bmaxy < qminy or bminy > qmaxy):
+                        found.append(item)
+            else:
+                stack.extend(children)
+        return found
+
+
+# ---- Per-process index ----
+class AreaShape:
+    __slots__ = ("id", "slug", "name", "type", "parent_city_id", "polygons", "bbox", "size")
+
+    def __init__(self, pk, slug, name, type_, parent_city_id, polygons):
+        self.id, self.slug, self.name, self.type = pk, slug, name, type_
+        self.parent_city_id = parent_city_id
+        self.polygons = polygons
+        self.bbox = polygons_bbox(polygons)
+        self.size = (self.bbox[2] - self.bbox[0]) * (self.bbox[3] - self.bbox[1])
+
+    def as_dict(self):
+        return {"id": self.id, "slug": self.slug, "name": self.name, "type": self.type}
+
+
+class AreaLocator:
+    def __init__(self, shapes):
+        self.shapes = {shape.id: shape for shape in shapes}
+        self.tree = RTree([(shape.bbox, shape) for shape in shapes])
+
+    def containing(self, lat, lng):
+        """Areas whose polygons contain the point, most specific (smallest) first."""
+        hits = [s for s in self.tree.query_point(lng, lat) if polygons_contain(s.polygons, lng, lat)]
+        return sorted(hits, key=lambda s: s.size)
+
+    def resolve(self, lat, lng):
+        """``{"neighborhood": ..., "city": ...}`` for a coordinate (either may be None).
+
+        A neighborhood without its own city polygon match falls back to its
+        ``parent_city``, when that city has a shape.
+        """
+        hits = self.containing(lat, lng)
+        hood = next((s for s in hits if s.type == "neighborhood"), None)
+        city = next((s for s in hits if s.type == "city"), None)
+        if city is None and hood is not None and hood.parent_city_id:
+            city = self.shapes.get(hood.parent_city_id)
+        return {
+            "neighborhood": hood.as_dict() if hood else None,
+            "city": city.as_dict() if city else None,
+        }
+
+
+def _build_locator():
+    from .models_local import GeoArea
+
+    shapes = []
+    rows = GeoArea.objects.exclude(geojson=None).exclude(geojson="").values_list(
+        "id", "slug", "name", "type", "parent_city_id", "geojson"
+    )
+    for pk, slug, name, type_, parent_city_id, geojson in rows.iterator():
+        try:
+            polygons = parse_polygons(geojson)
+        except Exception:
+            # One bad area must not take lookups (and lead capture) down for every area
+            logger.warning("GeoArea %s has unparseable geojson", slug, exc_info=True)
+            continue
+        if polygons:
+            shapes.append(AreaShape(pk, slug, name, type_, parent_city_id, polygons))
+    return AreaLocator(shapes)
+
+
+_locator = None  # (version, AreaLocator)
+_lock = threading.Lock()
+
+
+def get_locator():
+    global _locator
+    (version,) = get_versions("geoareas")
+    entry = _locator
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    locator = _build_locator()
+    with _lock:
+        _locator = (version, locator)
+    return locator
+
+
+def resolve(lat, lng):
+    return get_locator().resolve(lat, lng)
+
+
+def locate_geoarea_id(lat, lng):
+    """Id of the most specific GeoArea containing the point, or None."""
+    found = resolve(lat, lng)
+    area = found["neighborhood"] or found["city"]
+    return area["id"] if area else None
+
+
+def clear():
+    global _locator
+    with _lock:
+        _locator = None
@@ -0,0 +1,225 @@
+"""Multi-resolution GeoArea boundaries for the map.
+
+When ``GeoArea.geojson`` changes, the boundary is simplified once per zoom
+level with Douglas-Peucker (tolerance = one 256px-tile pixel at that zoom),
+rounded to the precision that zoom can show, and stored in
+``GeoAreaGeometry``. Requests pick the stored level and at most clip it to a
+bbox, so their cost does not depend on how detailed the source geometry is.
+"""
+import hashlib
+import json
+import logging
+import math
+
+from .geolocate import parse_polygons
+
+logger = logging.getLogger(__name__)
+
+ZOOM_LEVELS = (4, 6, 8, 10, 12, 14)
+
+
+def tolerance(zoom):
+    """Degrees covered by one pixel of a 256px tile at ``zoom``."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def precision(zoom):
+    return max(2, min(6, math.ceil(-math.log10(tolerance(zoom))) + 1))
+
+
+def source_hash(geojson):
+    return hashlib.md5((geojson or "").encode("utf-8")).hexdigest()
+
+
+# ---- Simplification ----
+def _segment_distance2(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return (px - ax) ** 2 + (py - ay) ** 2
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    cx, cy = ax + t * dx, ay + t * dy
+    return (px - cx) ** 2 + (py - cy) ** 2
+
+
+def simplify_ring(ring, tol):
+    """Douglas-Peucker on a flat ``[x0, y0, x1, y1, ...]`` ring; returns ``[(x, y), ...]``."""
+    points = [(ring[i], ring[i + 1]) for i in range(0, len(ring), 2)]
+    n = len(points)
+    if n <= 4:
+        return points
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    tol2 = tol * tol
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        index, worst = None, tol2
+        for i in range(first + 1, last):
+            d2 = _segment_distance2(points[i][0], points[i][1], ax, ay, bx, by)
+            if d2 > worst:
+                index, worst = i, d2
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep, strict=True) if k]
+
+
+def _bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _rectangle(bbox):
+    x0, y0, x1, y1 = bbox
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+
+
+def simplify_polygons(polygons, zoom):
+    """Simplified, rounded MultiPolygon coordinates for one zoom level.
+
+    Rings that collapse below a triangle are dropped; if every polygon
+    collapses, the largest one is kept as its bounding rectangle so the area
+    never disappears from the map entirely.
+    """
+    tol = tolerance(zoom)
+    digits = precision(zoom)
+    result = []
+    for rings in polygons:
+        simplified = []
+        for index, ring in enumerate(rings):
+            points = simplify_ring(ring, tol)
+            points = [(round(x, digits), round(y, digits)) for x, y in points]
+            points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+            if len(points) >= 4:
+                simplified.append([list(p) for p in points])
+            elif index == 0:
+                break  # outer ring collapsed: drop the polygon with its holes
+        if simplified:
+            result.append(simplified)
+    if not result and polygons:
+        largest = max(polygons, key=lambda rings: len(rings[0]))
+        outer = largest[0]
+        bbox = _bbox([(outer[i], outer[i + 1]) for i in range(0, len(outer), 2)])
+        result.append([[[round(x, digits), round(y, digits)] for x, y in _rectangle(bbox)]])
+    return result
+
+
+def build_levels(geojson):
+    """``[(zoom, bbox, vertex_count, polygons)]`` for every stored zoom level."""
+    polygons = parse_polygons(geojson)
+    if not polygons:
+        return []
+    levels = []
+    for zoom in ZOOM_LEVELS:
+        simplified = simplify_polygons(polygons, zoom)
+        points = [p for polygon in simplified for p in polygon[0]]
+        vertices = sum(len(ring) for polygon in simplified for ring in polygon)
+        levels.append((zoom, _bbox(points), vertices, simplified))
+    return levels
+
+
+# ---- Clipping ----
+def _clip_ring(points, bbox):
+    """Sutherland-Hodgman clip of a closed ring against an axis-aligned box."""
+    x0, y0, x1, y1 = bbox
+    edges = (
+        (lambda p: p[0] >= x0, lambda a, b: (x0, a[1] + (b[1] - a[1]) * (x0 - a[0]) / (b[0] - a[0]))),
+        (lambda p: p[0] <= x1, lambda a, b: (x1, a[1] + (b[1] - a[1]) * (x1 - a[0]) / (b[0] - a[0]))),
+        (lambda p: p[1] >= y0, lambda a, b: (a[0] + (b[0] - a[0]) * (y0 - a[1]) / (b[1] - a[1]), y0)),
+        (lambda p: p[1] <= y1, lambda a, b: (a[0] + (b[0] - a[0]) * (y1 - a[1]) / (b[1] - a[1]), y1)),
+    )
+    output = [tuple(p) for p in points[:-1]]
+    for inside, intersect in edges:
+        if not output:
+            break
+        source, output = output, []
+        prev = source[-1]
+        for cur in source:
+            if inside(cur):
+                if not inside(prev):
+                    output.append(intersect(prev, cur))
+                output.append(cur)
+            elif inside(prev):
+                output.append(intersect(prev, cur))
+            prev = cur
+    if len(output) < 3:
+        return None
+    return [list(p) for p in output] + [list(output[0])]
+
+
+def clip_polygons(polygons, bbox, digits=6):
+    x0, y0, x1, y1 = bbox
+    clipped = []
+    for rings in polygons:
+        px0, py0, px1, py1 = _bbox(rings[0])
+        if px1 < x0 or px0 > x1 or py1 < y0 or py0 > y1:
+            continue
+        if x0 <= px0 and px1 <= x1 and y0 <= py0 and py1 <= y1:
+            clipped.append(rings)
+            continue
+        outer = _clip_ring(rings[0], bbox)
+        if outer is None:
+            continue
+        holes = [h for h in (_clip_ring(ring, bbox) for ring in rings[1:]) if h]
+        clipped.append([
+            [[round(x, digits), round(y, digits)] for x, y in ring] for ring in [outer] + holes
+        ])
+    return clipped
+
+
+# ---- Store ----
+def refresh(geoarea):
+    """Regenerate the stored levels of an area if its geojson changed; True if it did."""
+    from .models_local import GeoAreaGeometry
+
+    digest = source_hash(geoarea.geojson)
+    stored = set(GeoAreaGeometry.objects.filter(geoarea=geoarea).values_list("source_hash", "zoom"))
+    if stored and {h for h, _z in stored} == {digest} and len(stored) == len(ZOOM_LEVELS):
+        return False
+    try:
+        levels = build_levels(geoarea.geojson)
+    except Exception:
+        # Runs from post_save: a bad boundary must never make the save itself fail
+        logger.warning("GeoArea %s has unusable geojson; no boundary stored", geoarea.slug, exc_info=True)
+        levels = []
+    GeoAreaGeometry.objects.filter(geoarea=geoarea).delete()
+    GeoAreaGeometry.objects.bulk_create([
+        GeoAreaGeometry(
+            geoarea=geoarea, zoom=zoom, source_hash=digest,
+            min_lng=bbox[0], min_lat=bbox[1], max_lng=bbox[2], max_lat=bbox[3],
+            vertex_count=vertices, polygons=json.dumps(polygons, separators=(",", ":")),
+        )
+        for zoom, bbox, vertices, polygons in levels
+    ])
+    return bool(stored or levels)
+
+
+def level_for(zoom):
+    """Stored level to serve for a requested map zoom."""
+    if zoom is None:
+        return ZOOM_LEVELS[-1]
+    candidates = [z for z in ZOOM_LEVELS if z <= zoom]
+    return candidates[-1] if candidates else ZOOM_LEVELS[0]
+
+
+def feature(geoarea, zoom=None, bbox=None):
+    """GeoJSON Feature of the area's boundary at ``zoom``, clipped to ``bbox``; None if unknown."""
+    from .models_local import GeoAreaGeometry
+
+    level = level_for(zoom)
+    row = GeoAreaGeometry.objects.filter(geoarea=geoarea, zoom=level).first()
+    if row is None:
+        return None
+    polygons = json.loads(row.polygons)
+    if bbox is not None:
+        polygons = clip_polygons(polygons, bbox, digits=precision(level))
+    return {
+        "type": "Feature",
+        "properties": {"slug": geoarea.slug, "zoom": level},
+        "bbox": [row.min_lng, row.min_lat, row.max_lng, row.max_lat],
+        "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+    }
@@ -0,0 +1,102 @@
+"""HomePage content for /api/home/, cached block by block.
+
+The home page of the requesting site is serialized straight from the raw
+``body`` JSON (see ``website.streams``). Each top-level block's JSON is kept
+in the shared cache under its block id plus a hash of its stored value, so
+republishing the page after editing one block only recomputes that block;
+untouched blocks are served from the cache and reordering costs nothing.
+Keys also carry the "images" namespace version, so editing or deleting an
+image rebuilds the blocks on next read.
+
+Images of every block that has to be rebuilt (hero images, gallery items,
+service icons) are loaded with their renditions in one ``RenditionResolver``
+fetch. Blocks are rendered against the snapshot placeholder origin, so the
+cached JSON serves every host. A block whose images still lack a
+rendition is served but not cached, the same rule snapshots follow.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from wagtail.models import Site
+
+from .caching import get_versions
+from .models import HomePage
+from .renditions import RenditionResolver
+from .serializers import HomePageSerializer
+from .snapshots import RawJSON, SnapshotRequest
+from .streams import raw_refs, represent_raw
+
+# Bump whenever the serialized shape of a block changes
+BLOCK_VERSION = 1
+BLOCK_TIMEOUT = 60 * 60 * 24 * 7
+# Namespaces the payload is built from (cache keys / ETags)
+HOME_NAMESPACES = ("home", "images")
+
+
+def find_home(request):
+    """Live HomePage of the requesting site (its root page or first descendant), or None."""
+    site = Site.find_for_request(request) or Site.objects.first()
+    if site is None:
+        return None
+    return (
+        HomePage.objects.live().public()
+        .descendant_of(site.root_page, inclusive=True)
+        .order_by("path")
+        .first()
+    )
+
+
+def block_key(item, images_version):
+    """Cache key of one raw top-level block: its id plus a hash of its stored value."""
+    content = json.dumps([item.get("type"), item.get("value")], sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+    return f"home:block:{BLOCK_VERSION}:{images_version}:{item.get('id') or '-'}:{digest}"
+
+
+def render_blocks(stream):
+    """Rendered JSON of each top-level block, from the cache where possible."""
+    stream_block = stream.stream_block
+    # Block types removed from the definition are skipped, as in ``represent``
+    raw = [
+        item for item in stream.raw_data
+        if isinstance(item, dict) and item.get("type") in stream_block.child_blocks
+    ]
+    (images_version,) = get_versions("images")
+    keys = [block_key(item, images_version) for item in raw]
+    cached = cache.get_many(keys)
+    misses = [(key, item) for key, item in zip(keys, raw, strict=True) if key not in cached]
+    if misses:
+        request = SnapshotRequest()
+        resolver = RenditionResolver(request)
+        serializer = HomePageSerializer(context={"request": request, "renditions": resolver})
+        image_ids = {key: raw_refs(stream_block, [item]).image_ids for key, item in misses}
+        for ids in image_ids.values():
+            resolver.add(*ids)
+        resolver.fetch()
+        renderer = JSONRenderer()
+        fresh = {}
+        for key, item in misses:
+            (block,) = represent_raw(stream_block, [item], image=serializer.stream_image)
+            cached[key] = renderer.render(block).decode("utf-8")
+            missing = {image_id for image_id, _spec in resolver.missing}
+            if not missing & set(image_ids[key]):
+                fresh[key] = cached[key]
+        if fresh:
+            cache.set_many(fresh, BLOCK_TIMEOUT)
+        resolver.flush()
+    return [RawJSON(cached[key]) for key in keys]
+
+
+def build(request):
+    """``/api/home/`` payload for the requesting site, or None."""
+    home = find_home(request)
+    if home is None:
+        return None
+    return {
+        "id": home.pk,
+        "title": home.title,
+        "slug": home.slug,
+        "body": render_blocks(home.body),
+    }
@@ -0,0 +1,139 @@
+"""Precomputed multi-hop reachability over ``GeoArea.neighbors``.
+
+``GeoAreaHop`` stores, for every area, each other area reachable within
+``MAX_HOPS`` neighbor steps together with the step count and the center
+distance, so "areas near X" is one indexed query instead of a recursive walk
+of the M2M.
+
+When edges change, only sources that could reach an endpoint are rebuilt:
+any source whose paths change must reach one of the changed edge's endpoints
+within ``MAX_HOPS - 1`` steps in the old graph. That set is read from the
+current (old) table before the BFS runs against the new graph.
+"""
+import math
+
+from django.db import transaction
+from django.db.models import Q
+
+MAX_HOPS = 3
+
+
+def _adjacency(area_ids=None):
+    """``{id: {neighbor ids}}`` for the given areas, or the whole graph (one query)."""
+    from .models_local import GeoArea
+
+    rows = GeoArea.neighbors.through.objects.all()
+    adjacency = {}
+    if area_ids is not None:
+        area_ids = list(area_ids)
+        rows = rows.filter(Q(from_geoarea_id__in=area_ids) | Q(to_geoarea_id__in=area_ids))
+        adjacency = {pk: set() for pk in area_ids}
+    # Read both directions: symmetrical add/remove fire m2m_changed between the two row writes
+    for a, b in rows.values_list("from_geoarea_id", "to_geoarea_id"):
+        if a != b:
+            adjacency.setdefault(a, set()).add(b)
+            adjacency.setdefault(b, set()).add(a)
+    return adjacency
+
+
+def _ball(sources, depth):
+    """Adjacency of every area within ``depth`` steps of ``sources`` (one query per level)."""
+    adjacency = {}
+    frontier = set(sources)
+    for _ in range(depth + 1):
+        frontier -= set(adjacency)
+        if not frontier:
+            break
+        loaded = _adjacency(frontier)
+        # Only frontier entries are complete; the others saw a single edge
+        loaded = {pk: loaded[pk] for pk in frontier}
+        adjacency.update(loaded)
+        frontier = {n for pk in loaded for n in loaded[pk]}
+    return adjacency
+
+
+def _bfs(source, adjacency, depth):
+    seen = {source: 0}
+    frontier = [source]
+    for step in range(1, depth + 1):
+        nxt = []
+        for pk in frontier:
+            for n in adjacency.get(pk, ()):
+                if n not in seen:
+                    seen[n] = step
+                    nxt.append(n)
+        frontier = nxt
+    del seen[source]
+    return seen
+
+
+def _haversine_km(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def rebuild(sources, adjacency=None):
+    """Recompute the rows of ``sources`` against the current neighbor graph."""
+    from .models_local import GeoArea, GeoAreaHop
+
+    sources = set(sources)
+    if not sources:
+        return
+    if adjacency is None:
+        adjacency = _ball(sources, MAX_HOPS)
+    reached = {pk: _bfs(pk, adjacency, MAX_HOPS) for pk in sources}
+    ids = set(sources).union(*(r.keys() for r in reached.values()))
+    centers = {
+        pk: (float(lat), float(lng))
+        for pk, lat, lng in GeoArea.objects.filter(pk__in=ids)
+        .exclude(center_lat=None).exclude(center_lng=None)
+        .values_list("id", "center_lat", "center_lng")
+    }
+    existing = set(GeoArea.objects.filter(pk__in=sources).values_list("id", flat=True))
+    rows = [
+        GeoAreaHop(
+            source_id=source, target_id=target, hops=hops,
+            distance_km=round(_haversine_km(centers[source], centers[target]), 3)
+            if source in centers and target in centers else None,
+        )
+        for source, targets in reached.items() if source in existing
+        for target, hops in targets.items()
+    ]
+    with transaction.atomic():
+        GeoAreaHop.objects.filter(source_id__in=sources).delete()
+        GeoAreaHop.objects.bulk_create(rows, batch_size=1000)
+
+
+def affected_by(endpoints):
+    """Sources whose rows may change when edges touching ``endpoints`` change (old graph)."""
+    from .models_local import GeoAreaHop
+
+    endpoints = {pk for pk in endpoints if pk}
+    if not endpoints:
+        return set()
+    reach = GeoAreaHop.objects.filter(source_id__in=endpoints, hops__lte=MAX_HOPS - 1)
+    return endpoints | set(reach.values_list("target_id", flat=True))
+
+
+def refresh(endpoints):
+    rebuild(affected_by(endpoints))
+
+
+def refresh_distances(area_id):
+    """Rebuild every row that points at ``area_id`` (its center moved)."""
+    from .models_local import GeoAreaHop
+
+    sources = set(GeoAreaHop.objects.filter(target_id=area_id).values_list("source_id", flat=True))
+    rebuild(sources | {area_id})
+
+
+def rebuild_all():
+    from .models_local import GeoArea, GeoAreaHop
+
+    adjacency = _adjacency()
+    with transaction.atomic():
+        GeoAreaHop.objects.all().delete()
+        ids = list(GeoArea.objects.values_list("id", flat=True))
+        for start in range(0, len(ids), 500):
+            rebuild(ids[start:start + 500], adjacency)
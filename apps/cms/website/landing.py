@@ -0,0 +1,74 @@
+"""Composite payload for a service-in-city landing page.
+
+One request resolves the coverage (with its ServicePage, GeoArea and review
+aggregate) once and builds every section from it, with a fixed number of
+queries however many testimonials, projects or neighbors there are:
+
+* coverage + service + geoarea + review stats (one joined query)
+* service and project payloads from ``website.snapshots``
+* local testimonials (the area and, for a city, its neighborhoods)
+* live projects linked to the area, through ``ProjectLookup``
+* neighbor areas with ready coverage for the same service
+"""
+from django.db.models import Q
+
+from .models import Testimonial
+from .models_local import GeoArea, ServiceCoverage
+from .models_pages import ProjectLookup, ProjectPage
+from .serializers import ProjectPageSerializer, ServiceCoverageDetailSerializer, ServicePageSerializer, TestimonialSerializer
+from . import snapshots
+
+# Namespaces the payload is built from (cache keys / ETags)
+LANDING_NAMESPACES = ("coverage", "services", "projects", "testimonials", "geoareas")
+MAX_TESTIMONIALS = 6
+MAX_PROJECTS = 6
+MAX_NEARBY = 8
+
+
+def build(request, service_slug, city_slug):
+    """Landing payload for a ready coverage, or None."""
+    coverage = (
+        ServiceCoverage.objects.select_related("service", "geoarea", "geoarea__review_stats")
+        .filter(service__slug=service_slug, geoarea__slug=city_slug, status="ready")
+        .first()
+    )
+    if coverage is None:
+        return None
+    area = coverage.geoarea
+    service = coverage.service
+
+    testimonials = Testimonial.objects.filter(
+        Q(geoarea=area) | Q(geoarea__parent_city=area)
+    ).order_by("-date", "-id")[:MAX_TESTIMONIALS]
+
+    projects = list(
+        ProjectPage.objects.live().public()
+        .filter(pk__in=ProjectLookup.project_ids(ProjectLookup.KIND_CITY, area.slug))
+        .order_by("-first_published_at")[:MAX_PROJECTS]
+    )
+
+    nearby = (
+        ServiceCoverage.objects.filter(
+            service=service, status="ready", quality_ok=True,
+            geoarea__in=GeoArea.neighbors.through.objects.filter(from_geoarea=area).values("to_geoarea"),
+        )
+        .order_by("geoarea__name")
+        .values_list("geoarea__slug", "geoarea__name", "geoarea__type")[:MAX_NEARBY]
+    )
+
+    try:
+        stats = area.review_stats
+    except GeoArea.review_stats.RelatedObjectDoesNotExist:
+        stats = None
+
+    return {
+        "coverage": ServiceCoverageDetailSerializer(coverage, context={"request": request}).data,
+        "service": snapshots.RawJSON(snapshots.payloads_for([service], ServicePageSerializer)[0]),
+        "testimonials": TestimonialSerializer(testimonials, many=True).data,
+        "projects": [snapshots.RawJSON(p) for p in snapshots.payloads_for(projects, ProjectPageSerializer)],
+        "nearby": [{"slug": slug, "name": name, "type": type_} for slug, name, type_ in nearby],
+        "reviews": {
+            "area": stats.summary() if stats else None,
+            "rollup": stats.summary(rollup=True) if stats else None,
+        },
+    }
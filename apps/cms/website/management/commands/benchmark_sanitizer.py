@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website import sanitize
+
+PARAGRAPH = (
+    '<p>Impact <b>windows</b> and <a href="/services/glass" onclick="track()">doors</a> installed '
+    'by our crew &amp; inspected. <img src="/media/x.jpg" alt="Job" class="richtext-image left"></p>'
+)
+
+
+def documents(size):
+    """Named documents of roughly ``size`` characters."""
+    repeat = max(1, size // len(PARAGRAPH))
+    return {
+        "rich text": PARAGRAPH * repeat,
+        "with scripts": (PARAGRAPH + "<script>var a = 1;</script>") * repeat,
+        # Unclosed openers: the legacy script pattern rescans to the end from each one
+        "unclosed script": "<script " + "<p>x</p><script " * (size // 16),
+    }
+
+
+class Command(BaseCommand):
+    help = "Time the allowlist sanitizer against the legacy regex one on large documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, action="append", dest="sizes",
+                            help="Document size in characters (repeatable; default 10k and 100k)")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def _time(self, func, html, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(html)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def handle(self, *args, **opts):
+        self.stdout.write(f"{'document':<18}{'size':>10}{'legacy ms':>12}{'clean ms':>12}{'cached ms':>12}")
+        for size in opts["sizes"] or [10_000, 100_000]:
+            for name, html in documents(size).items():
+                legacy = self._time(sanitize.legacy_sanitize, html, opts["repeat"])
+                clean = self._time(sanitize.clean, html, opts["repeat"])
+                sanitize.sanitize_html(html)
+                cached = self._time(sanitize.sanitize_html, html, opts["repeat"])
+                self.stdout.write(f"{name:<18}{len(html):>10}{legacy:>12.1f}{clean:>12.1f}{cached:>12.3f}")
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website import sitemaps
+
+
+class Command(BaseCommand):
+    help = "Write the sitemap index and child sitemaps to storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--section", action="append", choices=sitemaps.SECTIONS, dest="sections",
+                            help="Only rebuild this section (repeatable; the index is always rewritten)")
+        parser.add_argument("--max-urls", type=int, default=sitemaps.MAX_URLS, help="URLs per child sitemap")
+
+    def handle(self, *args, **opts):
+        started = time.monotonic()
+        result = sitemaps.build(opts["sections"] or sitemaps.SECTIONS, max_urls=opts["max_urls"])
+        for section, files in result.items():
+            self.stdout.write(f"{section}: {len(files)} file(s)")
+        self.stdout.write(self.style.SUCCESS(f"Sitemaps written in {time.monotonic() - started:.1f}s"))
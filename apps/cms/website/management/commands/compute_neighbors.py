@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website import neighbors
+
+
+class Command(BaseCommand):
+    help = "Derive GeoArea.neighbors from boundary adjacency, falling back to nearest centers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+        parser.add_argument("--keep-existing", action="store_true", help="Only add edges, never remove hand-made ones")
+
+    def handle(self, *args, **opts):
+        started = time.monotonic()
+        edges = neighbors.compute_all()
+        self.stdout.write(f"Computed {len(edges)} neighbor pairs in {time.monotonic() - started:.1f}s")
+        if opts["dry_run"]:
+            return
+        added, removed = neighbors.write(edges, prune=not opts["keep_existing"])
+        self.stdout.write(self.style.SUCCESS(f"Neighbors updated: +{added} / -{removed}"))
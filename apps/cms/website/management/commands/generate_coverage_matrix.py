@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website import coverage
+from website.models_local import GeoArea
+from website.models_pages import ServicePage
+
+
+class Command(BaseCommand):
+    help = "Create draft ServiceCoverage rows for every ServicePage x GeoArea combination (existing pairs are kept)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--service", action="append", dest="services", help="ServicePage slug (repeatable; default: all live)")
+        parser.add_argument("--geoarea", action="append", dest="geoareas", help="GeoArea slug (repeatable; default: all)")
+        parser.add_argument("--type", choices=[c[0] for c in GeoArea.TYPE_CHOICES], help="Only GeoAreas of this type")
+        parser.add_argument("--template", help="JSON file overriding the default content template")
+        parser.add_argument("--status", choices=["draft", "ready"], default="draft")
+        parser.add_argument("--batch-size", type=int, default=coverage.BATCH_SIZE)
+
+    def handle(self, *args, **opts):
+        services = ServicePage.objects.live().only("id", "title")
+        if opts["services"]:
+            services = services.filter(slug__in=opts["services"])
+        geoareas = GeoArea.objects.only("id", "name")
+        if opts["geoareas"]:
+            geoareas = geoareas.filter(slug__in=opts["geoareas"])
+        if opts["type"]:
+            geoareas = geoareas.filter(type=opts["type"])
+        services, geoareas = list(services), list(geoareas)
+        if not services or not geoareas:
+            raise CommandError("No matching services or geoareas")
+
+        started = time.monotonic()
+        created = coverage.generate(
+            services, geoareas,
+            template=coverage.load_template(opts["template"]),
+            status=opts["status"],
+            batch_size=opts["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} coverages created for {len(services)} services x {len(geoareas)} areas "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from wagtail.images import get_image_model
+
+from website import renditions
+
+
+class Command(BaseCommand):
+    help = "Queue and generate the API rendition specs for the whole image library in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=getattr(settings, "RENDITION_WORKERS", 2))
+        parser.add_argument("--spec", action="append", dest="specs", help="Override RENDITION_SPECS (repeatable)")
+        parser.add_argument("--pending-only", action="store_true", help="Only drain already queued jobs")
+        parser.add_argument("--watch", action="store_true", help="Keep polling the queue (worker mode)")
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **opts):
+        if not opts["pending_only"]:
+            ids = get_image_model().objects.order_by("pk").values_list("pk", flat=True)
+            chunk = []
+            queued = 0
+            for image_id in ids.iterator(chunk_size=1000):
+                chunk.append(image_id)
+                if len(chunk) >= 1000:
+                    renditions.enqueue(chunk, opts["specs"], autorun=False, retry_failed=True)
+                    queued += len(chunk)
+                    chunk = []
+            if chunk:
+                renditions.enqueue(chunk, opts["specs"], autorun=False, retry_failed=True)
+                queued += len(chunk)
+            self.stdout.write(f"Queued {queued} images")
+
+        while True:
+            started = time.monotonic()
+            generated = renditions.process_jobs(workers=opts["workers"])
+            if generated:
+                self.stdout.write(f"Generated {generated} renditions in {time.monotonic() - started:.1f}s")
+            if not opts["watch"]:
+                break
+            time.sleep(opts["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Renditions prewarmed"))
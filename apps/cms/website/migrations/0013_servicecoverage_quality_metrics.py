@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:48
+
+import re
+
+from django.db import migrations, models
+
+
+def _count_words(html):
+    return len(re.sub(r"<[^>]+>", " ", html or "").split())
+
+
+def backfill_quality(apps, schema_editor):
+    ServiceCoverage = apps.get_model('website', 'ServiceCoverage')
+    Testimonial = apps.get_model('website', 'Testimonial')
+    with_reviews = set(
+        Testimonial.objects.exclude(geoarea_id=None).values_list('geoarea_id', flat=True)
+    )
+    batch = []
+    for cov in ServiceCoverage.objects.all().iterator():
+        words = _count_words(cov.unique_intro)
+        modules = 0
+        images = 1 if cov.hero_media_id else 0
+        for stream in (cov.pain_points_local, cov.process_steps_local, cov.permits_local):
+            for item in stream.raw_data:
+                modules += 1
+                value = item.get('value')
+                if isinstance(value, dict):
+                    text = str(value.get('text') or '')
+                    words += _count_words(text)
+                    images += len(re.findall(r"<img ", text))
+        cov.word_count = words
+        cov.module_count = modules
+        cov.image_count = images
+        cov.quality_ok = (
+            words >= 700 and modules >= 6 and images >= 6 and cov.geoarea_id in with_reviews
+        )
+        batch.append(cov)
+        if len(batch) >= 500:
+            ServiceCoverage.objects.bulk_update(batch, ['word_count', 'module_count', 'image_count', 'quality_ok'])
+            batch = []
+    if batch:
+        ServiceCoverage.objects.bulk_update(batch, ['word_count', 'module_count', 'image_count', 'quality_ok'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0012_servicearea_geo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicecoverage',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicecoverage',
+            name='module_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicecoverage',
+            name='quality_ok',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicecoverage',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='servicecoverage',
+            index=models.Index(fields=['status', 'quality_ok'], name='website_ser_status_9e24f7_idx'),
+        ),
+        migrations.RunPython(backfill_quality, migrations.RunPython.noop),
+    ]
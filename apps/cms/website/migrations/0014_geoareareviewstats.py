@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_review_stats(apps, schema_editor):
+    GeoArea = apps.get_model('website', 'GeoArea')
+    Testimonial = apps.get_model('website', 'Testimonial')
+    GeoAreaReviewStats = apps.get_model('website', 'GeoAreaReviewStats')
+    parents = dict(GeoArea.objects.exclude(parent_city=None).values_list('id', 'parent_city_id'))
+    rows = {}
+    grouped = (
+        Testimonial.objects.exclude(geoarea=None)
+        .values('geoarea_id', 'rating')
+        .annotate(n=Count('id'))
+    )
+    for row in grouped:
+        geo_id, rating, n = row['geoarea_id'], row['rating'], row['n']
+        stats = rows.setdefault(geo_id, GeoAreaReviewStats(geoarea_id=geo_id))
+        stats.count += n
+        stats.rating_sum += n * rating
+        if 1 <= rating <= 5:
+            setattr(stats, f'rating_{rating}', getattr(stats, f'rating_{rating}') + n)
+    for geo_id, stats in list(rows.items()):
+        stats.rollup_count += stats.count
+        stats.rollup_sum += stats.rating_sum
+        parent_id = parents.get(geo_id)
+        if parent_id and parent_id != geo_id:
+            parent = rows.setdefault(parent_id, GeoAreaReviewStats(geoarea_id=parent_id))
+            parent.rollup_count += stats.count
+            parent.rollup_sum += stats.rating_sum
+    GeoAreaReviewStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0013_servicecoverage_quality_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoAreaReviewStats',
+            fields=[
+                ('geoarea', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='website.geoarea')),
+                ('count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_1', models.IntegerField(default=0)),
+                ('rating_2', models.IntegerField(default=0)),
+                ('rating_3', models.IntegerField(default=0)),
+                ('rating_4', models.IntegerField(default=0)),
+                ('rating_5', models.IntegerField(default=0)),
+                ('rollup_count', models.IntegerField(default=0)),
+                ('rollup_sum', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_project_lookups(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ProjectPage = apps.get_model('website', 'ProjectPage')
+    ProjectLookup = apps.get_model('website', 'ProjectLookup')
+    keys = set()
+    for pk, city in ProjectPage.objects.values_list('pk', 'city'):
+        keys.add((pk, 'city', slugify(city or '')[:255]))
+    for pk, slug in ProjectPage.geoareas.through.objects.values_list('projectpage_id', 'geoarea__slug'):
+        keys.add((pk, 'city', slugify(slug or '')[:255]))
+    ct = ContentType.objects.filter(app_label='website', model='projectpage').first()
+    if ct is not None:
+        tagged = TaggedItem.objects.filter(content_type=ct).values_list('object_id', 'tag__name')
+        keys.update((pk, 'service', slugify(name or '')[:255]) for pk, name in tagged)
+    ProjectLookup.objects.bulk_create(
+        [ProjectLookup(project_id=pk, kind=kind, value=value) for pk, kind, value in keys if value],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('website', '0016_pagesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('service', 'Service'), ('city', 'City')], max_length=8)),
+                ('value', models.SlugField(db_index=False, max_length=255)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lookups', to='website.projectpage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value', 'project'], name='website_pro_kind_cae736_idx')],
+                'unique_together': {('project', 'kind', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_project_lookups, migrations.RunPython.noop),
+    ]
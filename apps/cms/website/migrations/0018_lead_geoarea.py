@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0017_projectlookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='geoarea',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leads', to='website.geoarea'),
+        ),
+    ]
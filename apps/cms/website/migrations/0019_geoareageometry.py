@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:09
+
+import django.db.models.deletion
+import json
+
+from django.db import migrations, models
+
+
+def backfill_geometries(apps, schema_editor):
+    from website.geometry import build_levels, source_hash
+
+    GeoArea = apps.get_model('website', 'GeoArea')
+    GeoAreaGeometry = apps.get_model('website', 'GeoAreaGeometry')
+    rows = []
+    for pk, geojson in GeoArea.objects.exclude(geojson=None).exclude(geojson='').values_list('id', 'geojson'):
+        try:
+            levels = build_levels(geojson)
+        except (ValueError, TypeError, KeyError, IndexError):
+            continue
+        rows.extend(
+            GeoAreaGeometry(
+                geoarea_id=pk, zoom=zoom, source_hash=source_hash(geojson),
+                min_lng=bbox[0], min_lat=bbox[1], max_lng=bbox[2], max_lat=bbox[3],
+                vertex_count=vertices, polygons=json.dumps(polygons, separators=(',', ':')),
+            )
+            for zoom, bbox, vertices, polygons in levels
+        )
+    GeoAreaGeometry.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0018_lead_geoarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoAreaGeometry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('source_hash', models.CharField(max_length=32)),
+                ('min_lng', models.FloatField()),
+                ('min_lat', models.FloatField()),
+                ('max_lng', models.FloatField()),
+                ('max_lat', models.FloatField()),
+                ('vertex_count', models.PositiveIntegerField(default=0)),
+                ('polygons', models.TextField()),
+                ('geoarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geometries', to='website.geoarea')),
+            ],
+            options={
+                'unique_together': {('geoarea', 'zoom')},
+            },
+        ),
+        migrations.RunPython(backfill_geometries, migrations.RunPython.noop),
+    ]
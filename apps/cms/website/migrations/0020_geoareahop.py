@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_hops(apps, schema_editor):
+    from website.hops import MAX_HOPS, _bfs, _haversine_km
+
+    GeoArea = apps.get_model('website', 'GeoArea')
+    GeoAreaHop = apps.get_model('website', 'GeoAreaHop')
+    adjacency = {}
+    for a, b in GeoArea.neighbors.through.objects.values_list('from_geoarea_id', 'to_geoarea_id'):
+        if a != b:
+            adjacency.setdefault(a, set()).add(b)
+    centers = {
+        pk: (float(lat), float(lng))
+        for pk, lat, lng in GeoArea.objects.exclude(center_lat=None).exclude(center_lng=None)
+        .values_list('id', 'center_lat', 'center_lng')
+    }
+    rows = []
+    for source in adjacency:
+        for target, hops in _bfs(source, adjacency, MAX_HOPS).items():
+            distance = None
+            if source in centers and target in centers:
+                distance = round(_haversine_km(centers[source], centers[target]), 3)
+            rows.append(GeoAreaHop(source_id=source, target_id=target, hops=hops, distance_km=distance))
+    GeoAreaHop.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0019_geoareageometry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoAreaHop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hops', models.PositiveSmallIntegerField()),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hops', to='website.geoarea')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='website.geoarea')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'hops', 'distance_km'], name='website_geo_source__bdcbfb_idx')],
+                'unique_together': {('source', 'target')},
+            },
+        ),
+        migrations.RunPython(backfill_hops, migrations.RunPython.noop),
+    ]
@@ -274,12 +274,44 @@ class Lead(models.Model):
     message = models.TextField(blank=True)
     source_path = models.CharField(max_length=240, blank=True)
     utm = models.JSONField(default=dict, blank=True)
+    # Resolved from the visitor's coordinates at capture time (see website.geolocate)
+    geoarea = models.ForeignKey(
+        'website.GeoArea', null=True, blank=True, on_delete=models.SET_NULL, related_name='leads'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f'{self.name} - {self.email or self.phone or "lead"}'
 
 
+# ---------- Rendition jobs ----------
+class RenditionJob(models.Model):
+    """Queue entry for background rendition generation (see website.renditions)."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    image = models.ForeignKey(get_image_model_string(), on_delete=models.CASCADE, related_name='+')
+    filter_spec = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('image', 'filter_spec')
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.image_id} {self.filter_spec} ({self.status})'
+
+
 # Import additional Page models so Django registers them; avoid circular imports by
 # importing at the end of the module in a try/except and ignoring lint.
 try:  # noqa: E402
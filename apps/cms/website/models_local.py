@@ -1,3 +1,5 @@
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.text import slugify
 from wagtail.snippets.models import register_snippet
@@ -14,6 +16,10 @@ class GeoArea(models.Model):
         ("neighborhood", "Neighborhood"),
     )
 
+    # Taken by list routes of /api/geoareas/ (GeoAreaViewSet actions), so the
+    # detail route /api/geoareas/<slug>/ could never reach an area using them
+    RESERVED_SLUGS = ("nearby", "locate")
+
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default="city")
     name = models.CharField(max_length=160)
     slug = models.SlugField(max_length=180, unique=True, blank=True)
@@ -29,6 +35,7 @@ class GeoArea(models.Model):
             ("url", blocks.URLBlock()),
         ])),
     ], use_json_field=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     panels = [
         FieldPanel("type"),
@@ -48,15 +55,192 @@ class GeoArea(models.Model):
             models.Index(fields=["slug"]),
         ]
 
+    def clean(self):
+        super().clean()
+        if self.slug in self.RESERVED_SLUGS:
+            raise ValidationError({"slug": f'"{self.slug}" is reserved by the API; choose another slug.'})
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = self._get_autogenerated_slug(slugify(self.name))
+        elif self.slug in self.RESERVED_SLUGS:
+            self.clean()
         super().save(*args, **kwargs)
 
+    def _get_autogenerated_slug(self, base):
+        """``base``, moved off reserved slugs and suffixed with -2, -3... until unused."""
+        if base in self.RESERVED_SLUGS:
+            base = f"{base}-area"
+        taken = set(
+            GeoArea.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list("slug", flat=True)
+        )
+        candidate, suffix = base, 1
+        while candidate in taken:
+            suffix += 1
+            candidate = f"{base}-{suffix}"
+        return candidate
+
     def __str__(self):
         return self.name
 
 
+class GeoAreaReviewStats(models.Model):
+    """Denormalized review aggregate per GeoArea.
+
+    ``count``/``rating_sum``/``rating_N`` cover testimonials anchored to the area
+    itself; the ``rollup_*`` columns add those of its neighborhoods so a city can
+    report the reviews of the whole area. Maintained incrementally by the
+    Testimonial signals in ``website.signals``.
+    """
+
+    geoarea = models.OneToOneField(GeoArea, primary_key=True, on_delete=models.CASCADE, related_name="review_stats")
+    count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    rollup_count = models.IntegerField(default=0)
+    rollup_sum = models.IntegerField(default=0)
+
+    MIN_REVIEWS = 3
+
+    def __str__(self):
+        return f"Reviews for {self.geoarea_id}: {self.count}"
+
+    @property
+    def histogram(self):
+        return {str(r): getattr(self, f"rating_{r}") for r in range(1, 6)}
+
+    def summary(self, rollup=False):
+        """Public shape used by the API; None below MIN_REVIEWS like before."""
+        count = self.rollup_count if rollup else self.count
+        total = self.rollup_sum if rollup else self.rating_sum
+        if count < self.MIN_REVIEWS:
+            return None
+        data = {"count": count, "avg": round(total / count, 2)}
+        if not rollup:
+            data["histogram"] = self.histogram
+        return data
+
+    @classmethod
+    def apply(cls, geoarea_id, rating, sign=1):
+        """Add (sign=1) or remove (sign=-1) one review from the area and its city."""
+        if not geoarea_id:
+            return
+        rating = int(rating or 0)
+        updates = {
+            "count": models.F("count") + sign,
+            "rating_sum": models.F("rating_sum") + sign * rating,
+            "rollup_count": models.F("rollup_count") + sign,
+            "rollup_sum": models.F("rollup_sum") + sign * rating,
+        }
+        if 1 <= rating <= 5:
+            updates[f"rating_{rating}"] = models.F(f"rating_{rating}") + sign
+        cls.objects.get_or_create(geoarea_id=geoarea_id)
+        cls.objects.filter(geoarea_id=geoarea_id).update(**updates)
+        parent_id = GeoArea.objects.filter(pk=geoarea_id).values_list("parent_city_id", flat=True).first()
+        if parent_id and parent_id != geoarea_id:
+            cls.shift_rollup(parent_id, sign, sign * rating)
+
+    @classmethod
+    def shift_rollup(cls, geoarea_id, count, total):
+        if not geoarea_id or not (count or total):
+            return
+        cls.objects.get_or_create(geoarea_id=geoarea_id)
+        cls.objects.filter(geoarea_id=geoarea_id).update(
+            rollup_count=models.F("rollup_count") + count,
+            rollup_sum=models.F("rollup_sum") + total,
+        )
+
+    @classmethod
+    def reparent(cls, geoarea_id, old_parent_id, new_parent_id):
+        """Move an area's own reviews from one city's rollup to another's."""
+        own = cls.objects.filter(geoarea_id=geoarea_id).values_list("count", "rating_sum").first()
+        if not own:
+            return
+        count, total = own
+        cls.shift_rollup(old_parent_id, -count, -total)
+        cls.shift_rollup(new_parent_id, count, total)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every row from scratch (repair tool; the signals keep it current)."""
+        from .models import Testimonial  # avoid cycle at import time
+
+        rows = {}
+        parents = dict(GeoArea.objects.exclude(parent_city=None).values_list("id", "parent_city_id"))
+        grouped = (
+            Testimonial.objects.exclude(geoarea=None)
+            .values("geoarea_id", "rating")
+            .annotate(n=models.Count("id"))
+        )
+        for row in grouped:
+            geo_id, rating, n = row["geoarea_id"], row["rating"], row["n"]
+            stats = rows.setdefault(geo_id, cls(geoarea_id=geo_id))
+            stats.count += n
+            stats.rating_sum += n * rating
+            if 1 <= rating <= 5:
+                setattr(stats, f"rating_{rating}", getattr(stats, f"rating_{rating}") + n)
+        for geo_id, stats in list(rows.items()):
+            stats.rollup_count += stats.count
+            stats.rollup_sum += stats.rating_sum
+            parent_id = parents.get(geo_id)
+            if parent_id and parent_id != geo_id:
+                parent = rows.setdefault(parent_id, cls(geoarea_id=parent_id))
+                parent.rollup_count += stats.count
+                parent.rollup_sum += stats.rating_sum
+        cls.objects.all().delete()
+        cls.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class GeoAreaGeometry(models.Model):
+    """One zoom level of a GeoArea's simplified boundary.
+
+    Generated from ``GeoArea.geojson`` whenever it changes (``source_hash``
+    records which source text produced the row); see ``website.geometry``.
+    ``polygons`` holds MultiPolygon coordinates as JSON text.
+    """
+
+    geoarea = models.ForeignKey(GeoArea, on_delete=models.CASCADE, related_name="geometries")
+    zoom = models.PositiveSmallIntegerField()
+    source_hash = models.CharField(max_length=32)
+    min_lng = models.FloatField()
+    min_lat = models.FloatField()
+    max_lng = models.FloatField()
+    max_lat = models.FloatField()
+    vertex_count = models.PositiveIntegerField(default=0)
+    polygons = models.TextField()
+
+    class Meta:
+        unique_together = ("geoarea", "zoom")
+
+    def __str__(self):
+        return f"Geometry of {self.geoarea_id} @ z{self.zoom}"
+
+
+class GeoAreaHop(models.Model):
+    """Precomputed graph distance between two GeoAreas over ``neighbors``.
+
+    One row per (source, target) reachable within ``website.hops.MAX_HOPS``
+    steps; kept current by the neighbor signals (see ``website.hops``).
+    ``distance_km`` is the center-to-center distance, when both centers exist.
+    """
+
+    source = models.ForeignKey(GeoArea, on_delete=models.CASCADE, related_name="hops")
+    target = models.ForeignKey(GeoArea, on_delete=models.CASCADE, related_name="+")
+    hops = models.PositiveSmallIntegerField()
+    distance_km = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("source", "target")
+        indexes = [models.Index(fields=["source", "hops", "distance_km"])]
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} ({self.hops})"
+
+
 @register_snippet
 class ServiceCoverage(models.Model):
     STATUS_CHOICES = (
@@ -92,6 +276,18 @@ class ServiceCoverage(models.Model):
     hero_media = models.ForeignKey(get_image_model_string(), null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
     schema_overrides = models.JSONField(default=dict, blank=True)
 
+    # Persisted quality metrics; kept current by save() and the Testimonial signals
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    module_count = models.PositiveIntegerField(default=0, editable=False)
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    quality_ok = models.BooleanField(default=False, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    QUALITY_MIN_WORDS = 700
+    QUALITY_MIN_MODULES = 6
+    QUALITY_MIN_IMAGES = 6
+    QUALITY_FIELDS = ["word_count", "module_count", "image_count", "quality_ok"]
+
     panels = [
         MultiFieldPanel([
             FieldPanel("service"),
@@ -114,53 +310,84 @@ class ServiceCoverage(models.Model):
         unique_together = ("service", "geoarea")
         indexes = [
             models.Index(fields=["service", "geoarea"]),
+            models.Index(fields=["status", "quality_ok"]),
         ]
 
     def __str__(self):
         return f"{self.service.title} in {self.geoarea.name}"
 
-    # Quality gate: words >= 700, modules >= 6, images >= 6
-    def passes_quality_minimum(self) -> bool:
-        word_count = 0
-        modules = 0
-        images = 0
+    def save(self, *args, **kwargs):
+        self.refresh_quality()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | set(self.QUALITY_FIELDS)
+        super().save(*args, **kwargs)
 
-        def count_richtext(rt: str):
-            import re
-            text = re.sub(r"<[^>]+>", " ", rt or "")
-            return len([w for w in text.split() if w])
+    def compute_quality_metrics(self):
+        """Return (word_count, module_count, image_count) from the content fields."""
+        from .streams import count_words, extract
 
-        word_count += count_richtext(self.unique_intro or "")
-        for stream in (self.pain_points_local, self.process_steps_local, self.permits_local):
-            try:
-                for blk in stream:
-                    modules += 1
-                    val = blk.value
-                    if isinstance(val, dict):
-                        text = val.get("text") or ""
-                        if hasattr(text, "source"):
-                            text = text.source
-                        word_count += count_richtext(str(text))
-            except Exception:
-                pass
-        if self.hero_media:
+        word_count = count_words(self.unique_intro)
+        modules = images = 0
+        for field in ("pain_points_local", "process_steps_local", "permits_local"):
+            found = extract(self, field)
+            word_count += found.word_count
+            modules += found.module_count
+            images += found.inline_images
+        if self.hero_media_id:
             images += 1
-        # heuristic images in streams: count occurrences of <img in rich text
-        import re
-        for stream in (self.pain_points_local, self.process_steps_local, self.permits_local):
+        return word_count, modules, images
+
+    @classmethod
+    def base_quality_q(cls):
+        """Q expression for the content part of the gate, evaluated in SQL."""
+        return (
+            models.Q(word_count__gte=cls.QUALITY_MIN_WORDS)
+            & models.Q(module_count__gte=cls.QUALITY_MIN_MODULES)
+            & models.Q(image_count__gte=cls.QUALITY_MIN_IMAGES)
+        )
+
+    def refresh_quality(self):
+        """Recompute the stored metrics and quality_ok flag (no save)."""
+        self.word_count, self.module_count, self.image_count = self.compute_quality_metrics()
+        base_ok = (
+            self.word_count >= self.QUALITY_MIN_WORDS
+            and self.module_count >= self.QUALITY_MIN_MODULES
+            and self.image_count >= self.QUALITY_MIN_IMAGES
+        )
+        has_local_testimonial = False
+        if base_ok and self.geoarea_id:
             try:
-                for blk in stream:
-                    val = blk.value
-                    if isinstance(val, dict):
-                        text = str(val.get("text") or "")
-                        images += len(re.findall(r"<img ", text))
+                from .models import Testimonial  # avoid cycle at import time
+                has_local_testimonial = Testimonial.objects.filter(geoarea_id=self.geoarea_id).exists()
             except Exception:
-                pass
-
-        base_ok = (word_count >= 700) and (modules >= 6) and (images >= 6)
-        try:
-            from .models import Testimonial  # avoid cycle at import time
-            has_local_testimonial = Testimonial.objects.filter(geoarea=self.geoarea).exists()
-        except Exception:
-            has_local_testimonial = False
-        return base_ok and has_local_testimonial
+                has_local_testimonial = False
+        self.quality_ok = base_ok and has_local_testimonial
+        return self.quality_ok
+
+    @classmethod
+    def refresh_quality_for_geoareas(cls, geoarea_ids):
+        """Re-evaluate quality_ok for every coverage in the given geoareas.
+
+        Only the testimonial half of the gate depends on other rows, so this is a
+        single UPDATE per state against the stored metrics.
+        """
+        geoarea_ids = {g for g in geoarea_ids if g}
+        if not geoarea_ids:
+            return
+        from .models import Testimonial  # avoid cycle at import time
+        with_reviews = set(
+            Testimonial.objects.filter(geoarea_id__in=geoarea_ids)
+            .values_list("geoarea_id", flat=True).distinct()
+        )
+        without_reviews = geoarea_ids - with_reviews
+        if with_reviews:
+            cls.objects.filter(geoarea_id__in=with_reviews).update(
+                quality_ok=models.ExpressionWrapper(cls.base_quality_q(), output_field=models.BooleanField())
+            )
+        if without_reviews:
+            cls.objects.filter(geoarea_id__in=without_reviews, quality_ok=True).update(quality_ok=False)
+
+    # Quality gate: words >= 700, modules >= 6, images >= 6, plus a local testimonial
+    def passes_quality_minimum(self) -> bool:
+        return self.refresh_quality()
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.text import slugify
 from wagtail.models import Page
 from wagtail.fields import RichTextField, StreamField
 from wagtail.admin.panels import FieldPanel
@@ -106,3 +107,86 @@ class ProjectPage(Page):
         FieldPanel("gallery"),
     FieldPanel("geoareas") if GeoArea is not None else FieldPanel("gallery"),
     ]
+
+
+class ProjectLookup(models.Model):
+    """Normalized (lowercased slug) service/city keys of a ProjectPage.
+
+    Rebuilt on publish (see ``website.signals``) so the projects API can
+    filter with indexed equality lookups instead of OR-ed joins + DISTINCT.
+    City keys cover both the free-text ``city`` field and linked GeoAreas.
+    """
+
+    KIND_SERVICE = "service"
+    KIND_CITY = "city"
+    KIND_CHOICES = [(KIND_SERVICE, "Service"), (KIND_CITY, "City")]
+
+    project = models.ForeignKey(ProjectPage, on_delete=models.CASCADE, related_name="lookups")
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    value = models.SlugField(max_length=255, db_index=False)
+
+    class Meta:
+        unique_together = ("project", "kind", "value")
+        indexes = [models.Index(fields=["kind", "value", "project"])]
+
+    def __str__(self):
+        return f"{self.kind}={self.value} -> {self.project_id}"
+
+    @staticmethod
+    def normalize(value):
+        return slugify(value or "")[:255]
+
+    @classmethod
+    def project_ids(cls, kind, value, contains=False):
+        """Subquery of project ids matching ``value`` (exact slug, or substring)."""
+        key = cls.normalize(value)
+        qs = cls.objects.filter(kind=kind)
+        qs = qs.filter(value__contains=key) if contains else qs.filter(value=key)
+        return qs.values("project_id")
+
+    @classmethod
+    def rebuild(cls, project_ids):
+        """Replace the lookup rows of the given projects from their current tags/city/geoareas."""
+        from django.contrib.contenttypes.models import ContentType
+
+        project_ids = [pk for pk in set(project_ids) if pk]
+        if not project_ids:
+            return
+        keys = set()
+        for pk, city in ProjectPage.objects.filter(pk__in=project_ids).values_list("pk", "city"):
+            keys.add((pk, cls.KIND_CITY, cls.normalize(city)))
+        tagged = ProjectPage.services.through.objects.filter(
+            content_type=ContentType.objects.get_for_model(ProjectPage), object_id__in=project_ids
+        ).values_list("object_id", "tag__name")
+        keys.update((pk, cls.KIND_SERVICE, cls.normalize(name)) for pk, name in tagged)
+        if GeoArea is not None:
+            linked = ProjectPage.geoareas.through.objects.filter(projectpage_id__in=project_ids)
+            keys.update(
+                (pk, cls.KIND_CITY, cls.normalize(slug))
+                for pk, slug in linked.values_list("projectpage_id", "geoarea__slug")
+            )
+        cls.objects.filter(project_id__in=project_ids).delete()
+        cls.objects.bulk_create(
+            [cls(project_id=pk, kind=kind, value=value) for pk, kind, value in keys if value],
+            ignore_conflicts=True,
+        )
+
+
+class PageSnapshot(models.Model):
+    """Pre-serialized API payload for the live revision of a page.
+
+    Written on publish (see ``website.snapshots``); only served while
+    ``revision_id`` matches the page's live revision and ``version`` matches
+    the current serializer shape.
+    """
+
+    page = models.OneToOneField(
+        "wagtailcore.Page", primary_key=True, on_delete=models.CASCADE, related_name="api_snapshot"
+    )
+    revision_id = models.PositiveIntegerField(null=True)
+    version = models.PositiveSmallIntegerField(default=0)
+    payload = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot of page {self.page_id} @ revision {self.revision_id}"
@@ -0,0 +1,198 @@
+"""Derive the ``GeoArea.neighbors`` graph from geometry.
+
+Areas of the same type are neighbors when their boundaries touch or overlap
+(within ``ADJACENCY_TOLERANCE``, since traced borders rarely line up
+exactly). Areas without a boundary, or whose boundary touches nothing, fall
+back to their ``FALLBACK_K`` nearest same-type centers within
+``FALLBACK_MAX_KM``.
+
+Boundaries come from the finest ``GeoAreaGeometry`` level, so detailed source
+polygons cost no more than the simplified ones. Candidate pairs come from an
+R-tree over bounding boxes (centers from a KD-tree); an exact test only runs
+on those. The exact test hashes one boundary's vertices into a grid and
+probes it with the other's, plus a sampled containment check. The through
+table is written with bulk inserts and deletes, which send no m2m signals,
+so the hop table refresh and cache bump happen here.
+"""
+import json
+import math
+from array import array
+
+from django.db import transaction
+
+from . import caching, hops
+from .geoindex import KDTree, km_to_chord, to_xyz
+from .geolocate import RTree, polygons_contain
+
+ADJACENCY_TOLERANCE = 0.0005  # degrees, ~50 m
+FALLBACK_K = 4
+FALLBACK_MAX_KM = 25
+CONTAINMENT_SAMPLES = 16
+DELETE_BATCH = 200
+NEIGHBOR_NAMESPACES = ("geoareas", "areas", "coverage")
+
+
+def _cell(x, y):
+    return (math.floor(x / ADJACENCY_TOLERANCE), math.floor(y / ADJACENCY_TOLERANCE))
+
+
+class Shape:
+    __slots__ = ("id", "type", "bbox", "flat", "vertices", "cells")
+
+    def __init__(self, pk, type_, bbox, polygons):
+        self.id, self.type = pk, type_
+        tol = ADJACENCY_TOLERANCE
+        self.bbox = (bbox[0] - tol, bbox[1] - tol, bbox[2] + tol, bbox[3] + tol)
+        self.flat = [[array("d", [c for point in ring for c in point]) for ring in rings] for rings in polygons]
+        self.vertices = [tuple(point) for rings in polygons for ring in rings for point in ring]
+        self.cells = {_cell(x, y) for x, y in self.vertices}
+
+
+def touches(a, b):
+    """Whether two shapes share a border (vertices within tolerance) or overlap."""
+    cells = a.cells
+    for x, y in b.vertices:
+        cx, cy = _cell(x, y)
+        if any((cx + dx, cy + dy) in cells for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+            return True
+    step_a = max(1, len(a.vertices) // CONTAINMENT_SAMPLES)
+    step_b = max(1, len(b.vertices) // CONTAINMENT_SAMPLES)
+    return (
+        any(polygons_contain(b.flat, x, y) for x, y in a.vertices[::step_a])
+        or any(polygons_contain(a.flat, x, y) for x, y in b.vertices[::step_b])
+    )
+
+
+def polygon_edges(shapes, sources):
+    """Edges ``(low_id, high_id)`` between each source shape and the shapes it touches."""
+    tree = RTree([(shape.bbox, shape) for shape in shapes])
+    edges = set()
+    for source in sources:
+        for other in tree.query_bbox(source.bbox):
+            if other.id == source.id or other.type != source.type:
+                continue
+            pair = (min(source.id, other.id), max(source.id, other.id))
+            if pair not in edges and touches(source, other):
+                edges.add(pair)
+    return edges
+
+
+def center_edges(centers, sources, k=FALLBACK_K, max_km=FALLBACK_MAX_KM):
+    """k-nearest same-type center edges for ``sources`` (ids) among ``centers`` {id: (type, lat, lng)}."""
+    trees = {}
+    for pk, (type_, lat, lng) in centers.items():
+        trees.setdefault(type_, []).append((to_xyz(lat, lng), pk))
+    trees = {type_: KDTree(points) for type_, points in trees.items()}
+    max_chord = km_to_chord(max_km)
+    edges = set()
+    for pk in sources:
+        if pk not in centers:
+            continue
+        type_, lat, lng = centers[pk]
+        for _chord, other in trees[type_].nearest(to_xyz(lat, lng), k + 1, max_chord):
+            if other != pk:
+                edges.add((min(pk, other), max(pk, other)))
+    return edges
+
+
+def _load_shapes(queryset):
+    from .geometry import ZOOM_LEVELS
+
+    rows = queryset.filter(zoom=ZOOM_LEVELS[-1]).values_list(
+        "geoarea_id", "geoarea__type", "min_lng", "min_lat", "max_lng", "max_lat", "polygons"
+    )
+    return {
+        pk: Shape(pk, type_, (x0, y0, x1, y1), json.loads(polygons))
+        for pk, type_, x0, y0, x1, y1, polygons in rows.iterator()
+    }
+
+
+def _load_centers(queryset):
+    rows = queryset.exclude(center_lat=None).exclude(center_lng=None).values_list(
+        "id", "type", "center_lat", "center_lng"
+    )
+    return {pk: (type_, float(lat), float(lng)) for pk, type_, lat, lng in rows.iterator()}
+
+
+def compute_all():
+    """Every neighbor edge, computed from scratch."""
+    from .models_local import GeoArea, GeoAreaGeometry
+
+    shapes = _load_shapes(GeoAreaGeometry.objects.all())
+    edges = polygon_edges(list(shapes.values()), list(shapes.values()))
+    linked = {pk for edge in edges for pk in edge}
+    centers = _load_centers(GeoArea.objects.all())
+    edges |= center_edges(centers, [pk for pk in centers if pk not in linked])
+    return edges
+
+
+def compute_for(area):
+    """Neighbor edges of a single area, loading only nearby candidates."""
+    from .models_local import GeoArea, GeoAreaGeometry
+
+    own = _load_shapes(GeoAreaGeometry.objects.filter(geoarea=area))
+    edges = set()
+    if area.pk in own:
+        x0, y0, x1, y1 = own[area.pk].bbox
+        nearby = GeoAreaGeometry.objects.filter(
+            geoarea__type=area.type, min_lng__lte=x1, max_lng__gte=x0, min_lat__lte=y1, max_lat__gte=y0,
+        )
+        shapes = _load_shapes(nearby)
+        shapes[area.pk] = own[area.pk]
+        edges = polygon_edges(list(shapes.values()), [own[area.pk]])
+    if not edges and area.center_lat is not None and area.center_lng is not None:
+        lat, lng = float(area.center_lat), float(area.center_lng)
+        dlat = FALLBACK_MAX_KM / 111.0
+        dlng = FALLBACK_MAX_KM / (111.0 * max(0.01, math.cos(math.radians(lat))))
+        candidates = GeoArea.objects.filter(
+            type=area.type,
+            center_lat__gte=lat - dlat, center_lat__lte=lat + dlat,
+            center_lng__gte=lng - dlng, center_lng__lte=lng + dlng,
+        )
+        edges = center_edges(_load_centers(candidates), [area.pk])
+    return edges
+
+
+def write(edges, scope=None, prune=True):
+    """Replace the neighbor rows of ``scope`` (area ids; None = whole graph) with ``edges``.
+
+    With ``prune=False`` missing edges are only added and existing rows (such as
+    hand-picked neighbors) are kept. Returns ``(added, removed)`` undirected
+    edge counts.
+    """
+    from django.db.models import Q
+    from .models_local import GeoArea
+
+    through = GeoArea.neighbors.through
+    existing = through.objects.all()
+    if scope is not None:
+        scope = set(scope)
+        existing = existing.filter(Q(from_geoarea_id__in=scope) | Q(to_geoarea_id__in=scope))
+        edges = {e for e in edges if e[0] in scope or e[1] in scope}
+    current = {
+        (min(a, b), max(a, b)) for a, b in existing.values_list("from_geoarea_id", "to_geoarea_id") if a != b
+    }
+    stale = current - edges if prune else set()
+    new = edges - current
+    if scope is not None:
+        hop_sources = hops.affected_by({pk for edge in stale | new for pk in edge})
+    with transaction.atomic():
+        stale = sorted(stale)
+        for start in range(0, len(stale), DELETE_BATCH):
+            match = Q(pk__in=[])
+            for low, high in stale[start:start + DELETE_BATCH]:
+                match |= Q(from_geoarea_id=low, to_geoarea_id=high) | Q(from_geoarea_id=high, to_geoarea_id=low)
+            through.objects.filter(match).delete()
+        through.objects.bulk_create(
+            [through(from_geoarea_id=a, to_geoarea_id=b) for low, high in new for a, b in ((low, high), (high, low))],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    if stale or new:
+        # Bulk writes send no m2m_changed: refresh hop rows and caches here
+        if scope is None:
+            hops.rebuild_all()
+        else:
+            hops.rebuild(hop_sources)
+        caching.bump(*NEIGHBOR_NAMESPACES)
+    return len(new), len(stale)
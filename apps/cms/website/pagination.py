@@ -0,0 +1,64 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class LimitPageNumberPagination(PageNumberPagination):
+    """Default page-number pagination that also honours ?limit= as the page size."""
+
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class PublishedCursorPagination(CursorPagination):
+    """Cursor over publish date, newest first; stable while pages are published."""
+
+    ordering = ('-first_published_at', '-id')
+    page_size = 24
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+def max_list_results():
+    return getattr(settings, 'API_MAX_LIST_RESULTS', 200)
+
+
+class OptInCursorPaginationMixin:
+    """Cursor pagination when requested (?cursor= or ?paginate=cursor).
+
+    Without it the legacy flat list is returned, truncated to ``?limit=`` and
+    never longer than ``settings.API_MAX_LIST_RESULTS``.
+    """
+
+    cursor_pagination_class = PublishedCursorPagination
+
+    def wants_cursor(self):
+        params = self.request.query_params
+        return 'cursor' in params or params.get('paginate') == 'cursor'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.cursor_pagination_class() if self.wants_cursor() else None
+        return self._paginator
+
+    def list_limit(self):
+        cap = max_list_results()
+        try:
+            limit = int(self.request.query_params.get('limit', cap))
+        except (TypeError, ValueError):
+            limit = cap
+        return max(0, min(limit, cap))
+
+    def bounded(self, queryset):
+        return queryset[:self.list_limit()]
+
+    def paginate_queryset(self, queryset):
+        if self.paginator is None:
+            return list(self.bounded(queryset))
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        if self.paginator is None:
+            return Response(data)
+        return super().get_paginated_response(data)
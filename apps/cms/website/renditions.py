@@ -0,0 +1,291 @@
+"""Rendition lookup and background generation for the API.
+
+Serializers register the image ids they are going to render, the resolver loads
+all of them (with their existing renditions) in two queries, and URLs are then
+answered from memory. Renditions that do not exist yet are never generated
+inside the request: the original file URL is returned and a ``RenditionJob`` row
+is queued instead.
+
+Jobs are drained either by a background thread in the web process (kicked on
+commit) or by ``manage.py prewarm_renditions``, which runs them in a bounded
+process pool. No external broker is involved.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+logger = logging.getLogger(__name__)
+
+API_SPEC = 'width-1200|format-webp'
+MAX_ATTEMPTS = 3
+BATCH_SIZE = 50
+STALE_AFTER = timedelta(minutes=10)
+# Cached API namespaces whose payloads embed rendition URLs
+MEDIA_NAMESPACES = ('services', 'projects', 'coverage', 'home')
+
+_executor = None
+
+
+def rendition_specs():
+    return list(getattr(settings, 'RENDITION_SPECS', None) or [API_SPEC])
+
+
+# ---- Job queue ----
+def enqueue(image_ids, specs=None, autorun=True, retry_failed=False):
+    """Queue renditions for the given images (all API specs by default).
+
+    Existing jobs that already finished are put back to pending, so a deleted
+    rendition gets regenerated. Jobs that used up ``MAX_ATTEMPTS`` stay failed
+    unless ``retry_failed`` is set (image re-uploaded, ``prewarm_renditions``).
+    With ``autorun`` the queue is drained by a background thread once the
+    transaction commits.
+    """
+    from .models import RenditionJob
+
+    image_ids = [i for i in dict.fromkeys(image_ids) if i]
+    specs = list(specs or rendition_specs())
+    if not image_ids:
+        return
+    RenditionJob.objects.bulk_create(
+        [RenditionJob(image_id=i, filter_spec=spec) for i in image_ids for spec in specs],
+        ignore_conflicts=True,
+    )
+    statuses = ('done', 'failed') if retry_failed else ('done',)
+    RenditionJob.objects.filter(
+        image_id__in=image_ids, filter_spec__in=specs, status__in=statuses
+    ).update(status='pending', attempts=0, error='')
+    if autorun:
+        transaction.on_commit(kick)
+
+
+def enqueue_missing(pairs):
+    """Queue (image_id, spec) pairs found missing while serving a request.
+
+    The read path only ever adds jobs: pairs that already have one (pending,
+    running, done or failed) are left alone, so a repeated GET costs a single
+    SELECT and takes no write lock. Putting finished jobs back to pending is
+    left to the explicit ``enqueue`` calls (upload, publish, prewarm).
+    """
+    from .models import RenditionJob
+
+    pairs = {(i, spec) for i, spec in pairs if i}
+    if not pairs:
+        return
+    existing = set(
+        RenditionJob.objects.filter(
+            image_id__in={i for i, _spec in pairs}, filter_spec__in={spec for _i, spec in pairs}
+        ).values_list('image_id', 'filter_spec')
+    )
+    new = sorted(pairs - existing)
+    if not new:
+        return
+    # A concurrent request may queue the same pair in between
+    RenditionJob.objects.bulk_create(
+        [RenditionJob(image_id=i, filter_spec=spec) for i, spec in new], ignore_conflicts=True
+    )
+    transaction.on_commit(kick)
+
+
+def kick():
+    """Drain pending jobs on a single background thread of this process."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='renditions')
+    _executor.submit(_drain_in_thread)
+
+
+def _drain_in_thread():
+    try:
+        process_jobs(workers=0)
+    except Exception:  # pragma: no cover - best effort
+        logger.exception("Background rendition drain failed")
+    finally:
+        connection.close()
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    # Never reuse a connection inherited from the parent process
+    connections.close_all()
+
+
+def _render(image_id, spec):
+    """Generate one rendition; returns an error string or ''."""
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        image.get_rendition(spec)
+        return ''
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+
+
+def _claim(limit):
+    from .models import RenditionJob
+
+    with transaction.atomic():
+        jobs = list(
+            RenditionJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('id')
+            .values_list('id', 'image_id', 'filter_spec', 'attempts')[:limit]
+        )
+        if jobs:
+            # Claim time, so a job that waited long in the queue does not look stale
+            RenditionJob.objects.filter(id__in=[j[0] for j in jobs]).update(status='running', updated_at=timezone.now())
+    return jobs
+
+
+def _finish(jobs, errors):
+    from django.db.models import F
+    from .models import RenditionJob
+
+    done = [job[0] for job, error in zip(jobs, errors, strict=True) if not error]
+    if done:
+        RenditionJob.objects.filter(id__in=done).update(status='done', attempts=F('attempts') + 1, error='')
+    for job, error in zip(jobs, errors, strict=True):
+        if error:
+            attempts = job[3] + 1
+            RenditionJob.objects.filter(id=job[0]).update(
+                status='pending' if attempts < MAX_ATTEMPTS else 'failed',
+                attempts=attempts,
+                error=error[:2000],
+            )
+    return len(done)
+
+
+def process_jobs(workers=None, limit=None):
+    """Run pending jobs until the queue is empty (or ``limit`` jobs ran).
+
+    ``workers`` > 1 renders in a process pool of that size; 0/1 renders in the
+    calling thread. Returns the number of renditions generated.
+    """
+    from .models import RenditionJob
+
+    if workers is None:
+        workers = getattr(settings, 'RENDITION_WORKERS', 2)
+    RenditionJob.objects.filter(status='running', updated_at__lt=timezone.now() - STALE_AFTER).update(status='pending')
+
+    pool = None
+    generated = 0
+    processed = 0
+    try:
+        while limit is None or processed < limit:
+            batch = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - processed)
+            jobs = _claim(batch)
+            if not jobs:
+                break
+            if workers > 1:
+                if pool is None:
+                    connections.close_all()
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                errors = list(pool.map(_render, [j[1] for j in jobs], [j[2] for j in jobs]))
+            else:
+                errors = [_render(j[1], j[2]) for j in jobs]
+            generated += _finish(jobs, errors)
+            processed += len(jobs)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if generated:
+        # Cached API responses may still point at original files
+        from .caching import bump
+        bump(*MEDIA_NAMESPACES)
+    return generated
+
+
+def page_image_ids(page):
+    """Every image id a ServicePage/ProjectPage exposes through the API."""
+    ids = []
+    for field in ('hero_id', 'before_image_id', 'after_image_id'):
+        ids.append(getattr(page, field, None))
+    for field in ('body', 'gallery'):
+        stream = getattr(page, field, None)
+        if stream is not None:
+            ids.extend(stream_image_ids(stream))
+    return [i for i in ids if i]
+
+
+def stream_image_ids(stream, block_types=('image',)):
+    """Image ids referenced by top-level image blocks, read from the raw JSON."""
+    ids = []
+    try:
+        for item in stream.raw_data:
+            if item.get('type') in block_types and item.get('value'):
+                ids.append(item['value'])
+    except Exception:
+        pass
+    return ids
+
+
+# ---- Request-scoped lookup ----
+class RenditionResolver:
+    """Request-scoped cache of images and their renditions."""
+
+    def __init__(self, request=None, specs=None):
+        self.request = request
+        self.specs = tuple(specs or rendition_specs())
+        self._pending = set()
+        self._images = {}
+        self._missing = set()
+        self._queued = set()
+
+    def add(self, *image_ids):
+        for image_id in image_ids:
+            if image_id and image_id not in self._images:
+                self._pending.add(image_id)
+
+    def add_stream(self, stream, block_types=('image',)):
+        self.add(*stream_image_ids(stream, block_types))
+
+    def fetch(self):
+        """Load every pending image plus its renditions (one query each)."""
+        if not self._pending:
+            return
+        ids, self._pending = self._pending, set()
+        images = get_image_model().objects.filter(pk__in=ids).prefetch_renditions(*self.specs)
+        for image in images:
+            self._images[image.pk] = image
+        for image_id in ids:
+            self._images.setdefault(image_id, None)
+
+    def get_image(self, image_id):
+        if image_id not in self._images:
+            self.add(image_id)
+            self.fetch()
+        return self._images.get(image_id)
+
+    def url(self, image, spec=API_SPEC):
+        """Absolute rendition URL for an image (or image id), or None if it is gone."""
+        image_id = getattr(image, 'pk', image)
+        image = self.get_image(image_id)
+        if image is None:
+            return None
+        try:
+            url = image.find_existing_rendition(Filter(spec=spec)).url
+        except image.get_rendition_model().DoesNotExist:
+            self._missing.add((image.pk, spec))
+            url = image.file.url
+        except Exception:
+            url = getattr(getattr(image, 'file', None), 'url', None)
+        if self.request is not None and url and not str(url).startswith('http'):
+            url = self.request.build_absolute_uri(url)
+        return url
+
+    @property
+    def missing(self):
+        return set(self._missing)
+
+    def flush(self):
+        """Queue jobs for every rendition found missing since the last flush."""
+        pairs = self._missing - self._queued
+        if pairs:
+            self._queued |= pairs
+            enqueue_missing(pairs)
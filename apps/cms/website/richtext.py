@@ -0,0 +1,109 @@
+"""Batched expansion of stored rich text for API responses.
+
+``expand_db_html`` resolves each page link, document link and image embed
+through the registered handlers. Those handlers already load all tags of one
+type in bulk, but only within a single call. ``RichTextExpander`` collects
+every rich-text value of a response and joins them with a separator. The
+whole batch is expanded in one rewriter pass, so link lookups cost a fixed
+number of queries per response instead of one or more per row.
+
+Image embeds are expanded before that pass. Their images are loaded with
+the renditions their formats need already prefetched, so the handler never
+queries per image.
+"""
+import logging
+
+from wagtail.images import get_image_model
+from wagtail.images.formats import get_image_format
+from wagtail.rich_text import expand_db_html
+from wagtail.rich_text.rewriters import FIND_EMBED_TAG, extract_attrs
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "\n<!--rich-text-batch-->\n"
+
+
+def _expand_image_embeds(html):
+    """Replace ``<embed embedtype="image">`` tags, loading images and renditions in bulk."""
+    matches = [(m, extract_attrs(m.group(1))) for m in FIND_EMBED_TAG.finditer(html)]
+    matches = [(m, attrs) for m, attrs in matches if attrs.get("embedtype") == "image"]
+    if not matches:
+        return html
+    formats = {}
+    for _m, attrs in matches:
+        try:
+            formats[attrs.get("format")] = get_image_format(attrs.get("format"))
+        except KeyError:
+            pass  # only an error if the image exists, like Wagtail's handler
+    specs = {f.filter_spec for f in formats.values()}
+    ids = {attrs.get("id") for _m, attrs in matches}
+    images = {
+        str(image.pk): image
+        for image in get_image_model().objects.filter(pk__in=[i for i in ids if i and i.isdigit()])
+        .prefetch_renditions(*specs)
+    }
+    parts, last = [], 0
+    for match, attrs in matches:
+        image = images.get(attrs.get("id"))
+        parts.append(html[last:match.start()])
+        if image is None:
+            parts.append('<img alt="">')
+        else:
+            image_format = formats.get(attrs.get("format")) or get_image_format(attrs.get("format"))
+            parts.append(image_format.image_to_html(image, attrs.get("alt", "")))
+        last = match.end()
+    parts.append(html[last:])
+    return "".join(parts)
+
+
+def expand_many(sources):
+    """``expand_db_html`` of each source, resolved in one pass."""
+    sources = [s or "" for s in sources]
+    if not sources:
+        return []
+    joined = SEPARATOR.join(sources)
+    expanded = expand_db_html(_expand_image_embeds(joined)).split(SEPARATOR)
+    if len(expanded) != len(sources):  # pragma: no cover - separator inside a value
+        return [expand_db_html(s) for s in sources]
+    return expanded
+
+
+class RichTextExpander:
+    """Request-scoped cache of expanded rich text, filled in batches."""
+
+    def __init__(self):
+        self._pending = set()
+        self._expanded = {}
+
+    def add(self, *sources):
+        for source in sources:
+            if source and source not in self._expanded:
+                self._pending.add(source)
+
+    def fetch(self):
+        if not self._pending:
+            return
+        sources, self._pending = list(self._pending), set()
+        try:
+            self._expanded.update(zip(sources, expand_many(sources), strict=True))
+        except Exception:
+            # One bad value (e.g. an embed with an unknown format) blanks only its own field
+            logger.warning("Batched rich-text expansion failed; expanding one by one", exc_info=True)
+            for source in sources:
+                self._expanded[source] = self._expand_one(source)
+
+    @staticmethod
+    def _expand_one(source):
+        try:
+            return expand_db_html(source)
+        except Exception:
+            logger.warning("Could not expand rich text", exc_info=True)
+            return ""
+
+    def expand(self, source):
+        if not source:
+            return ""
+        if source not in self._expanded:
+            self.add(source)
+            self.fetch()
+        return self._expanded[source]
@@ -1,24 +1,32 @@
+import logging
+
 from rest_framework import serializers
-import re
 from wagtail.images import get_image_model
-from .models import Service, Project, MediaAsset, Testimonial, ServiceArea, Lead
+from .models import Service, Project, MediaAsset, Testimonial, ServiceArea, Lead, HomePage
 from .models_pages import ServicePage, ProjectPage
-from wagtail.rich_text import expand_db_html
 try:
     from .models_local import GeoArea, ServiceCoverage
 except Exception:  # pragma: no cover
     GeoArea = None  # type: ignore
     ServiceCoverage = None  # type: ignore
 from website.models import SiteSettings
+from .renditions import API_SPEC, RenditionResolver
+from .richtext import RichTextExpander
+from .sanitize import sanitize_html
+from .streams import extract, refs, represent
 try:
     from .models_settings import LocalSEOSettings
 except Exception:  # pragma: no cover
     LocalSEOSettings = None  # type: ignore
 
+logger = logging.getLogger(__name__)
+
 Image = get_image_model()
 
 
-def rendition_url_abs(request, image, spec='width-1200|format-webp'):
+def rendition_url_abs(request, image, spec=API_SPEC, resolver=None):
+    if resolver is not None:
+        return resolver.url(image, spec)
     try:
         r = image.get_rendition(spec)
         url = r.url
@@ -29,6 +37,94 @@ def rendition_url_abs(request, image, spec='width-1200|format-webp'):
     return url
 
 
+class BatchedListSerializer(serializers.ListSerializer):
+    """Lets the child serializer prime request-scoped lookups for the whole page."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        self.child.prime(items)
+        data = super().to_representation(items)
+        self.child.resolver.flush()
+        return data
+
+
+class BatchedImagesMixin:
+    """Resolve every image of a result page through one RenditionResolver.
+
+    Subclasses implement ``collect_images(obj, resolver)``; list responses prime
+    the resolver for all rows up front, single objects on demand.
+    """
+
+    @property
+    def resolver(self):
+        resolver = self.context.get('renditions')
+        if resolver is None:
+            resolver = RenditionResolver(self.context.get('request'))
+            self.context['renditions'] = resolver
+        return resolver
+
+    def collect_images(self, obj, resolver):
+        pass
+
+    def prime(self, objs):
+        for obj in objs:
+            self.collect_images(obj, self.resolver)
+        self.resolver.fetch()
+
+    def stream_image(self, image_id):
+        """API value of an image block inside ``streams.represent`` output."""
+        image = self.resolver.get_image(image_id)
+        if image is None:
+            return None
+        return {'id': image.pk, 'url': self.resolver.url(image), 'alt': image.title}
+
+    def to_representation(self, instance):
+        self.collect_images(instance, self.resolver)
+        self.resolver.fetch()
+        data = super().to_representation(instance)
+        if not isinstance(self.parent, serializers.ListSerializer):
+            self.resolver.flush()
+        return data
+
+
+class BatchedRichTextMixin:
+    """Expand the rich text of a whole result page in one pass.
+
+    Subclasses implement ``collect_richtext(obj)`` returning stored rich-text
+    values; ``expand_richtext`` then answers from the primed batch.
+    """
+
+    @property
+    def richtext(self):
+        expander = self.context.get('richtext')
+        if expander is None:
+            expander = RichTextExpander()
+            self.context['richtext'] = expander
+        return expander
+
+    def collect_richtext(self, obj):
+        return ()
+
+    def expand_richtext(self, source):
+        return self.richtext.expand(source)
+
+    def rich_text_html(self, source):
+        """API value of a rich-text block inside ``streams.represent`` output."""
+        return sanitize_html(self.expand_richtext(source))
+
+    def prime(self, objs):
+        for obj in objs:
+            self.richtext.add(*self.collect_richtext(obj))
+        self.richtext.fetch()
+        super().prime(objs)
+
+    def to_representation(self, instance):
+        # No-op for primed list rows; single objects get one pass too
+        self.richtext.add(*self.collect_richtext(instance))
+        self.richtext.fetch()
+        return super().to_representation(instance)
+
+
 class MediaAssetSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
 
@@ -38,28 +134,7 @@ class MediaAssetSerializer(serializers.ModelSerializer):
 
     def get_url(self, obj):
         request = self.context.get('request')
-        return rendition_url_abs(request, obj.image)
-
-
-def _sanitize_html_basic(html: str) -> str:
-    """Very small sanitizer to remove obvious XSS vectors.
-    - strips <script>...</script>
-    - removes inline event handlers (on*)
-    - neutralizes javascript: URIs in href attributes
-    Note: Frontend also sanitizes. This keeps API reasonably safe.
-    """
-    if not html:
-        return ""
-    # Drop script blocks
-    html = re.sub(r"<\s*script[^>]*>.*?<\s*/\s*script\s*>", "", html, flags=re.I | re.S)
-    # Remove inline event handlers like onclick="..."
-    html = re.sub(r"\son\w+\s*=\s*\"[^\"]*\"", "", html, flags=re.I)
-    html = re.sub(r"\son\w+\s*=\s*'[^']*'", "", html, flags=re.I)
-    html = re.sub(r"\son\w+\s*=\s*[^\s>]+", "", html, flags=re.I)
-    # Neutralize javascript: links
-    html = re.sub(r"(?i)href\s*=\s*\"javascript:[^\"]*\"", 'href="#"', html)
-    html = re.sub(r"(?i)href\s*=\s*'javascript:[^']*'", "href='#'", html)
-    return html
+        return rendition_url_abs(request, obj.image, resolver=self.context.get('renditions'))
 
 
 class ServiceSerializer(serializers.ModelSerializer):
@@ -74,7 +149,7 @@ class ServiceSerializer(serializers.ModelSerializer):
         if not obj.hero:
             return None
         request = self.context.get('request')
-        return rendition_url_abs(request, obj.hero)
+        return rendition_url_abs(request, obj.hero, resolver=self.context.get('renditions'))
 
     def get_tags(self, obj):
         try:
@@ -83,7 +158,7 @@ class ServiceSerializer(serializers.ModelSerializer):
             return []
 
 
-class ServicePageSerializer(serializers.ModelSerializer):
+class ServicePageSerializer(BatchedRichTextMixin, BatchedImagesMixin, serializers.ModelSerializer):
     # Keep legacy shape: name, slug, description, icon
     name = serializers.SerializerMethodField()
     description = serializers.SerializerMethodField()
@@ -93,6 +168,7 @@ class ServicePageSerializer(serializers.ModelSerializer):
     gallery = serializers.SerializerMethodField()
     cta_hint = serializers.SerializerMethodField()
     description_html = serializers.SerializerMethodField()
+    body = serializers.SerializerMethodField()
 
     class Meta:
         model = ServicePage
@@ -107,7 +183,16 @@ class ServicePageSerializer(serializers.ModelSerializer):
             "gallery",
             "cta_hint",
             "description_html",
+            "body",
         ]
+        list_serializer_class = BatchedListSerializer
+
+    def collect_images(self, obj, resolver):
+        resolver.add(obj.hero_id)
+        resolver.add(*refs(obj, 'body').image_ids)
+
+    def collect_richtext(self, obj):
+        return [obj.intro] + refs(obj, 'body').richtext
 
     def get_name(self, obj):
         return obj.title
@@ -118,8 +203,8 @@ class ServicePageSerializer(serializers.ModelSerializer):
 
     def get_description_html(self, obj):
         try:
-            html = expand_db_html(getattr(obj, "intro", "") or "")
-            return _sanitize_html_basic(html)
+            html = self.expand_richtext(getattr(obj, "intro", "") or "")
+            return sanitize_html(html)
         except Exception:
             return ""
 
@@ -128,50 +213,33 @@ class ServicePageSerializer(serializers.ModelSerializer):
         return None
 
     def get_hero(self, obj):
-        img = getattr(obj, 'hero', None)
-        if not img:
+        if not obj.hero_id:
+            return None
+        url = self.resolver.url(obj.hero_id)
+        if url is None:
             return None
-        request = self.context.get('request')
-        try:
-            url = img.get_rendition('width-1200|format-webp').url
-        except Exception:
-            url = getattr(getattr(img, 'file', None), 'url', None)
-        if request is not None and url and not str(url).startswith('http'):
-            url = request.build_absolute_uri(url)
         return { 'url': url, 'alt': obj.title }
 
     def get_faqs(self, obj):
-        items = []
-        try:
-            for blk in obj.body:
-                if blk.block_type == 'faq' and isinstance(blk.value, dict):
-                    items.append({'q': blk.value.get('q') or '', 'a': str(blk.value.get('a') or '')})
-        except Exception:
-            pass
-        return items
+        return [
+            {'q': q, 'a': self.expand_richtext(a)}
+            for q, a in extract(obj, 'body').faqs
+        ]
 
     def get_gallery(self, obj):
         items = []
-        try:
-            for blk in obj.body:
-                if blk.block_type == 'image' and blk.value:
-                    img = blk.value
-                    try:
-                        url = img.get_rendition('width-1200|format-webp').url
-                    except Exception:
-                        url = getattr(getattr(img, 'file', None), 'url', None)
-                    items.append({ 'url': url, 'alt': obj.title })
-        except Exception:
-            pass
-        request = self.context.get('request')
-        for it in items:
-            if request is not None and it['url'] and not str(it['url']).startswith('http'):
-                it['url'] = request.build_absolute_uri(it['url'])
+        for image_id in extract(obj, 'body').image_ids:
+            url = self.resolver.url(image_id)
+            if url:
+                items.append({ 'url': url, 'alt': obj.title })
         return items
 
     def get_cta_hint(self, obj):
         return getattr(obj, 'cta_hint', '') or ''
 
+    def get_body(self, obj):
+        return represent(obj.body, image=self.stream_image, richtext=self.rich_text_html)
+
 
 class TestimonialSerializer(serializers.ModelSerializer):
     class Meta:
@@ -194,7 +262,8 @@ class ServiceAreaSerializer(serializers.ModelSerializer):
     def get_neighbors(self, obj):
         """Devuelve slugs de áreas vecinas si existe geo enlazada"""
         if hasattr(obj, 'geo') and obj.geo:
-            return list(obj.geo.neighbors.values_list('slug', flat=True))
+            # .all() so the viewset's prefetch is used
+            return [n.slug for n in obj.geo.neighbors.all()]
         return []
 
 
@@ -213,13 +282,13 @@ class ProjectSerializer(serializers.ModelSerializer):
         if not obj.before_image:
             return None
         request = self.context.get('request')
-        return rendition_url_abs(request, obj.before_image)
+        return rendition_url_abs(request, obj.before_image, resolver=self.context.get('renditions'))
 
     def get_after(self, obj):
         if not obj.after_image:
             return None
         request = self.context.get('request')
-        return rendition_url_abs(request, obj.after_image)
+        return rendition_url_abs(request, obj.after_image, resolver=self.context.get('renditions'))
 
     def get_tags(self, obj):
         try:
@@ -228,7 +297,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             return []
 
 
-class ProjectPageSerializer(serializers.ModelSerializer):
+class ProjectPageSerializer(BatchedRichTextMixin, BatchedImagesMixin, serializers.ModelSerializer):
     # Public shape compatible with requested schema
     images = serializers.SerializerMethodField()
     url = serializers.SerializerMethodField()
@@ -237,6 +306,13 @@ class ProjectPageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectPage
         fields = ["id", "title", "slug", "city", "images", "url", "intro_html"]
+        list_serializer_class = BatchedListSerializer
+
+    def collect_images(self, obj, resolver):
+        resolver.add(*refs(obj, 'gallery').image_ids)
+
+    def collect_richtext(self, obj):
+        return [getattr(obj, 'intro', '')]
 
     def get_url(self, obj):
         try:
@@ -248,39 +324,55 @@ class ProjectPageSerializer(serializers.ModelSerializer):
             return None
 
     def get_images(self, obj: ProjectPage):
-        request = self.context.get("request")
-        base = f"{request.scheme}://{request.get_host()}" if request else ""
-        items = []
-        try:
-            for block in obj.gallery:
-                if block.block_type == "image" and block.value:
-                    img = block.value
-                    try:
-                        rendition = img.get_rendition("width-1200|format-webp")
-                        url = base + rendition.url
-                    except Exception:
-                        url = base + (img.file.url if hasattr(img, "file") else "")
-
-                    items.append({
-                        "url": url,
-                        "alt": obj.title,
-                    })
-        except Exception:
-            pass
-        return items
+        return [
+            {"url": block["value"], "alt": obj.title}
+            for block in represent(obj.gallery, image=self.resolver.url)
+            if block["value"]
+        ]
 
     def get_intro_html(self, obj: ProjectPage):
         try:
             val = getattr(obj, 'intro', '') or ''
-            return _sanitize_html_basic(expand_db_html(val))
+            return sanitize_html(self.expand_richtext(val))
         except Exception:
             return ''
 
 
+class HomePageSerializer(BatchedImagesMixin, serializers.ModelSerializer):
+    body = serializers.SerializerMethodField()
+
+    class Meta:
+        model = HomePage
+        fields = ["id", "title", "slug", "body"]
+        list_serializer_class = BatchedListSerializer
+
+    def collect_images(self, obj, resolver):
+        resolver.add(*refs(obj, 'body').image_ids)
+
+    def get_body(self, obj):
+        return represent(obj.body, image=self.stream_image)
+
+
 class LeadSerializer(serializers.ModelSerializer):
+    # Optional visitor coordinates, only used to attribute the lead to a GeoArea
+    lat = serializers.FloatField(write_only=True, required=False, min_value=-90, max_value=90)
+    lng = serializers.FloatField(write_only=True, required=False, min_value=-180, max_value=180)
+
     class Meta:
         model = Lead
-        fields = ['name', 'email', 'phone', 'message', 'source_path', 'utm']
+        fields = ['name', 'email', 'phone', 'message', 'source_path', 'utm', 'lat', 'lng']
+
+    def create(self, validated_data):
+        lat = validated_data.pop('lat', None)
+        lng = validated_data.pop('lng', None)
+        if lat is not None and lng is not None:
+            from .geolocate import locate_geoarea_id
+            try:
+                validated_data['geoarea_id'] = locate_geoarea_id(lat, lng)
+            except Exception:
+                # Attribution is best effort; the lead itself must always be saved
+                logger.exception('Lead geolocation failed')
+        return super().create(validated_data)
 
 
 class ConfigSerializer(serializers.Serializer):
@@ -350,7 +442,7 @@ if GeoArea is not None:
             return obj.parent_city.slug if obj.parent_city_id else None
 
 if ServiceCoverage is not None:
-    class ServiceCoverageSerializer(serializers.ModelSerializer):
+    class ServiceCoverageSerializer(BatchedImagesMixin, serializers.ModelSerializer):
         service = serializers.SerializerMethodField()
         geo = serializers.SerializerMethodField()
         hero_image = serializers.SerializerMethodField()
@@ -368,6 +460,10 @@ if ServiceCoverage is not None:
                 "ready",
                 "reviews_summary",
             ]
+            list_serializer_class = BatchedListSerializer
+
+        def collect_images(self, obj, resolver):
+            resolver.add(obj.hero_media_id)
 
         def get_service(self, obj):
             return {"slug": obj.service.slug, "name": obj.service.title}
@@ -376,36 +472,61 @@ if ServiceCoverage is not None:
             return {"slug": obj.geoarea.slug, "name": obj.geoarea.name, "type": obj.geoarea.type}
 
         def get_hero_image(self, obj):
-            if not obj.hero_media:
+            if not obj.hero_media_id:
+                return None
+            url = self.resolver.url(obj.hero_media_id)
+            if url is None:
                 return None
-            request = self.context.get("request")
-            try:
-                url = obj.hero_media.get_rendition("width-1200|format-webp").url
-            except Exception:
-                url = getattr(getattr(obj.hero_media, "file", None), "url", None)
-            if request is not None and url and not url.startswith("http"):
-                url = request.build_absolute_uri(url)
             return {"url": url, "alt": obj.service.title}
 
         def get_ready(self, obj):
-            try:
-                return obj.status == "ready" and obj.passes_quality_minimum()
-            except Exception:
-                return False
+            return obj.status == "ready" and bool(obj.quality_ok)
 
         def get_reviews_summary(self, obj):
+            # Served from the per-geoarea aggregate; select_related('geoarea__review_stats')
+            # keeps this free of extra queries in list responses.
             try:
-                # Aggregate per geoarea; tie to service only if later model supports it
-                from .models import Testimonial  # avoid import cycle at module load
-                qs = Testimonial.objects.filter(geoarea=obj.geoarea).exclude(rating__isnull=True)
-                count = qs.count()
-                if count < 3:
-                    return None
-                # simple average
-                total = 0
-                for t in qs.values_list('rating', flat=True):
-                    total += int(t or 0)
-                avg = round(total / count, 2) if count else None
-                return {"count": count, "avg": avg}
+                stats = obj.geoarea.review_stats
             except Exception:
                 return None
+            return stats.summary(rollup=bool(self.context.get("reviews_rollup")))
+
+    class ServiceCoverageDetailSerializer(BatchedRichTextMixin, ServiceCoverageSerializer):
+        """Coverage with its local content; streams are rendered from the raw JSON."""
+        intro_html = serializers.SerializerMethodField()
+        pain_points = serializers.SerializerMethodField()
+        process_steps = serializers.SerializerMethodField()
+        permits = serializers.SerializerMethodField()
+
+        class Meta(ServiceCoverageSerializer.Meta):
+            fields = ServiceCoverageSerializer.Meta.fields + [
+                "intro_html",
+                "pain_points",
+                "process_steps",
+                "permits",
+                "starting_price_local",
+                "cta_local",
+            ]
+
+        STREAMS = ("pain_points_local", "process_steps_local", "permits_local")
+
+        def collect_richtext(self, obj):
+            sources = [obj.unique_intro]
+            for field in self.STREAMS:
+                sources += refs(obj, field).richtext
+            return sources
+
+        def _stream(self, obj, field):
+            return represent(getattr(obj, field), image=self.stream_image, richtext=self.rich_text_html)
+
+        def get_intro_html(self, obj):
+            return self.rich_text_html(obj.unique_intro)
+
+        def get_pain_points(self, obj):
+            return self._stream(obj, "pain_points_local")
+
+        def get_process_steps(self, obj):
+            return self._stream(obj, "process_steps_local")
+
+        def get_permits(self, obj):
+            return self._stream(obj, "permits_local")
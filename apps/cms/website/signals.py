@@ -0,0 +1,257 @@
+"""Signal handlers that keep denormalized data in sync with editorial changes.
+
+Connected from ``WebsiteConfig.ready``.
+"""
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from wagtail.images import get_image_model
+from wagtail.models import Site
+from wagtail.signals import page_published, page_slug_changed, page_unpublished, post_page_move
+
+from . import caching, geometry, hops, neighbors, renditions, sitemaps, snapshots, streams
+from .models import HomePage, Testimonial, ServiceArea, SiteSettings
+from .models_settings import LocalSEOSettings
+from .models_local import GeoArea, GeoAreaReviewStats, ServiceCoverage
+from .models_pages import ServicePage, ProjectPage, ProjectLookup
+
+
+# ---- Testimonials -> coverage quality + review aggregates ----
+@receiver(pre_save, sender=Testimonial)
+def _remember_testimonial_state(sender, instance, **kwargs):
+    # Remember the stored geoarea/rating so an edit can be applied as a delta
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            sender.objects.filter(pk=instance.pk).values_list("geoarea_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Testimonial)
+def _testimonial_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    previous_geoarea_id = previous[0] if previous else None
+    ServiceCoverage.refresh_quality_for_geoareas({instance.geoarea_id, previous_geoarea_id})
+    if previous:
+        GeoAreaReviewStats.apply(previous[0], previous[1], sign=-1)
+    GeoAreaReviewStats.apply(instance.geoarea_id, instance.rating)
+
+
+@receiver(post_delete, sender=Testimonial)
+def _testimonial_deleted(sender, instance, **kwargs):
+    ServiceCoverage.refresh_quality_for_geoareas({instance.geoarea_id})
+    GeoAreaReviewStats.apply(instance.geoarea_id, instance.rating, sign=-1)
+
+
+# ---- GeoArea hierarchy -> review rollups ----
+@receiver(pre_save, sender=GeoArea)
+def _remember_geoarea_parent(sender, instance, **kwargs):
+    instance._previous_parent_id = None
+    instance._previous_slug = None
+    instance._previous_center = None
+    if instance.pk:
+        previous = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("parent_city_id", "slug", "center_lat", "center_lng").first()
+        )
+        if previous:
+            instance._previous_parent_id, instance._previous_slug = previous[:2]
+            instance._previous_center = previous[2:]
+
+
+@receiver(post_save, sender=GeoArea)
+def _geoarea_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_parent_id", None)
+    if not created and previous != instance.parent_city_id:
+        GeoAreaReviewStats.reparent(instance.pk, previous, instance.parent_city_id)
+    if not created and getattr(instance, "_previous_slug", None) != instance.slug:
+        ProjectLookup.rebuild(instance.projects.values_list("pk", flat=True))
+    shape_changed = geometry.refresh(instance)
+    center = _point(instance.center_lat, instance.center_lng)
+    center_changed = _point(*(getattr(instance, "_previous_center", None) or (None, None))) != center
+    if getattr(settings, "GEOAREA_AUTO_NEIGHBORS", True) and (shape_changed or center_changed):
+        # Only adds edges: hand-picked neighbors are never removed by a save
+        # (``compute_neighbors`` prunes the whole graph on demand)
+        if center is not None or instance.geometries.exists():
+            neighbors.write(neighbors.compute_for(instance), scope=[instance.pk], prune=False)
+    if center_changed and not created:
+        # Hop rows carry center distances
+        hops.refresh_distances(instance.pk)
+
+
+def _point(lat, lng):
+    return None if lat is None or lng is None else (float(lat), float(lng))
+
+
+@receiver(pre_delete, sender=GeoArea)
+def _geoarea_deleting(sender, instance, **kwargs):
+    # Testimonials are detached with SET_NULL (no signals), so drop them from the city rollup here
+    if instance.parent_city_id:
+        GeoAreaReviewStats.reparent(instance.pk, instance.parent_city_id, None)
+    # Neighbor rows cascade without m2m_changed; remember who routed through this area
+    instance._hop_sources = hops.affected_by([instance.pk]) - {instance.pk}
+
+
+@receiver(post_delete, sender=GeoArea)
+def _geoarea_deleted_hops(sender, instance, **kwargs):
+    hops.rebuild(getattr(instance, "_hop_sources", ()))
+
+
+# ---- Multi-hop reachability ----
+@receiver(m2m_changed, sender=GeoArea.neighbors.through)
+def _geoarea_neighbors_hops(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action in ("pre_add", "pre_remove", "pre_clear"):
+        endpoints = {instance.pk} | set(pk_set or ())
+        if action == "pre_clear":
+            endpoints |= set(instance.neighbors.values_list("pk", flat=True))
+        # Read from the hop table before the graph changes
+        instance._hop_sources = hops.affected_by(endpoints)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        hops.rebuild(getattr(instance, "_hop_sources", None) or {instance.pk} | set(pk_set or ()))
+
+
+# ---- Rendition pre-generation ----
+@receiver(post_save, sender=get_image_model())
+def _image_saved(sender, instance, **kwargs):
+    # A new upload may fix a file that failed to render before
+    renditions.enqueue([instance.pk], retry_failed=True)
+
+
+@receiver(page_published, sender=ServicePage)
+@receiver(page_published, sender=ProjectPage)
+def _page_published_renditions(sender, instance, **kwargs):
+    renditions.enqueue(renditions.page_image_ids(instance))
+
+
+@receiver(page_published, sender=HomePage)
+def _home_published_renditions(sender, instance, **kwargs):
+    # Hero images, gallery items and service icons sit inside structs and lists
+    renditions.enqueue(streams.refs(instance, "body").image_ids)
+
+
+# ---- Project filter lookups ----
+def _rebuild_projects_for_city(slug):
+    ProjectLookup.rebuild(ProjectLookup.objects.filter(
+        kind=ProjectLookup.KIND_CITY, value=ProjectLookup.normalize(slug),
+    ).values_list("project_id", flat=True))
+
+
+@receiver(page_published, sender=ProjectPage)
+def _project_published_lookups(sender, instance, **kwargs):
+    ProjectLookup.rebuild([instance.pk])
+
+
+@receiver(m2m_changed, sender=ProjectPage.geoareas.through)
+def _project_geoareas_lookups(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        ProjectLookup.rebuild([instance.pk])
+    elif pk_set:
+        ProjectLookup.rebuild(pk_set)
+    elif action == "post_clear":
+        # Through rows are already gone; rebuild whatever still carries the area's key
+        _rebuild_projects_for_city(instance.slug)
+
+
+@receiver(post_delete, sender=GeoArea)
+def _geoarea_deleted_lookups(sender, instance, **kwargs):
+    _rebuild_projects_for_city(instance.slug)
+
+
+# ---- API snapshots ----
+@receiver(page_published, sender=ServicePage)
+@receiver(page_published, sender=ProjectPage)
+def _page_published_snapshot(sender, instance, **kwargs):
+    snapshots.refresh(instance)
+
+
+@receiver(post_save, sender=get_image_model())
+@receiver(pre_delete, sender=get_image_model())
+def _image_changed_snapshots(sender, instance, **kwargs):
+    # Replacing or deleting an image does not touch the pages' revisions
+    # (cached responses are invalidated through CACHE_DEPENDENCIES).
+    # Deletes are handled before the page FKs are set to NULL.
+    snapshots.drop_for_images([instance.pk])
+
+
+@receiver(post_page_move)
+@receiver(page_slug_changed)
+def _page_path_changed_snapshots(sender, instance, **kwargs):
+    # Payload URLs follow the tree; descendants get no new revision
+    if snapshots.drop_subtree(instance):
+        caching.bump(*SNAPSHOT_NAMESPACES)
+
+
+# ---- API response cache invalidation ----
+# model -> cached API namespaces built from it (see website.caching)
+CACHE_DEPENDENCIES = {
+    ServicePage: ("services", "coverage"),
+    ProjectPage: ("projects",),
+    Testimonial: ("testimonials", "coverage"),
+    ServiceArea: ("areas",),
+    GeoArea: ("geoareas", "areas", "coverage", "projects"),
+    ServiceCoverage: ("coverage",),
+    SiteSettings: ("config",),
+    LocalSEOSettings: ("config",),
+    Site: ("config", "home"),
+    HomePage: ("home",),
+    # Rendition URLs are embedded in these payloads (and their ETags)
+    get_image_model(): ("images", *renditions.MEDIA_NAMESPACES),
+}
+PAGE_MODELS = (ServicePage, ProjectPage, HomePage)
+# Namespaces of the payloads kept in PageSnapshot
+SNAPSHOT_NAMESPACES = tuple(dict.fromkeys(ns for model in snapshots.SERIALIZERS for ns in CACHE_DEPENDENCIES[model]))
+
+
+def _invalidate(sender, **kwargs):
+    caching.bump(*CACHE_DEPENDENCIES[sender])
+
+
+def _invalidate_m2m(namespaces):
+    def handler(sender, action, **kwargs):
+        if action in ("post_add", "post_remove", "post_clear"):
+            caching.bump(*namespaces)
+    return handler
+
+
+for _model in CACHE_DEPENDENCIES:
+    _uid = f"api-cache-{_model._meta.label_lower}"
+    if _model in PAGE_MODELS:
+        # Only live content is served, so drafts do not invalidate anything
+        page_published.connect(_invalidate, sender=_model, dispatch_uid=f"{_uid}-published")
+        page_unpublished.connect(_invalidate, sender=_model, dispatch_uid=f"{_uid}-unpublished")
+    else:
+        post_save.connect(_invalidate, sender=_model, dispatch_uid=f"{_uid}-save")
+    post_delete.connect(_invalidate, sender=_model, dispatch_uid=f"{_uid}-delete")
+
+_neighbors_changed = _invalidate_m2m(("geoareas", "areas", "coverage"))
+_project_geoareas_changed = _invalidate_m2m(("projects",))
+m2m_changed.connect(_neighbors_changed, sender=GeoArea.neighbors.through, dispatch_uid="api-cache-geoarea-neighbors")
+m2m_changed.connect(_project_geoareas_changed, sender=ProjectPage.geoareas.through, dispatch_uid="api-cache-project-geoareas")
+
+
+# ---- Sitemap files ----
+# model -> sitemap sections listing it (see website.sitemaps)
+SITEMAP_DEPENDENCIES = {
+    ServicePage: ("services", "coverage"),
+    ProjectPage: ("projects",),
+    ServiceArea: ("areas",),
+    GeoArea: ("areas", "coverage"),
+    ServiceCoverage: ("coverage",),
+    Testimonial: ("coverage",),  # flips coverage quality_ok
+}
+
+
+def _sitemaps_dirty(sender, **kwargs):
+    sitemaps.mark_dirty(*SITEMAP_DEPENDENCIES[sender])
+
+
+for _model in SITEMAP_DEPENDENCIES:
+    _uid = f"sitemaps-{_model._meta.label_lower}"
+    if _model in PAGE_MODELS:
+        page_published.connect(_sitemaps_dirty, sender=_model, dispatch_uid=f"{_uid}-published")
+        page_unpublished.connect(_sitemaps_dirty, sender=_model, dispatch_uid=f"{_uid}-unpublished")
+    else:
+        post_save.connect(_sitemaps_dirty, sender=_model, dispatch_uid=f"{_uid}-save")
+    post_delete.connect(_sitemaps_dirty, sender=_model, dispatch_uid=f"{_uid}-delete")
@@ -0,0 +1,45 @@
+"""Process-wide cache of the merged site configuration served by /api/config/.
+
+Entries are keyed by the request host and tagged with the shared "config"
+namespace version (bumped by the Site/SiteSettings/LocalSEOSettings signals),
+so a settings save in any process invalidates every worker's copy. In steady
+state answering a request costs one shared-cache read and no DB queries.
+"""
+import threading
+from collections import OrderedDict
+
+from wagtail.models import Site as WagtailSite
+
+from .caching import get_versions
+from .serializers import ConfigSerializer
+
+MAX_HOSTS = 64
+
+_configs = OrderedDict()
+_lock = threading.Lock()
+
+
+def _resolve(request):
+    site = WagtailSite.find_for_request(request) or WagtailSite.objects.first()
+    return ConfigSerializer.from_site(site)
+
+
+def get_site_config(request):
+    # Read the version before building so a save racing with us forces a rebuild
+    (version,) = get_versions('config')
+    host = request.get_host()
+    entry = _configs.get(host)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    data = _resolve(request)
+    with _lock:
+        _configs[host] = (version, data)
+        _configs.move_to_end(host)
+        while len(_configs) > MAX_HOSTS:
+            _configs.popitem(last=False)
+    return data
+
+
+def clear():
+    with _lock:
+        _configs.clear()
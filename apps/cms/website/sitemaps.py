@@ -0,0 +1,256 @@
+"""Sitemap files for the public site, written to storage ahead of time.
+
+Each section (services, projects, areas, coverage) is streamed from an
+ordered ``.iterator()`` query into child sitemaps of at most
+``MAX_URLS`` URLs each (``sitemaps/sitemap-<section>-<n>.xml``), plus a small
+JSON manifest listing its files and their newest ``lastmod``. The index
+(``sitemaps/sitemap.xml``) is rebuilt from the four manifests, so rebuilding
+one section never has to re-read the others.
+
+Signal handlers mark sections dirty; they are rebuilt on a background
+thread once the transaction commits, so publishing stays fast and crawler
+hits only read finished files (served by ``sitemap_file``). Files are written
+under a temporary name and moved over the old one, so a crawler never sees a
+missing file mid-rebuild. ``manage.py build_sitemaps`` rebuilds everything.
+
+Page URLs use ``SITEMAP_BASE_URL`` (the public site); the index points at the
+child files on ``SITEMAP_FILES_BASE_URL``, the origin that serves them.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.http import FileResponse, Http404
+
+logger = logging.getLogger(__name__)
+
+MAX_URLS = 50000
+DIRECTORY = "sitemaps"
+INDEX_NAME = "sitemap.xml"
+SECTIONS = ("services", "projects", "areas", "coverage")
+CHUNK_SIZE = 2000
+
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+_pending = set()
+_lock = threading.Lock()
+_executor = None
+
+
+def base_url():
+    return getattr(settings, "SITEMAP_BASE_URL", "http://localhost:3000").rstrip("/")
+
+
+def files_base_url():
+    return getattr(settings, "SITEMAP_FILES_BASE_URL", "http://localhost:8000").rstrip("/")
+
+
+def _lastmod(*values):
+    values = [v for v in values if v is not None]
+    return max(values).isoformat(timespec="seconds") if values else None
+
+
+# ---- Sources: (path, lastmod) in a stable order ----
+def _services():
+    from .models_pages import ServicePage
+
+    rows = ServicePage.objects.live().public().order_by("id").values_list("slug", "last_published_at")
+    for slug, published in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f"/services/{slug}", _lastmod(published)
+
+
+def _projects():
+    from .models_pages import ProjectPage
+
+    rows = ProjectPage.objects.live().public().order_by("id").values_list("slug", "last_published_at")
+    for slug, published in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f"/portfolio/{slug}", _lastmod(published)
+
+
+def _areas():
+    # /areas/<slug> pages are ServiceAreas; their content comes from the linked GeoArea
+    from .models import ServiceArea
+
+    rows = ServiceArea.objects.order_by("id").values_list("slug", "geo__updated_at")
+    for slug, updated in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f"/areas/{slug}", _lastmod(updated)
+
+
+def _coverage():
+    from .models_local import ServiceCoverage
+    from .models_pages import ServicePage
+
+    rows = (
+        ServiceCoverage.objects.filter(
+            status="ready", quality_ok=True, service__in=ServicePage.objects.live().public(),
+        )
+        .order_by("id")
+        .values_list("service__slug", "geoarea__slug", "updated_at", "geoarea__updated_at", "service__last_published_at")
+    )
+    for service, city, *stamps in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f"/services/{service}/{city}", _lastmod(*stamps)
+
+
+SOURCES = {"services": _services, "projects": _projects, "areas": _areas, "coverage": _coverage}
+
+
+# ---- Storage ----
+def _path(name):
+    return f"{DIRECTORY}/{name}"
+
+
+def _local_path(name):
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:
+        return None
+
+
+def _save(name, fileobj):
+    """Store ``fileobj`` as ``sitemaps/<name>``, replacing any previous file; returns the stored name."""
+    path = _path(name)
+    target = _local_path(path)
+    if target is not None:
+        # Local storage: write a uniquely named sibling, then rename it over the old file
+        temp = default_storage.save(_path(f"tmp-{name}"), fileobj)
+        os.replace(_local_path(temp), target)
+        return name
+    # Remote storages cannot rename; overwrite and keep whatever name the storage chose
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return os.path.basename(default_storage.save(path, fileobj))
+
+
+class _ChunkWriter:
+    """Streams ``<url>`` entries into a spooled temp file until it is saved."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.lastmod = None
+        self.file = tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+b")
+        self.file.write(f"{_XML_HEAD}<urlset {_NS}>\n".encode("utf-8"))
+
+    def add(self, loc, lastmod):
+        entry = f"<url><loc>{escape(loc)}</loc>"
+        if lastmod:
+            entry += f"<lastmod>{lastmod}</lastmod>"
+            self.lastmod = max(self.lastmod or lastmod, lastmod)
+        self.file.write((entry + "</url>\n").encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        self.file.write(b"</urlset>\n")
+        self.file.seek(0)
+        stored = _save(self.name, File(self.file, name=self.name))
+        self.file.close()
+        return [stored, self.lastmod]
+
+
+def _manifest_name(section):
+    return f"sitemap-{section}.json"
+
+
+def read_manifest(section):
+    try:
+        with default_storage.open(_path(_manifest_name(section))) as fh:
+            return json.loads(fh.read())
+    except (FileNotFoundError, OSError, ValueError):
+        return []
+
+
+def build_section(section, max_urls=MAX_URLS):
+    """Rewrite the child sitemaps of one section; returns its manifest ``[[name, lastmod]]``."""
+    origin = base_url()
+    files = []
+    writer = None
+    for path, lastmod in SOURCES[section]():
+        if writer is None:
+            writer = _ChunkWriter(f"sitemap-{section}-{len(files) + 1}.xml")
+        writer.add(origin + path, lastmod)
+        if writer.count >= max_urls:
+            files.append(writer.close())
+            writer = None
+    if writer is not None:
+        files.append(writer.close())
+
+    # Drop chunks left over from a previously larger section
+    for name, _lastmod in read_manifest(section):
+        if name not in {f[0] for f in files} and default_storage.exists(_path(name)):
+            default_storage.delete(_path(name))
+    _save(_manifest_name(section), ContentFile(json.dumps(files).encode("utf-8")))
+    return files
+
+
+def build_index():
+    origin = files_base_url()
+    parts = [f"{_XML_HEAD}<sitemapindex {_NS}>\n"]
+    for section in SECTIONS:
+        for name, lastmod in read_manifest(section):
+            entry = f"<sitemap><loc>{escape(f'{origin}/{DIRECTORY}/{name}')}</loc>"
+            if lastmod:
+                entry += f"<lastmod>{lastmod}</lastmod>"
+            parts.append(entry + "</sitemap>\n")
+    parts.append("</sitemapindex>\n")
+    _save(INDEX_NAME, ContentFile("".join(parts).encode("utf-8")))
+
+
+def build(sections=SECTIONS, max_urls=MAX_URLS):
+    """Rebuild the given sections and the index; returns ``{section: manifest}``."""
+    result = {}
+    for section in sections:
+        result[section] = build_section(section, max_urls=max_urls)
+    build_index()
+    return result
+
+
+# Optional "_<random>" suffix: a remote storage may not reuse a name right away
+_SERVED_NAME = re.compile(r"^sitemap(-[a-z]+-\d+)?(_[A-Za-z0-9]{7})?\.xml$")
+
+
+def sitemap_file(request, name=INDEX_NAME):
+    """Serve a stored sitemap file (the index by default)."""
+    path = _path(name)
+    if not _SERVED_NAME.match(name) or not default_storage.exists(path):
+        raise Http404("No such sitemap")
+    return FileResponse(default_storage.open(path), content_type="application/xml")
+
+
+# ---- Incremental rebuilds ----
+def mark_dirty(*sections):
+    """Rebuild ``sections`` in the background after the current transaction commits."""
+    with _lock:
+        _pending.update(sections)
+    transaction.on_commit(kick)
+
+
+def kick():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sitemaps")
+    _executor.submit(_drain_in_thread)
+
+
+def _drain_in_thread():
+    with _lock:
+        sections = [s for s in SECTIONS if s in _pending]
+        _pending.clear()
+    if not sections:
+        return
+    try:
+        build(sections)
+    except Exception:  # pragma: no cover - best effort
+        logger.exception("Background sitemap build failed")
+    finally:
+        connection.close()
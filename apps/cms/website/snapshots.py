@@ -0,0 +1,197 @@
+"""Publish-time JSON snapshots of ServicePage/ProjectPage API payloads.
+
+Payloads are serialized once per live revision with a placeholder origin in
+every absolute URL, stored in ``PageSnapshot`` and served as bytes; the
+placeholder is swapped for the requesting origin on the way out. Pages without
+a usable snapshot are serialized live (in one batch) and their snapshot is
+written as a side effect, unless some renditions were still missing.
+
+Changes that do not create a revision (an image edited or deleted, a page
+moved or an ancestor renamed) drop the affected snapshots through
+``drop_for_images`` / ``drop_subtree``; they are rebuilt on next read.
+"""
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models_pages import PageSnapshot, ServicePage, ProjectPage
+from .renditions import RenditionResolver, page_image_ids
+from .serializers import ServicePageSerializer, ProjectPageSerializer
+
+# Bump whenever the serialized shape of a page changes so stale snapshots are ignored
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HOST = 'snapshot.invalid'
+SNAPSHOT_ORIGIN = f'http://{SNAPSHOT_HOST}'
+
+SERIALIZERS = {
+    ServicePage: ServicePageSerializer,
+    ProjectPage: ProjectPageSerializer,
+}
+
+
+class SnapshotRequest(HttpRequest):
+    """Request stand-in whose absolute URLs use the placeholder origin."""
+
+    def get_host(self):
+        return SNAPSHOT_HOST
+
+    def _get_scheme(self):
+        return 'http'
+
+
+def _origin(request):
+    return request.build_absolute_uri('/')[:-1]
+
+
+def _render(data):
+    return JSONRenderer().render(data).decode('utf-8')
+
+
+def serialize_pages(pages, serializer_class=None):
+    """Serialize pages against the placeholder origin.
+
+    Returns ``{page_id: (payload, complete)}``; ``complete`` is False when a
+    rendition had to fall back to the original file and will change later.
+    """
+    pages = list(pages)
+    if not pages:
+        return {}
+    serializer_class = serializer_class or SERIALIZERS[type(pages[0])]
+    request = SnapshotRequest()
+    resolver = RenditionResolver(request)
+    data = serializer_class(pages, many=True, context={'request': request, 'renditions': resolver}).data
+    missing_images = {image_id for image_id, _spec in resolver.missing}
+    return {
+        page.pk: (_render(row), not (missing_images & set(page_image_ids(page))))
+        for page, row in zip(pages, data, strict=True)
+    }
+
+
+def store(payloads, pages):
+    """Upsert complete payloads for the given pages' live revisions."""
+    now = timezone.now()
+    rows = [
+        PageSnapshot(page_id=page.pk, revision_id=page.live_revision_id, version=SNAPSHOT_VERSION,
+                     payload=payloads[page.pk][0], updated_at=now)
+        for page in pages
+        if page.pk in payloads and payloads[page.pk][1]
+    ]
+    if rows:
+        PageSnapshot.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['page'],
+            update_fields=['revision_id', 'version', 'payload', 'updated_at'],
+        )
+
+
+def refresh(page):
+    """Rebuild the snapshot of a freshly published page."""
+    page = page.specific
+    if type(page) not in SERIALIZERS:
+        return
+    store(serialize_pages([page]), [page])
+
+
+def drop_for_images(image_ids):
+    """Delete the snapshots of pages showing any of ``image_ids``; returns their page ids."""
+    image_ids = set(image_ids)
+    if not image_ids:
+        return []
+    snapshot_ids = PageSnapshot.objects.values_list('page_id', flat=True)
+    stale = [
+        page.pk
+        for model in SERIALIZERS
+        for page in model.objects.filter(pk__in=snapshot_ids)
+        if image_ids & set(page_image_ids(page))
+    ]
+    if stale:
+        PageSnapshot.objects.filter(page_id__in=stale).delete()
+    return stale
+
+
+def drop_subtree(page):
+    """Delete the snapshots of ``page`` and its descendants; returns how many were dropped."""
+    pages = page.get_descendants(inclusive=True)
+    deleted, _by_model = PageSnapshot.objects.filter(page__in=pages).delete()
+    return deleted
+
+
+def payloads_for(pages, serializer_class=None):
+    """Payloads for ``pages`` in order: stored snapshots first, live for the rest."""
+    pages = list(pages)
+    live = {p.pk: p.live_revision_id for p in pages}
+    current = {
+        s.page_id: s.payload
+        for s in PageSnapshot.objects.filter(page_id__in=list(live), version=SNAPSHOT_VERSION)
+        .only('page_id', 'revision_id', 'payload')
+        if s.revision_id is not None and s.revision_id == live[s.page_id]
+    }
+    stale = [p for p in pages if p.pk not in current]
+    if stale:
+        fresh = serialize_pages(stale, serializer_class)
+        store(fresh, stale)
+        current.update({pk: payload for pk, (payload, _complete) in fresh.items()})
+    return [current[p.pk] for p in pages]
+
+
+RESULTS_PLACEHOLDER = '__snapshot_results__'
+
+
+class RawJSON(str):
+    """Already-serialized JSON (e.g. a stored payload) to embed verbatim via ``render_composite``."""
+
+
+def render_composite(request, data):
+    """Render ``data`` to a JSON response, splicing ``RawJSON`` values in as-is."""
+    raw = []
+
+    def mark(value):
+        if isinstance(value, RawJSON):
+            raw.append(value)
+            return f'__raw_json_{len(raw) - 1}__'
+        if isinstance(value, dict):
+            return {k: mark(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [mark(v) for v in value]
+        return value
+
+    body = _render(mark(data))
+    for index, payload in enumerate(raw):
+        body = body.replace(f'"__raw_json_{index}__"', payload, 1)
+    return HttpResponse(body.replace(SNAPSHOT_ORIGIN, _origin(request)), content_type='application/json')
+
+
+def json_response(request, payloads, many, paginator=None):
+    body = ('[' + ','.join(payloads) + ']') if many else payloads[0]
+    if paginator is not None:
+        # Reuse the paginator's envelope (next/previous/...), splicing in the raw rows
+        envelope = _render(paginator.get_paginated_response(RESULTS_PLACEHOLDER).data)
+        body = envelope.replace(f'"{RESULTS_PLACEHOLDER}"', body, 1)
+    return HttpResponse(body.replace(SNAPSHOT_ORIGIN, _origin(request)), content_type='application/json')
+
+
+class SnapshotResponseMixin:
+    """ReadOnlyModelViewSet mixin serving ServicePage/ProjectPage payloads from snapshots.
+
+    Only JSON responses are served this way; the browsable API falls back to the
+    regular serializer path.
+    """
+
+    def _wants_json(self, request):
+        return getattr(request.accepted_renderer, 'format', 'json') == 'json'
+
+    def list(self, request, *args, **kwargs):
+        if not self._wants_json(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        pages = list(queryset) if page is None else page
+        payloads = payloads_for(pages, self.get_serializer_class())
+        return json_response(request, payloads, many=True, paginator=self.paginator)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self._wants_json(request):
+            return super().retrieve(request, *args, **kwargs)
+        page = self.get_object()
+        return json_response(request, payloads_for([page], self.get_serializer_class()), many=False)
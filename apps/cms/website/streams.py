@@ -0,0 +1,255 @@
+"""Derived views of StreamField content, read straight from the raw JSON.
+
+Iterating a ``StreamValue`` builds block objects for every child (and looks
+up images for image blocks) just to read a few values. ``extract`` walks
+``stream.raw_data`` once instead and collects everything the serializers
+and quality checks use:
+
+* ``faqs``: ``(question, answer_source)`` of ``faq`` blocks
+* ``image_ids``: ids of top-level ``image`` blocks
+* ``module_count``: number of top-level blocks
+* ``word_count`` / ``inline_images``: words and ``<img`` tags in rich-text
+  values (``paragraph`` blocks and the ``text``/``a`` members of structs)
+
+Results are memoized on the instance per field and revision, so a
+serializer touching several fields of one page pays for a single walk.
+
+``represent`` produces the API representation of a whole stream the same
+way: a plan compiled once per block definition maps raw values to output.
+Only image ids and rich-text sources are handed to callbacks, so callers
+can resolve them in bulk (``stream_refs`` lists them up front).
+"""
+import re
+
+from wagtail import blocks
+from wagtail.images.blocks import ImageChooserBlock
+
+RICHTEXT_KEYS = ("text", "a")
+
+_TAG = re.compile(r"<[^>]+>")
+_IMG = re.compile(r"<img ")
+
+
+def count_words(html):
+    return len(_TAG.sub(" ", html or "").split())
+
+
+class StreamExtract:
+    __slots__ = ("faqs", "image_ids", "module_count", "word_count", "inline_images")
+
+    def __init__(self):
+        self.faqs = []
+        self.image_ids = []
+        self.module_count = 0
+        self.word_count = 0
+        self.inline_images = 0
+
+    def _text(self, html):
+        html = str(html or "")
+        self.word_count += count_words(html)
+        self.inline_images += len(_IMG.findall(html))
+
+
+def _raw(stream):
+    if stream is None:
+        return []
+    raw = getattr(stream, "raw_data", stream)
+    return raw if isinstance(raw, (list, tuple)) else list(raw or [])
+
+
+def walk(raw):
+    """``StreamExtract`` of a raw stream (a list of ``{"type", "value"}`` dicts)."""
+    result = StreamExtract()
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        result.module_count += 1
+        block_type, value = item.get("type"), item.get("value")
+        if block_type == "image":
+            if value:
+                result.image_ids.append(value)
+        elif isinstance(value, dict):
+            if block_type == "faq":
+                result.faqs.append((value.get("q") or "", value.get("a") or ""))
+            for key in RICHTEXT_KEYS:
+                if key in value:
+                    result._text(value[key])
+        elif isinstance(value, str):
+            result._text(value)
+    return result
+
+
+def _revision(instance):
+    return getattr(instance, "latest_revision_id", None) or getattr(instance, "updated_at", None)
+
+
+def _memoized(instance, field, kind, compute):
+    stream = getattr(instance, field, None)
+    memo = instance.__dict__.setdefault("_stream_extracts", {})
+    key = (field, kind, _revision(instance))
+    entry = memo.get(key)
+    # The stream object is part of the key: assigning new content replaces it
+    if entry is not None and entry[0] is stream:
+        return entry[1]
+    result = compute(stream)
+    memo[key] = (stream, result)
+    return result
+
+
+def extract(instance, field):
+    """Memoized ``walk`` of ``instance.<field>`` for the instance's current revision."""
+    return _memoized(instance, field, "extract", lambda stream: walk(_raw(stream)))
+
+
+# ---- API representation ----
+class StreamRefs:
+    """Image ids and rich-text sources referenced by a stored stream."""
+
+    __slots__ = ("image_ids", "richtext")
+
+    def __init__(self):
+        self.image_ids = []
+        self.richtext = []
+
+
+def _identity(value):
+    return value
+
+
+class _Plan:
+    """Raw value -> API value for one block definition, plus reference collection."""
+
+    __slots__ = ("represent", "collect")
+
+    def __init__(self, represent, collect=None):
+        self.represent = represent
+        self.collect = collect
+
+
+_SIMPLE_BLOCKS = (
+    blocks.CharBlock, blocks.TextBlock, blocks.URLBlock, blocks.EmailBlock, blocks.IntegerBlock,
+    blocks.FloatBlock, blocks.BooleanBlock, blocks.RegexBlock, blocks.ChoiceBlock, blocks.RawHTMLBlock,
+)
+
+
+def _compile(block):
+    if isinstance(block, blocks.StreamBlock):
+        children = {name: _compile(child) for name, child in block.child_blocks.items()}
+
+        def represent(raw, hooks):
+            out = []
+            for item in raw or ():
+                plan = children.get(item.get("type"))
+                if plan is not None:  # block types removed from the definition are skipped
+                    out.append({"type": item["type"], "value": plan.represent(item.get("value"), hooks), "id": item.get("id")})
+            return out
+
+        def collect(raw, refs):
+            for item in raw or ():
+                plan = children.get(item.get("type"))
+                if plan is not None and plan.collect:
+                    plan.collect(item.get("value"), refs)
+
+        return _Plan(represent, collect)
+
+    if isinstance(block, blocks.StructBlock):
+        children = [
+            (name, _compile(child), child.get_prep_value(child.get_default()))
+            for name, child in block.child_blocks.items()
+        ]
+
+        def represent(raw, hooks):
+            raw = raw or {}
+            return {name: plan.represent(raw.get(name, default), hooks) for name, plan, default in children}
+
+        def collect(raw, refs):
+            raw = raw or {}
+            for name, plan, default in children:
+                if plan.collect:
+                    plan.collect(raw.get(name, default), refs)
+
+        return _Plan(represent, collect)
+
+    if isinstance(block, blocks.ListBlock):
+        child = _compile(block.child_block)
+
+        def items(raw):
+            # Current format wraps items as {"type": "item", "value": ..., "id": ...}
+            for item in raw or ():
+                yield item["value"] if isinstance(item, dict) and item.get("type") == "item" and "value" in item else item
+
+        def represent(raw, hooks):
+            return [child.represent(value, hooks) for value in items(raw)]
+
+        def collect(raw, refs):
+            if child.collect:
+                for value in items(raw):
+                    child.collect(value, refs)
+
+        return _Plan(represent, collect)
+
+    if isinstance(block, ImageChooserBlock):
+        def collect(raw, refs):
+            if raw:
+                refs.image_ids.append(raw)
+
+        return _Plan(lambda raw, hooks: hooks["image"](raw) if raw else None, collect)
+
+    if isinstance(block, blocks.RichTextBlock):
+        def collect(raw, refs):
+            if raw:
+                refs.richtext.append(raw)
+
+        return _Plan(lambda raw, hooks: hooks["richtext"](raw or ""), collect)
+
+    if isinstance(block, _SIMPLE_BLOCKS):
+        return _Plan(lambda raw, hooks: raw)
+
+    # Anything else goes through the block once (still no per-stream deserialization)
+    return _Plan(lambda raw, hooks: block.get_api_representation(block.to_python(raw)))
+
+
+_plans = {}
+
+
+def _plan(stream_block):
+    plan = _plans.get(id(stream_block))
+    if plan is None or plan[0] is not stream_block:
+        plan = _plans[id(stream_block)] = (stream_block, _compile(stream_block))
+    return plan[1]
+
+
+def raw_refs(stream_block, raw):
+    """``StreamRefs`` of raw stream items of ``stream_block``."""
+    found = StreamRefs()
+    _plan(stream_block).collect(raw, found)
+    return found
+
+
+def stream_refs(stream):
+    """``StreamRefs`` of a StreamValue, read from its raw JSON."""
+    if stream is None:
+        return StreamRefs()
+    return raw_refs(stream.stream_block, _raw(stream))
+
+
+def refs(instance, field):
+    """Memoized ``stream_refs`` of ``instance.<field>``."""
+    return _memoized(instance, field, "refs", stream_refs)
+
+
+def represent_raw(stream_block, raw, image=_identity, richtext=_identity):
+    """API representation of raw stream items of ``stream_block`` (see ``represent``)."""
+    return _plan(stream_block).represent(raw, {"image": image, "richtext": richtext})
+
+
+def represent(stream, image=_identity, richtext=_identity):
+    """``stream_block.get_api_representation(stream)`` computed from the raw JSON.
+
+    ``image`` maps an image id to its API value and ``richtext`` a stored
+    rich-text source to its API value. With the defaults the output matches
+    Wagtail's, except that missing images keep their id.
+    """
+    if stream is None:
+        return []
+    return represent_raw(stream.stream_block, _raw(stream), image, richtext)
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+from website import site_config
+from website.caching import bump, get_versions
+from website.models import SiteSettings, Testimonial
+
+MEDIA = tempfile.mkdtemp()
+
+class TestApiResponseCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Testimonial.objects.create(name="Ann", rating=5, quote="Great")
+
+    def test_cached_until_model_changes(self):
+        first = self.client.get("/api/testimonials/")
+        assert first["X-Cache"] == "MISS"
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/testimonials/")
+        assert second["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+
+        Testimonial.objects.create(name="Bob", rating=4, quote="Good")
+        third = self.client.get("/api/testimonials/")
+        assert third["X-Cache"] == "MISS"
+        assert third.json()["count"] == 2
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get("/api/testimonials/?page=1")
+        assert self.client.get("/api/testimonials/")["X-Cache"] == "MISS"
+
+    def test_bump_moves_version_forward(self):
+        (before,) = get_versions("testimonials")
+        bump("testimonials")
+        (after,) = get_versions("testimonials")
+        assert after > before
+
+
+@override_settings(MEDIA_ROOT=MEDIA)
+class TestConditionalGet(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_etag_revalidation_skips_the_view(self):
+        self.client.get("/api/config/")  # creates the settings rows (which bumps "config")
+        first = self.client.get("/api/config/")
+        etag = first["ETag"]
+        assert first.has_header("Last-Modified")
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/config/", HTTP_IF_NONE_MATCH=etag)
+        assert again.status_code == 304
+
+        bump("config")
+        assert self.client.get("/api/config/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_depends_on_url(self):
+        a = self.client.get("/api/testimonials/")["ETag"]
+        b = self.client.get("/api/testimonials/?page=1")["ETag"]
+        assert a != b
+
+    def test_image_changes_invalidate_media_payloads(self):
+        image = get_image_model().objects.create(title="hero", file=get_test_image_file())
+        etags = {path: self.client.get(path)["ETag"] for path in ("/api/services/", "/api/projects/")}
+        image.delete()
+        for path, etag in etags.items():
+            assert self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+class TestSiteConfigCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_config.clear()
+        self.client = APIClient()
+
+    def test_steady_state_needs_no_queries_and_sees_saves(self):
+        self.client.get("/api/config/")  # creates the settings rows
+        self.client.get("/api/config/")
+        with self.assertNumQueries(0):
+            assert self.client.get("/api/config/?v=1").json()["primary"] == "#1a73e8"
+
+        settings = SiteSettings.for_site(Site.objects.get(is_default_site=True))
+        settings.primary = "#000000"
+        settings.save()
+        assert self.client.get("/api/config/?v=2").json()["primary"] == "#000000"
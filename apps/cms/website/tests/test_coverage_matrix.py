@@ -0,0 +1,97 @@
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from wagtail.models import Page
+from website import coverage
+from website.models import Testimonial
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import ServicesIndexPage, ServicePage
+
+
+@override_settings(GEOAREA_AUTO_NEIGHBORS=False)
+class TestCoverageMatrix(TestCase):
+    def setUp(self):
+        root = Page.get_first_root_node()
+        idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=idx)
+        self.services = []
+        for name in ("Glass", "Doors", "Windows"):
+            page = ServicePage(title=name, slug=name.lower())
+            idx.add_child(instance=page)
+            page.save_revision().publish()
+            self.services.append(page)
+        self.areas = [GeoArea.objects.create(name=f"City {i}", slug=f"city-{i}") for i in range(4)]
+
+    def test_creates_every_pair_once(self):
+        ServiceCoverage.objects.create(service=self.services[0], geoarea=self.areas[0], unique_intro="<p>Hand written</p>")
+        created = coverage.generate(self.services, self.areas, batch_size=5)
+        assert created == 11
+        assert ServiceCoverage.objects.count() == 12
+        assert ServiceCoverage.objects.get(service=self.services[0], geoarea=self.areas[0]).unique_intro == "<p>Hand written</p>"
+        assert coverage.generate(self.services, self.areas) == 0
+
+    def test_counts_only_rows_it_inserted(self):
+        elsewhere = GeoArea.objects.create(name="Elsewhere", slug="elsewhere")
+        ServiceCoverage.objects.create(service=self.services[0], geoarea=elsewhere)
+        real = ServiceCoverage.objects.bulk_create
+        calls = []
+
+        def racing(rows, *args, **kwargs):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise IntegrityError("pair created concurrently")
+            # Another writer removes an unrelated coverage meanwhile
+            ServiceCoverage.objects.filter(geoarea=elsewhere).delete()
+            return real(rows, *args, **kwargs)
+
+        with mock.patch.object(ServiceCoverage.objects, "bulk_create", side_effect=racing):
+            created = coverage.generate(self.services, self.areas)
+        assert calls == [12, 12]  # rolled back and retried
+        assert created == 12
+        assert ServiceCoverage.objects.count() == 12
+
+    def test_template_filled_and_metrics_match_model(self):
+        coverage.generate(self.services[:1], self.areas[:1])
+        cov = ServiceCoverage.objects.get()
+        assert cov.status == "draft"
+        assert cov.unique_intro.startswith("<p>Glass in City 0:")
+        assert cov.cta_local == "Get a Glass quote in City 0"
+        assert cov.process_steps_local[1].value["text"].source == "<p>A written quote for Glass in City 0.</p>"
+        stored = (cov.word_count, cov.module_count, cov.image_count)
+        cov.refresh_quality()
+        assert stored == (cov.word_count, cov.module_count, cov.image_count)
+
+    def test_quality_flag_uses_template_and_testimonials(self):
+        text = "<p>" + " ".join(["word"] * 120) + "</p><img src='x.jpg' alt='' />"
+        template = coverage.load_template()
+        template["process_steps_local"] = [{"type": "step", "value": {"title": "S", "text": text}}] * 6
+        Testimonial.objects.create(name="Ann", rating=5, quote="Great", geoarea=self.areas[1])
+        coverage.generate(self.services[:1], self.areas[:2], template=template, status="ready")
+        flags = dict(ServiceCoverage.objects.values_list("geoarea__slug", "quality_ok"))
+        assert flags == {"city-0": False, "city-1": True}
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as fh:
+            json.dump({"cta_local": "Call about {service}"}, fh)
+        out = StringIO()
+        call_command("generate_coverage_matrix", "--service", "glass", "--geoarea", "city-1", "--template", fh.name, stdout=out)
+        assert "1 coverages created" in out.getvalue()
+        assert ServiceCoverage.objects.get().cta_local == "Call about Glass"
+
+    def test_admin_bulk_action(self):
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.force_login(user)
+        url = f"/cms/bulk/website/geoarea/generate_coverage/?id={self.areas[0].pk}&id={self.areas[1].pk}"
+        res = self.client.get(url)
+        assert res.status_code == 200
+        assert b"City 1" in res.content
+        res = self.client.post(url)
+        assert res.status_code == 302
+        assert ServiceCoverage.objects.count() == 6
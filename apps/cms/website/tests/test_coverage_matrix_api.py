@@ -0,0 +1,66 @@
+import base64
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from wagtail.models import Page
+from website.coverage_matrix import rle, unrle
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import ServicesIndexPage, ServicePage
+
+
+@override_settings(GEOAREA_AUTO_NEIGHBORS=False)
+class TestCoverageMatrixEndpoint(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        root = Page.get_first_root_node()
+        idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=idx)
+        self.glass = ServicePage(title="Glass", slug="glass")
+        self.doors = ServicePage(title="Doors", slug="doors")
+        idx.add_child(instance=self.glass)
+        idx.add_child(instance=self.doors)
+        self.miami = GeoArea.objects.create(name="Miami", slug="miami")
+        self.doral = GeoArea.objects.create(name="Doral", slug="doral")
+        self.hialeah = GeoArea.objects.create(name="Hialeah", slug="hialeah")
+        ServiceCoverage.objects.create(service=self.glass, geoarea=self.miami, status="ready")
+        ServiceCoverage.objects.create(service=self.glass, geoarea=self.doral, status="draft")
+        ServiceCoverage.objects.create(service=self.doors, geoarea=self.hialeah, status="ready")
+        ServiceCoverage.objects.filter(geoarea=self.hialeah).update(quality_ok=True)
+
+    def test_rle_roundtrip(self):
+        cells = [0, 0, 7, 7, 7, 1, 0]
+        assert rle(cells) == [0, 2, 7, 3, 1, 1, 0, 1]
+        assert unrle(rle(cells)) == cells
+        assert rle([]) == []
+
+    def test_rle_grid(self):
+        res = self.client.get("/api/coverage/matrix/")
+        assert res.status_code == 200
+        body = res.json()
+        assert [s["slug"] for s in body["services"]] == ["glass", "doors"]
+        assert [a["slug"] for a in body["geoareas"]] == ["miami", "doral", "hialeah"]
+        assert unrle(body["cells"]) == [3, 1, 0, 0, 0, 7]
+        assert body["counts"] == {"coverages": 3, "ready": 2, "publishable": 1}
+
+    def test_bitmap_grid(self):
+        body = self.client.get("/api/coverage/matrix/?encoding=bitmap").json()
+        bits = {name: base64.b64decode(value)[0] for name, value in body["bitmaps"].items()}
+        assert bits == {"exists": 0b100011, "ready": 0b100001, "quality_ok": 0b100000}
+        assert self.client.get("/api/coverage/matrix/?encoding=png").status_code == 400
+
+    def test_single_query_cached_and_invalidated(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/coverage/matrix/")
+        assert len(ctx) == 1
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/coverage/matrix/")
+        assert len(ctx) == 0
+        cov = ServiceCoverage.objects.get(service=self.glass, geoarea=self.doral)
+        cov.status = "ready"
+        cov.save()
+        body = self.client.get("/api/coverage/matrix/").json()
+        assert unrle(body["cells"])[:2] == [3, 3]
@@ -0,0 +1,66 @@
+import math
+import random
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from website import geoindex
+from website.models_local import GeoArea
+
+
+def _haversine_km(a, b):
+    (lat1, lng1), (lat2, lng2) = [(math.radians(x), math.radians(y)) for x, y in (a, b)]
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * geoindex.EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class TestKDTree(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rnd = random.Random(7)
+        coords = [(rnd.uniform(-60, 60), rnd.uniform(-180, 180)) for _ in range(2000)]
+        tree = geoindex.KDTree([(geoindex.to_xyz(*c), i) for i, c in enumerate(coords)])
+        for _ in range(25):
+            q = (rnd.uniform(-60, 60), rnd.uniform(-180, 180))
+            expected = sorted(range(len(coords)), key=lambda i: _haversine_km(q, coords[i]))
+            found = tree.nearest(geoindex.to_xyz(*q), 5)
+            assert [item for _c, item in found] == expected[:5]
+            for chord, item in found:
+                assert abs(geoindex.chord_to_km(chord) - _haversine_km(q, coords[item])) < 1e-6
+
+            radius = 800
+            inside = [i for i in expected if _haversine_km(q, coords[i]) <= radius]
+            within = tree.nearest(geoindex.to_xyz(*q), len(coords), geoindex.km_to_chord(radius))
+            assert [item for _c, item in within] == inside
+
+
+class TestNearbyEndpoint(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        GeoArea.objects.create(name="Miami", slug="miami", center_lat=25.7617, center_lng=-80.1918)
+        GeoArea.objects.create(name="Doral", slug="doral", center_lat=25.8195, center_lng=-80.3553)
+        GeoArea.objects.create(name="Orlando", slug="orlando", center_lat=28.5384, center_lng=-81.3789)
+        GeoArea.objects.create(name="Nowhere", slug="nowhere")
+
+    def test_nearest_and_radius(self):
+        body = self.client.get("/api/geoareas/nearby/?lat=25.77&lng=-80.2&limit=2").json()
+        assert [r["slug"] for r in body["results"]] == ["miami", "doral"]
+        assert body["results"][0]["distance_km"] < 2
+        body = self.client.get("/api/geoareas/nearby/?lat=25.77&lng=-80.2&radius_km=50").json()
+        assert [r["slug"] for r in body["results"]] == ["miami", "doral"]
+
+    def test_index_follows_saves(self):
+        url = "/api/geoareas/nearby/?lat=28.5&lng=-81.4&limit=1"
+        assert self.client.get(url).json()["results"][0]["slug"] == "orlando"
+        GeoArea.objects.create(name="Kissimmee", slug="kissimmee", center_lat=28.5, center_lng=-81.4)
+        assert self.client.get(url).json()["results"][0]["slug"] == "kissimmee"
+
+    def test_requires_coordinates(self):
+        assert self.client.get("/api/geoareas/nearby/?lat=abc").status_code == 400
+
+    def test_radius_must_be_positive_and_is_clamped(self):
+        for radius in ("0", "-5", "nan", "inf"):
+            res = self.client.get(f"/api/geoareas/nearby/?lat=25.77&lng=-80.2&radius_km={radius}")
+            assert res.status_code == 400, radius
+        body = self.client.get("/api/geoareas/nearby/?lat=25.77&lng=-80.2&radius_km=100000").json()
+        assert body["radius_km"] == 500
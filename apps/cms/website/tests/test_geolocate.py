@@ -0,0 +1,84 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from website import geolocate
+from website.models import Lead
+from website.models_local import GeoArea
+
+
+def _square(x0, y0, x1, y1, hole=None):
+    rings = [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]
+    if hole:
+        hx0, hy0, hx1, hy1 = hole
+        rings.append([[hx0, hy0], [hx1, hy0], [hx1, hy1], [hx0, hy1], [hx0, hy0]])
+    return {"type": "Polygon", "coordinates": rings}
+
+
+class TestPolygonIndex(SimpleTestCase):
+    def test_ray_casting_respects_holes_and_multipolygons(self):
+        polygons = geolocate.parse_polygons(json.dumps({
+            "type": "Feature",
+            "geometry": {"type": "MultiPolygon", "coordinates": [
+                _square(0, 0, 10, 10, hole=(4, 4, 6, 6))["coordinates"],
+                _square(20, 20, 21, 21)["coordinates"],
+            ]},
+        }))
+        assert geolocate.polygons_contain(polygons, 1, 1)
+        assert not geolocate.polygons_contain(polygons, 5, 5)
+        assert geolocate.polygons_contain(polygons, 20.5, 20.5)
+        assert not geolocate.polygons_contain(polygons, 15, 15)
+
+    def test_malformed_geojson_is_skipped(self):
+        for bad in ("null", "[]", "3", '"x"', '{"type": "FeatureCollection", "features": [1, null, []]}',
+                    '{"type": "Feature", "geometry": []}', '{"type": "Polygon", "coordinates": {"a": 1}}',
+                    '{"type": "MultiPolygon", "coordinates": [1, [[["a", 1]]]]}'):
+            assert geolocate.parse_polygons(bad) == [], bad
+        mixed = {"type": "FeatureCollection", "features": [1, {"type": "Feature", "geometry": _square(0, 0, 1, 1)}]}
+        assert len(geolocate.parse_polygons(json.dumps(mixed))) == 1
+
+    def test_rtree_returns_only_boxes_containing_point(self):
+        entries = [((i, i, i + 1.5, i + 1.5), i) for i in range(500)]
+        tree = geolocate.RTree(entries)
+        assert sorted(tree.query_point(10.2, 10.2)) == [9, 10]
+        assert tree.query_point(-5, -5) == []
+
+
+class TestLocate(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.city = GeoArea.objects.create(name="Miami", slug="miami", geojson=json.dumps(_square(-80.4, 25.6, -80.1, 25.9)))
+        self.hood = GeoArea.objects.create(
+            name="Brickell", slug="brickell", type="neighborhood", parent_city=self.city,
+            geojson=json.dumps(_square(-80.21, 25.75, -80.18, 25.78)),
+        )
+        GeoArea.objects.create(name="Broken", slug="broken", geojson="{not json")
+        GeoArea.objects.create(name="Odd", slug="odd", geojson='{"type": "FeatureCollection", "features": [1]}')
+        GeoArea.objects.create(name="Null", slug="null", geojson="null")
+
+    def test_locate_endpoint(self):
+        body = self.client.get("/api/geoareas/locate/?lat=25.76&lng=-80.19").json()
+        assert body["neighborhood"]["slug"] == "brickell"
+        assert body["city"]["slug"] == "miami"
+        body = self.client.get("/api/geoareas/locate/?lat=25.65&lng=-80.3").json()
+        assert body == {"neighborhood": None, "city": {"id": self.city.id, "slug": "miami", "name": "Miami", "type": "city"}}
+        assert self.client.get("/api/geoareas/locate/?lat=10&lng=10").json() == {"neighborhood": None, "city": None}
+
+    def test_index_is_rebuilt_after_save(self):
+        assert geolocate.resolve(40.0, -74.0)["city"] is None
+        GeoArea.objects.create(name="NYC", slug="nyc", geojson=json.dumps(_square(-74.5, 39.5, -73.5, 41)))
+        assert geolocate.resolve(40.0, -74.0)["city"]["slug"] == "nyc"
+
+    def test_lead_is_attributed_from_coordinates(self):
+        res = self.client.post("/api/leads/", {"name": "Ana", "phone": "1", "lat": 25.76, "lng": -80.19}, format="json")
+        assert res.status_code == 201
+        assert Lead.objects.get().geoarea == self.hood
+
+    def test_lead_is_saved_when_geolocation_fails(self):
+        with mock.patch("website.geolocate.locate_geoarea_id", side_effect=RuntimeError("boom")):
+            res = self.client.post("/api/leads/", {"name": "Ana", "phone": "1", "lat": 25.76, "lng": -80.19}, format="json")
+        assert res.status_code == 201
+        assert Lead.objects.get().geoarea is None
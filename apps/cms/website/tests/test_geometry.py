@@ -0,0 +1,67 @@
+import json
+import math
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from website import geometry
+from website.models_local import GeoArea, GeoAreaGeometry
+
+
+def _circle(cx, cy, r, n):
+    ring = [[cx + r * math.cos(2 * math.pi * i / n), cy + r * math.sin(2 * math.pi * i / n)] for i in range(n)]
+    return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+
+class TestSimplification(SimpleTestCase):
+    def test_vertex_count_shrinks_with_zoom(self):
+        levels = geometry.build_levels(json.dumps(_circle(-80.2, 25.8, 0.1, 5000)))
+        counts = [vertices for _z, _bbox, vertices, _p in levels]
+        assert counts == sorted(counts)
+        assert counts[0] < 50 and counts[-1] < 5000
+
+    def test_clip_to_bbox(self):
+        square = [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]
+        clipped = geometry.clip_polygons([square], (5, 5, 20, 20))
+        xs = [p[0] for p in clipped[0][0]]
+        ys = [p[1] for p in clipped[0][0]]
+        assert (min(xs), max(xs), min(ys), max(ys)) == (5, 10, 5, 10)
+        assert geometry.clip_polygons([square], (30, 30, 40, 40)) == []
+
+
+class TestGeometryEndpoint(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.area = GeoArea.objects.create(name="Miami", slug="miami", geojson=json.dumps(_circle(-80.2, 25.8, 0.1, 2000)))
+
+    def test_levels_generated_on_save_and_served(self):
+        assert GeoAreaGeometry.objects.filter(geoarea=self.area).count() == len(geometry.ZOOM_LEVELS)
+        low = self.client.get("/api/geoareas/miami/geometry/?zoom=5").json()
+        high = self.client.get("/api/geoareas/miami/geometry/?zoom=18").json()
+        assert low["properties"]["zoom"] == 4 and high["properties"]["zoom"] == 14
+        assert len(low["geometry"]["coordinates"][0][0]) < len(high["geometry"]["coordinates"][0][0])
+
+        clipped = self.client.get("/api/geoareas/miami/geometry/?zoom=12&bbox=-80.2,25.8,-80.0,26.0").json()
+        for x, y in clipped["geometry"]["coordinates"][0][0]:
+            assert x >= -80.2 and y >= 25.8
+
+    def test_levels_follow_geojson_changes(self):
+        before = GeoAreaGeometry.objects.get(geoarea=self.area, zoom=14).source_hash
+        self.area.geojson = json.dumps(_circle(-80.0, 25.8, 0.1, 100))
+        self.area.save()
+        assert GeoAreaGeometry.objects.get(geoarea=self.area, zoom=14).source_hash != before
+        self.area.geojson = ""
+        self.area.save()
+        assert self.client.get("/api/geoareas/miami/geometry/").status_code == 404
+
+    def test_malformed_geojson_saves_without_levels(self):
+        for bad in ("null", "[]", '{"type": "FeatureCollection", "features": [1]}', "{not json"):
+            self.area.geojson = bad
+            self.area.save()
+            assert not GeoAreaGeometry.objects.filter(geoarea=self.area).exists(), bad
+        self.area.geojson = json.dumps(_circle(-80.2, 25.8, 0.1, 50))
+        with mock.patch("website.geometry.build_levels", side_effect=AttributeError("boom")):
+            self.area.save()
+        assert not GeoAreaGeometry.objects.filter(geoarea=self.area).exists()
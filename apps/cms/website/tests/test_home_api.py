@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+from website import home
+from website.caching import get_versions
+from website.models import HomePage
+from website.renditions import process_jobs
+from website.streams import represent_raw
+
+MEDIA = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA)
+class TestHomeEndpoint(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.images = [get_image_model().objects.create(title=f"img {i}", file=get_test_image_file()) for i in range(6)]
+        process_jobs(workers=0)
+        self.home = HomePage(title="Home", slug="start", body=self.body(gallery=2))
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=self.home)
+        self.home.save_revision().publish()
+
+    def body(self, gallery, heading="Glass done right"):
+        hero, *rest = self.images
+        return [
+            {"type": "hero", "id": "hero", "value": {"heading": heading, "image": hero.pk}},
+            {"type": "services", "id": "services", "value": [{"title": "Showers", "icon": rest[0].pk}]},
+            {"type": "reviews", "id": "reviews", "value": [{"name": "Ana", "rating": 5, "quote": "Great"}]},
+            {"type": "gallery", "id": "gallery", "value": [img.pk for img in rest[:gallery]]},
+            {"type": "cta", "id": "cta", "value": {"heading": "Call", "cta_label": "Quote", "cta_href": "/contact"}},
+        ]
+
+    def publish(self, **kwargs):
+        self.home.body = self.body(**kwargs)
+        self.home.save_revision().publish()
+
+    def get(self):
+        res = self.client.get("/api/home/")
+        assert res.status_code == 200
+        return res.json()
+
+    def test_payload(self):
+        data = self.get()
+        assert (data["id"], data["slug"]) == (self.home.pk, "start")
+        assert [block["type"] for block in data["body"]] == ["hero", "services", "reviews", "gallery", "cta"]
+        hero = data["body"][0]["value"]
+        assert hero["heading"] == "Glass done right"
+        assert hero["image"]["url"].startswith("http://testserver/media/images/")
+        assert [item["id"] for item in data["body"][3]["value"]] == [self.images[1].pk, self.images[2].pk]
+        # Cached blocks carry the placeholder origin, swapped per request
+        other = self.client.get("/api/home/", HTTP_HOST="localhost").json()
+        assert other["body"][0]["value"]["image"]["url"].startswith("http://localhost/")
+
+    def test_republish_recomputes_only_changed_blocks(self):
+        self.get()
+        self.publish(gallery=2, heading="New heading")
+        with mock.patch("website.home.represent_raw", wraps=represent_raw) as rendered:
+            data = self.get()
+        assert [call.args[1][0]["id"] for call in rendered.call_args_list] == ["hero"]
+        assert data["body"][0]["value"]["heading"] == "New heading"
+
+    def test_images_resolved_in_bulk(self):
+        def cold_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.get()
+            return len(ctx)
+
+        small = cold_queries()
+        self.publish(gallery=5)
+        assert cold_queries() == small
+
+    def test_blocks_with_missing_renditions_are_not_cached(self):
+        image = get_image_model().objects.create(title="fresh", file=get_test_image_file())
+        self.home.body = [{"type": "gallery", "id": "gallery", "value": [image.pk]}]
+        self.home.save_revision().publish()
+        assert self.get()["body"][0]["value"][0]["url"].endswith(image.file.url)
+        key = home.block_key(self.home.body.raw_data[0], *get_versions("images"))
+        assert cache.get(key) is None
+
+    def test_not_found_without_home_page(self):
+        self.home.unpublish()
+        assert self.client.get("/api/home/").status_code == 404
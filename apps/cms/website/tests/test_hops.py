@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from rest_framework.test import APIClient
+from website import hops
+from website.models_local import GeoArea, GeoAreaHop
+
+
+class TestGeoAreaHops(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # a - b - c - d - e along a line, 0.1 degree apart
+        self.areas = {
+            slug: GeoArea.objects.create(name=slug.upper(), slug=slug, center_lat=25.0, center_lng=-80.0 + 0.1 * i)
+            for i, slug in enumerate("abcde")
+        }
+        # Centers alone would auto-link everything within 25 km; start from a hand-made chain
+        GeoArea.neighbors.through.objects.all().delete()
+        hops.rebuild_all()
+        for left, right in zip("abcd", "bcde", strict=True):
+            self.areas[left].neighbors.add(self.areas[right])
+
+    def _table(self):
+        return set(GeoAreaHop.objects.values_list("source_id", "target_id", "hops"))
+
+    def _assert_matches_full_rebuild(self):
+        incremental = self._table()
+        hops.rebuild_all()
+        assert incremental == self._table()
+
+    def test_endpoint_ranks_by_hops_then_distance(self):
+        body = self.client.get("/api/geoareas/c/nearby/?hops=2").json()
+        assert [(r["slug"], r["hops"]) for r in body["results"]] == [("b", 1), ("d", 1), ("a", 2), ("e", 2)]
+        assert body["results"][0]["distance_km"] > 0
+        assert len(self.client.get("/api/geoareas/c/nearby/?hops=2&limit=1").json()["results"]) == 1
+        assert self.client.get("/api/geoareas/missing/nearby/").status_code == 404
+
+    def test_incremental_updates_match_full_rebuild(self):
+        self._assert_matches_full_rebuild()
+        self.areas["a"].neighbors.add(self.areas["e"])
+        self._assert_matches_full_rebuild()
+        self.areas["c"].neighbors.remove(self.areas["b"])
+        self._assert_matches_full_rebuild()
+        self.areas["d"].neighbors.clear()
+        self._assert_matches_full_rebuild()
+        self.areas["b"].neighbors.add(self.areas["c"], self.areas["d"])
+        self.areas["c"].delete()
+        self._assert_matches_full_rebuild()
+
+    def test_action_slugs_are_reserved(self):
+        with self.assertRaises(ValidationError):
+            GeoArea.objects.create(name="Nearby Heights", slug="nearby")
+        with self.assertRaises(ValidationError):
+            GeoArea(name="X", slug="locate").full_clean()
+        area = GeoArea.objects.create(name="Locate")
+        assert area.slug == "locate-area"
+        assert self.client.get("/api/geoareas/locate-area/").json()["slug"] == "locate-area"
+        assert GeoArea.objects.create(name="Locate").slug == "locate-area-2"
+        assert GeoArea.objects.create(name="Locate").slug == "locate-area-3"
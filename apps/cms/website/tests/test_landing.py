@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from wagtail.models import Page
+from website.models import Testimonial
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import PortfolioIndexPage, ProjectPage, ServicesIndexPage, ServicePage
+
+
+@override_settings(GEOAREA_AUTO_NEIGHBORS=False)
+class TestLandingEndpoint(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        root = Page.get_first_root_node()
+        services = ServicesIndexPage(title="Services")
+        root.add_child(instance=services)
+        self.service = ServicePage(title="Glass", slug="glass")
+        services.add_child(instance=self.service)
+        self.service.save_revision().publish()
+        self.portfolio = PortfolioIndexPage(title="Projects")
+        root.add_child(instance=self.portfolio)
+
+        self.miami = GeoArea.objects.create(name="Miami", slug="miami")
+        self.brickell = GeoArea.objects.create(name="Brickell", slug="brickell", type="neighborhood", parent_city=self.miami)
+        doral = GeoArea.objects.create(name="Doral", slug="doral")
+        hialeah = GeoArea.objects.create(name="Hialeah", slug="hialeah")
+        self.miami.neighbors.add(doral, hialeah)
+        ServiceCoverage.objects.create(service=self.service, geoarea=self.miami, status="ready")
+        ServiceCoverage.objects.create(service=self.service, geoarea=doral, status="ready")
+        ServiceCoverage.objects.create(service=self.service, geoarea=hialeah, status="draft")
+        ServiceCoverage.objects.filter(geoarea=doral).update(quality_ok=True)
+        self.rows = 0
+
+    def _grow(self, n):
+        for i in range(self.rows, self.rows + n):
+            Testimonial.objects.create(name=f"T{i}", rating=5, quote="Great", geoarea=self.brickell)
+            project = ProjectPage(title=f"P{i}", slug=f"p{i}")
+            self.portfolio.add_child(instance=project)
+            project.geoareas.add(self.miami)
+            project.save_revision().publish()
+        self.rows += n
+
+    def _get(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/landing/glass/miami/")
+        assert res.status_code == 200
+        return res.json(), len(ctx)
+
+    def test_payload_sections(self):
+        self._grow(3)
+        body, _ = self._get()
+        assert body["coverage"]["geo"]["slug"] == "miami"
+        assert body["service"]["slug"] == "glass"
+        assert len(body["testimonials"]) == 3
+        assert sorted(p["slug"] for p in body["projects"]) == ["p0", "p1", "p2"]
+        assert body["nearby"] == [{"slug": "doral", "name": "Doral", "type": "city"}]
+        assert body["reviews"]["rollup"] == {"count": 3, "avg": 5.0}
+        assert self.client.get("/api/landing/glass/hialeah/").status_code == 404
+
+    def test_query_count_does_not_grow_with_content(self):
+        self._grow(1)
+        _, small = self._get()
+        self._grow(4)
+        _, large = self._get()
+        assert small == large, (small, large)
@@ -0,0 +1,57 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from website.models_local import GeoArea
+
+
+def _square(x, y, size=0.1):
+    ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+    return json.dumps({"type": "Polygon", "coordinates": [ring]})
+
+
+def _slugs(area):
+    return sorted(area.neighbors.values_list("slug", flat=True))
+
+
+class TestComputeNeighbors(TestCase):
+    def test_command_uses_adjacency_then_center_fallback(self):
+        with override_settings(GEOAREA_AUTO_NEIGHBORS=False):
+            west = GeoArea.objects.create(name="West", slug="west", geojson=_square(0, 0))
+            east = GeoArea.objects.create(name="East", slug="east", geojson=_square(0.1, 0))
+            far = GeoArea.objects.create(name="Far", slug="far", geojson=_square(5, 5))
+            a = GeoArea.objects.create(name="A", slug="a", center_lat=10, center_lng=10)
+            GeoArea.objects.create(name="B", slug="b", center_lat=10.05, center_lng=10)
+            stale = GeoArea.objects.create(name="Stale", slug="stale")
+            west.neighbors.add(stale)
+        call_command("compute_neighbors", stdout=StringIO())
+        assert _slugs(west) == ["east"]
+        assert _slugs(east) == ["west"]
+        assert _slugs(far) == []
+        assert _slugs(a) == ["b"]
+
+        west.neighbors.add(stale)
+        call_command("compute_neighbors", "--keep-existing", stdout=StringIO())
+        assert _slugs(west) == ["east", "stale"]
+
+    def test_save_hook_only_adds_edges(self):
+        west = GeoArea.objects.create(name="West", slug="west", geojson=_square(0, 0))
+        east = GeoArea.objects.create(name="East", slug="east", geojson=_square(0.1, 0))
+        assert _slugs(west) == ["east"]
+        picked = GeoArea.objects.create(name="Picked", slug="picked")
+        west.neighbors.add(picked)
+        west.geojson = _square(0, 0.05)
+        west.save()
+        assert _slugs(west) == ["east", "picked"]
+        east.geojson = _square(3, 3)
+        east.save()
+        assert _slugs(west) == ["east", "picked"]
+        # Pruning is left to the command
+        call_command("compute_neighbors", stdout=StringIO())
+        assert _slugs(west) == []
+        manual = GeoArea.objects.create(name="Manual", slug="manual")
+        manual.neighbors.add(west)
+        manual.name = "Manual 2"
+        manual.save()
+        assert _slugs(manual) == ["west"]
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from wagtail.models import Page
+from website.models_pages import PortfolioIndexPage, ProjectPage
+
+
+class TestProjectPagination(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.get_first_root_node()
+        idx = PortfolioIndexPage(title="Projects")
+        root.add_child(instance=idx)
+        for i in range(5):
+            page = ProjectPage(title=f"Job {i}", slug=f"job-{i}")
+            idx.add_child(instance=page)
+            page.save_revision().publish()
+        self.client = APIClient()
+
+    def test_flat_list_is_bounded(self):
+        assert len(self.client.get("/api/projects/").json()) == 5
+        assert len(self.client.get("/api/projects/?limit=2").json()) == 2
+        with override_settings(API_MAX_LIST_RESULTS=3):
+            cache.clear()
+            assert len(self.client.get("/api/projects/?limit=50").json()) == 3
+
+    def test_cursor_pages_walk_every_project_once(self):
+        seen = []
+        url = "/api/projects/?paginate=cursor&limit=2"
+        while url:
+            body = self.client.get(url).json()
+            assert len(body["results"]) <= 2
+            seen.extend(row["slug"] for row in body["results"])
+            url = body["next"]
+        assert seen == [f"job-{i}" for i in reversed(range(5))]
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from wagtail.models import Page
+from website.models_local import GeoArea
+from website.models_pages import PortfolioIndexPage, ProjectLookup, ProjectPage
+
+
+class TestProjectFilters(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.get_first_root_node()
+        idx = PortfolioIndexPage(title="Projects")
+        root.add_child(instance=idx)
+        self.miami = GeoArea.objects.create(name="Miami", slug="miami")
+        self.a = self._project(idx, "a", "Miami Beach", ["Shower Doors"])
+        self.a.geoareas.add(self.miami)
+        self.b = self._project(idx, "b", "Doral", ["Mirrors", "Shower Doors"])
+        self.client = APIClient()
+
+    def _project(self, idx, slug, city, services):
+        page = ProjectPage(title=slug, slug=slug, city=city)
+        idx.add_child(instance=page)
+        page.services.add(*services)
+        page.save_revision().publish()
+        return page
+
+    def _slugs(self, query):
+        return sorted(row["slug"] for row in self.client.get(f"/api/projects/?{query}").json())
+
+    def test_lookup_rows_are_normalized(self):
+        values = set(ProjectLookup.objects.filter(project=self.a).values_list("kind", "value"))
+        assert values == {("city", "miami-beach"), ("city", "miami"), ("service", "shower-doors")}
+
+    def test_service_and_city_filters(self):
+        assert self._slugs("service=Shower%20Doors") == ["a", "b"]
+        assert self._slugs("service=shower-doors&city=doral") == ["b"]
+        assert self._slugs("city=miami") == ["a"]
+        assert self._slugs("city=Miami%20Beach") == ["a"]
+        assert self._slugs("service=mirror") == []
+        assert self._slugs("service=mirror&service_contains=1") == ["b"]
+
+    def test_geoarea_changes_update_lookups(self):
+        self.a.geoareas.remove(self.miami)
+        assert self._slugs("city=miami") == []
+        self.miami.projects.add(self.b)
+        self.miami.slug = "miami-fl"
+        self.miami.save()
+        assert self._slugs("city=miami-fl") == ["b"]
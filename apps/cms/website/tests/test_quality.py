@@ -0,0 +1,51 @@
+from django.test import TestCase
+from wagtail.models import Page
+from website.models import Testimonial
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import ServicesIndexPage, ServicePage
+
+
+def _steps(n, words=120):
+    text = " ".join(["word"] * words)
+    return [
+        {"type": "step", "value": {"title": f"Step {i}", "text": f"<p>{text}</p><img src='x{i}.jpg' alt='' />"}}
+        for i in range(n)
+    ]
+
+
+class TestCoverageQuality(TestCase):
+    def setUp(self):
+        root = Page.get_first_root_node()
+        idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=idx)
+        self.service = ServicePage(title="Glass", slug="glass")
+        idx.add_child(instance=self.service)
+        self.city = GeoArea.objects.create(name="Miami", slug="miami")
+
+    def test_metrics_persisted_on_save(self):
+        cov = ServiceCoverage.objects.create(service=self.service, geoarea=self.city, process_steps_local=_steps(6))
+        cov.refresh_from_db()
+        assert cov.module_count == 6
+        assert cov.image_count == 6
+        assert cov.word_count == 720
+        assert cov.quality_ok is False  # no local testimonial yet
+
+    def test_testimonial_changes_flip_quality_flag(self):
+        cov = ServiceCoverage.objects.create(
+            service=self.service, geoarea=self.city, status="ready", process_steps_local=_steps(6)
+        )
+        t = Testimonial.objects.create(name="Ann", rating=5, quote="Great", geoarea=self.city)
+        cov.refresh_from_db()
+        assert cov.quality_ok is True
+        assert list(ServiceCoverage.objects.filter(status="ready", quality_ok=True)) == [cov]
+
+        t.geoarea = None
+        t.save()
+        cov.refresh_from_db()
+        assert cov.quality_ok is False
+
+        t.geoarea = self.city
+        t.save()
+        t.delete()
+        cov.refresh_from_db()
+        assert cov.quality_ok is False
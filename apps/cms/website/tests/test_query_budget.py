@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from website.models import ServiceArea
+from website.models_local import GeoArea
+
+# count + page + neighbor prefetch, independent of the number of rows
+AREAS_BUDGET = 3
+GEOAREAS_BUDGET = 3
+
+
+class TestListQueryBudgets(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.rows = 0
+
+    def _grow(self, n):
+        cities = [GeoArea.objects.create(name=f"City {self.rows + i}", slug=f"city-{self.rows + i}") for i in range(n)]
+        for i, city in enumerate(cities):
+            hood = GeoArea.objects.create(
+                name=f"Hood {self.rows + i}", slug=f"hood-{self.rows + i}", type="neighborhood", parent_city=city,
+            )
+            city.neighbors.add(hood, *cities[:i])
+            ServiceArea.objects.create(name=f"Area {self.rows + i}", geo=city)
+        self.rows += n
+
+    def _assert_budget(self, url, budget):
+        cache.clear()
+        with self.assertNumQueries(budget):
+            res = self.client.get(url)
+        assert res.status_code == 200
+        return res.json()
+
+    def test_areas_query_count_is_constant(self):
+        for n in (2, 8):
+            self._grow(n)
+            body = self._assert_budget("/api/areas/", AREAS_BUDGET)
+        row = next(r for r in body["results"] if r["slug"] == "area-1")
+        assert row["geo_slug"] == "city-1"
+        assert sorted(row["neighbors"]) == ["city-0", "hood-1"]
+
+    def test_geoareas_query_count_is_constant(self):
+        for n in (2, 8):
+            self._grow(n)
+            body = self._assert_budget("/api/geoareas/", GEOAREAS_BUDGET)
+        row = next(r for r in body["results"] if r["slug"] == "hood-0")
+        assert row["parent_city_slug"] == "city-0"
+        assert row["neighbors"] == ["city-0"]
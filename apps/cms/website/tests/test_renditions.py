@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+from website.models_pages import ServicesIndexPage, ServicePage
+from website.models import RenditionJob
+from website.renditions import API_SPEC, _claim, process_jobs, rendition_specs
+from website.serializers import ServicePageSerializer
+
+MEDIA = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA)
+class TestBatchedRenditions(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        # Wagtail caches renditions in the default cache
+        cache.clear()
+        root = Page.get_first_root_node()
+        self.idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=self.idx)
+        self.request = RequestFactory().get('/api/services/')
+
+    def make_service(self, n, images):
+        imgs = [get_image_model().objects.create(title=f"{n}-{i}", file=get_test_image_file()) for i in range(images)]
+        page = ServicePage(
+            title=f"Service {n}",
+            slug=f"service-{n}",
+            hero=imgs[0],
+            body=[("image", img) for img in imgs],
+        )
+        self.idx.add_child(instance=page)
+        return page, imgs
+
+    def pages(self):
+        return list(ServicePage.objects.order_by('pk'))
+
+    def serialize(self, pages=None):
+        pages = self.pages() if pages is None else pages
+        return ServicePageSerializer(pages, many=True, context={'request': self.request}).data
+
+    def test_fixed_query_count_regardless_of_images(self):
+        # images + renditions + one lookup of the jobs queued at upload
+        self.make_service(1, 1)
+        pages = self.pages()
+        with self.assertNumQueries(3):
+            self.serialize(pages)
+        for n in range(2, 5):
+            self.make_service(n, 3)
+        pages = self.pages()
+        with self.assertNumQueries(3):
+            data = self.serialize(pages)
+        assert sum(len(row['gallery']) for row in data) == 10
+
+    def test_missing_rendition_is_queued_not_generated(self):
+        page, imgs = self.make_service(1, 1)
+        RenditionJob.objects.all().delete()
+        data = self.serialize()
+        assert data[0]['hero']['url'] == 'http://testserver' + imgs[0].file.url
+        assert not imgs[0].renditions.exists()
+        assert list(RenditionJob.objects.values_list('image_id', 'filter_spec', 'status')) == [
+            (imgs[0].pk, API_SPEC, 'pending'),
+        ]
+
+        assert process_jobs(workers=0) == 1
+        rendition = imgs[0].renditions.get(filter_spec=API_SPEC)
+        data = self.serialize()
+        assert data[0]['gallery'][0]['url'] == 'http://testserver' + rendition.url
+        assert RenditionJob.objects.get().status == 'done'
+
+    def test_repeated_reads_do_not_write(self):
+        page, imgs = self.make_service(1, 1)
+        RenditionJob.objects.all().delete()
+        pages = self.pages()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.serialize(pages)
+        assert len(callbacks) == 1
+        # The job now exists: a second read only looks it up
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(3):
+            self.serialize(pages)
+        assert not callbacks
+        assert RenditionJob.objects.get().status == 'pending'
+
+    def test_reads_do_not_reset_done_jobs(self):
+        page, imgs = self.make_service(1, 1)
+        RenditionJob.objects.update(status='done')
+        self.serialize()
+        assert set(RenditionJob.objects.values_list('status', flat=True)) == {'done'}
+
+    def test_upload_and_publish_queue_all_specs(self):
+        page, imgs = self.make_service(1, 2)
+        specs = set(RenditionJob.objects.filter(image=imgs[0]).values_list('filter_spec', flat=True))
+        assert specs == set(rendition_specs())
+        RenditionJob.objects.all().delete()
+        page.save_revision().publish()
+        assert RenditionJob.objects.filter(status='pending').count() == 2 * len(rendition_specs())
+
+    def test_failed_jobs_stay_failed_on_reads(self):
+        page, imgs = self.make_service(1, 1)
+        RenditionJob.objects.all().delete()
+        RenditionJob.objects.create(image=imgs[0], filter_spec=API_SPEC, status='failed', attempts=3, error='boom')
+        self.serialize()
+        self.serialize()
+        assert RenditionJob.objects.get().status == 'failed'
+        # Re-uploading the image is an explicit retry
+        imgs[0].save()
+        assert RenditionJob.objects.get(filter_spec=API_SPEC).status == 'pending'
+
+    def test_claim_refreshes_updated_at(self):
+        page, imgs = self.make_service(1, 1)
+        old = timezone.now() - timedelta(hours=1)
+        RenditionJob.objects.update(updated_at=old)
+        (job_id, *_rest), = _claim(1)
+        assert RenditionJob.objects.get(pk=job_id).updated_at > old
@@ -0,0 +1,44 @@
+from django.test import TestCase
+from website.models import Testimonial
+from website.models_local import GeoArea, GeoAreaReviewStats
+
+
+class TestGeoAreaReviewStats(TestCase):
+    def setUp(self):
+        self.city = GeoArea.objects.create(name="Miami", slug="miami")
+        self.hood = GeoArea.objects.create(name="Brickell", slug="brickell", type="neighborhood", parent_city=self.city)
+
+    def stats(self, geo):
+        return GeoAreaReviewStats.objects.get(geoarea=geo)
+
+    def test_incremental_create_edit_delete(self):
+        for rating in (5, 4, 3):
+            Testimonial.objects.create(name="A", rating=rating, quote="q", geoarea=self.hood)
+        assert self.stats(self.hood).summary() == {
+            "count": 3, "avg": 4.0, "histogram": {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1},
+        }
+        assert self.stats(self.city).summary() is None
+        assert self.stats(self.city).summary(rollup=True) == {"count": 3, "avg": 4.0}
+
+        t = Testimonial.objects.filter(rating=3).get()
+        t.rating = 1
+        t.save()
+        assert self.stats(self.hood).rating_sum == 10
+        assert self.stats(self.city).rollup_sum == 10
+
+        t.delete()
+        assert self.stats(self.hood).count == 2
+        assert self.stats(self.city).rollup_count == 2
+
+    def test_reparent_and_rebuild_agree(self):
+        Testimonial.objects.create(name="A", rating=5, quote="q", geoarea=self.hood)
+        other = GeoArea.objects.create(name="Hialeah", slug="hialeah")
+        self.hood.parent_city = other
+        self.hood.save()
+        assert self.stats(self.city).rollup_count == 0
+        assert self.stats(other).rollup_count == 1
+
+        before = list(GeoAreaReviewStats.objects.order_by("geoarea_id").values())
+        GeoAreaReviewStats.rebuild()
+        after = list(GeoAreaReviewStats.objects.exclude(rollup_count=0, count=0).order_by("geoarea_id").values())
+        assert [r for r in before if r["rollup_count"] or r["count"]] == after
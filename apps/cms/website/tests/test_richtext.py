@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+from wagtail.rich_text import expand_db_html
+from website.models_pages import ServicesIndexPage, ServicePage
+from website.richtext import expand_many
+from website.serializers import ServicePageSerializer
+
+MEDIA = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA)
+class TestBatchedRichText(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        root = Page.get_first_root_node()
+        self.idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=self.idx)
+        self.request = RequestFactory().get("/api/services/")
+        self.count = 0
+
+    def make_services(self, n):
+        for _ in range(n):
+            i = self.count
+            self.count += 1
+            image = get_image_model().objects.create(title=f"img {i}", file=get_test_image_file())
+            intro = (
+                f'<p>See <a linktype="page" id="{self.idx.pk}">all services</a> and '
+                f'<a href="https://example.com">partners</a>.</p>'
+                f'<embed embedtype="image" id="{image.pk}" format="fullwidth" alt="Job {i}"/>'
+            )
+            self.idx.add_child(instance=ServicePage(title=f"Service {i}", slug=f"service-{i}", intro=intro))
+
+    def serialize(self):
+        pages = list(ServicePage.objects.order_by("id"))
+        # A first pass creates the renditions
+        warm = ServicePageSerializer(pages, many=True, context={"request": self.request}).data
+        assert len(warm) == len(pages)
+        with CaptureQueriesContext(connection) as ctx:
+            data = ServicePageSerializer(pages, many=True, context={"request": self.request}).data
+        return data, pages, len(ctx)
+
+    def test_matches_per_value_expansion(self):
+        self.make_services(3)
+        sources = [p.intro for p in ServicePage.objects.order_by("id")] + ["", "<p>plain</p>"]
+        assert expand_many(sources) == [expand_db_html(s) for s in sources]
+
+    def test_list_queries_do_not_grow_with_links(self):
+        self.make_services(2)
+        data, pages, small = self.serialize()
+        assert '<a href="https://example.com">' in data[0]["description_html"]
+        assert 'alt="Job 0"' in data[0]["description_html"]
+        self.make_services(6)
+        data, pages, large = self.serialize()
+        assert len(data) == 8
+        assert large == small
+
+    def test_bad_embed_blanks_only_its_own_field(self):
+        self.make_services(2)
+        image = get_image_model().objects.first()
+        gone = ServicePage(title="Gone", slug="gone", intro='<p>a</p><embed embedtype="image" id="999" format="gone"/>')
+        broken = ServicePage(title="Broken", slug="broken", intro=f'<embed embedtype="image" id="{image.pk}" format="gone"/>')
+        self.idx.add_child(instance=gone)
+        self.idx.add_child(instance=broken)
+        pages = list(ServicePage.objects.order_by("id"))
+        data = ServicePageSerializer(pages, many=True, context={"request": self.request}).data
+        by_slug = {row["slug"]: row["description_html"] for row in data}
+        assert by_slug["gone"] == '<p>a</p><img alt="">'  # missing image: no format lookup
+        assert by_slug["broken"] == ""
+        assert 'alt="Job 0"' in by_slug["service-0"]
+        single = ServicePageSerializer(gone, context={"request": self.request}).data
+        assert single["description_html"] == '<p>a</p><img alt="">'
@@ -0,0 +1,50 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from website import sanitize
+from website.sanitize import clean, sanitize_html
+
+
+class TestSanitizer(SimpleTestCase):
+    def test_strips_scripts_handlers_and_unknown_tags(self):
+        html = '<p onclick="x()">Hi <b>there</b> <script>alert(1)</script><font color="red">bye</font></p>'
+        assert clean(html) == "<p>Hi <b>there</b> bye</p>"
+
+    def test_urls_limited_to_safe_schemes(self):
+        assert clean('<a href="java\tscript:alert(1)">x</a>') == '<a href="#">x</a>'
+        assert clean('<a href="/services/glass" rel="nofollow">x</a>') == '<a href="/services/glass" rel="nofollow">x</a>'
+        assert clean('<img src="data:text/html,x" alt="a">') == '<img alt="a">'
+        assert clean('<iframe src="http://example.com"></iframe>') == "<iframe></iframe>"
+
+    def test_escapes_and_balances(self):
+        assert clean('<img alt="a &quot;b&quot;" onerror=alert(1) class="richtext-image left">') == (
+            '<img alt="a &quot;b&quot;" class="richtext-image left">'
+        )
+        assert clean("<p>1 &lt; 2 <i>open") == "<p>1 &lt; 2 <i>open</i></p>"
+        assert clean("<div><p>a</div>b</p>") == "<div><p>a</p></div>b"
+        assert clean("<!-- c --><style>p{}</style>ok") == "ok"
+
+    def test_unclosed_script_is_linear(self):
+        html = "<script " + "<p>x</p><script " * 20000
+        started = time.perf_counter()
+        assert clean(html) == ""
+        assert time.perf_counter() - started < 1
+
+    def test_memoized(self):
+        cache.clear()
+        html = "<p>" + "word " * 200 + "</p>"
+        with mock.patch.object(sanitize, "clean", wraps=sanitize.clean) as spy:
+            assert sanitize_html(html) == html
+            assert sanitize_html(html) == html
+            sanitize._memo.clear()
+            assert sanitize_html(html) == html  # from the shared cache
+        assert spy.call_count == 1
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_sanitizer", "--size", "2000", "--repeat", "1", stdout=out)
+        assert "unclosed script" in out.getvalue()
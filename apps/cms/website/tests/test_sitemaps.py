@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from wagtail.models import Page
+from website import sitemaps
+from website.models import ServiceArea
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import ServicesIndexPage, ServicePage
+
+
+def _read(name):
+    with default_storage.open(f"sitemaps/{name}") as fh:
+        return fh.read().decode("utf-8")
+
+
+@override_settings(
+    GEOAREA_AUTO_NEIGHBORS=False, SITEMAP_BASE_URL="https://example.com", SITEMAP_FILES_BASE_URL="https://cms.example.com",
+)
+class TestSitemaps(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        root = Page.get_first_root_node()
+        idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=idx)
+        self.glass = ServicePage(title="Glass", slug="glass")
+        idx.add_child(instance=self.glass)
+        self.glass.save_revision().publish()
+        self.areas = [GeoArea.objects.create(name=f"City {i}", slug=f"city-{i}") for i in range(4)]
+        ServiceArea.objects.create(name="Miami area", slug="miami-area", geo=self.areas[0])
+        for area in self.areas:
+            ServiceCoverage.objects.create(service=self.glass, geoarea=area, status="ready")
+        ServiceCoverage.objects.filter(geoarea__in=self.areas[:3]).update(quality_ok=True)
+
+    def test_index_and_chunked_sections(self):
+        result = sitemaps.build(max_urls=2)
+        assert [name for name, _ in result["coverage"]] == ["sitemap-coverage-1.xml", "sitemap-coverage-2.xml"]
+        first = _read("sitemap-coverage-1.xml")
+        assert "<loc>https://example.com/services/glass/city-0</loc>" in first
+        assert first.count("<url>") == 2 and "<lastmod>" in first
+        assert "city-3" not in first + _read("sitemap-coverage-2.xml")  # not quality_ok
+        assert "<loc>https://example.com/services/glass</loc>" in _read("sitemap-services-1.xml")
+        assert "<loc>https://example.com/areas/miami-area</loc>" in _read("sitemap-areas-1.xml")
+        index = _read("sitemap.xml")
+        assert index.count("<sitemap>") == 4  # services, areas, coverage x2; no projects
+        # Child files are listed on the origin that serves them
+        assert "<loc>https://cms.example.com/sitemaps/sitemap-coverage-2.xml</loc>" in index
+
+    def test_rebuild_replaces_files_without_deleting_them(self):
+        sitemaps.build(max_urls=2)
+        with mock.patch.object(default_storage, "delete", side_effect=AssertionError("file went missing")):
+            sitemaps.build(max_urls=2)
+        _dirs, files = default_storage.listdir("sitemaps")
+        assert sorted(files) == sorted(
+            ["sitemap.xml", "sitemap-services-1.xml", "sitemap-areas-1.xml", "sitemap-coverage-1.xml",
+             "sitemap-coverage-2.xml"] + [f"sitemap-{section}.json" for section in sitemaps.SECTIONS]
+        )
+
+    def test_section_rebuild_drops_stale_chunks(self):
+        sitemaps.build(max_urls=2)
+        ServiceCoverage.objects.filter(geoarea__in=self.areas[1:]).update(status="draft")
+        sitemaps.build(["coverage"], max_urls=2)
+        assert not default_storage.exists("sitemaps/sitemap-coverage-2.xml")
+        index = _read("sitemap.xml")
+        assert "sitemap-coverage-2.xml" not in index
+        assert "sitemap-services-1.xml" in index
+
+    def test_served_from_storage(self):
+        sitemaps.build()
+        res = self.client.get("/sitemap.xml")
+        assert res.status_code == 200
+        assert res["Content-Type"] == "application/xml"
+        assert b"<sitemapindex" in b"".join(res.streaming_content)
+        assert self.client.get("/sitemaps/sitemap-services-1.xml").status_code == 200
+        assert self.client.get("/sitemaps/sitemap-coverage.json").status_code == 404
+
+    def test_publish_schedules_rebuild(self):
+        sitemaps._pending.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.glass.save_revision().publish()
+        assert {"services", "coverage"} <= sitemaps._pending
+        assert sitemaps.kick in callbacks
+        sitemaps._pending.clear()
@@ -0,0 +1,86 @@
+import json
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+from website.models_pages import PageSnapshot, ServicesIndexPage, ServicePage
+from website.renditions import process_jobs
+
+MEDIA = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA)
+class TestPageSnapshots(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.root = Page.get_first_root_node()
+        self.idx = idx = ServicesIndexPage(title="Services")
+        self.root.add_child(instance=idx)
+        self.page = ServicePage(title="Glass", slug="glass", intro="<p>Clear</p>")
+        idx.add_child(instance=self.page)
+        self.page.save_revision().publish()
+        self.client = APIClient()
+
+    def test_publish_writes_snapshot_that_is_served(self):
+        snap = PageSnapshot.objects.get(page=self.page)
+        assert snap.revision_id == ServicePage.objects.get(pk=self.page.pk).live_revision_id
+        assert json.loads(snap.payload)["slug"] == "glass"
+
+        # Prove the bytes come from the table, not from the serializer
+        PageSnapshot.objects.filter(pk=snap.pk).update(payload=snap.payload.replace("Clear", "Stored"))
+        res = self.client.get("/api/services/glass/", HTTP_ACCEPT="application/json")
+        assert res.status_code == 200
+        assert res.json()["description"] == "<p>Stored</p>"
+        assert [row["slug"] for row in self.client.get("/api/services/").json()] == ["glass"]
+
+    def test_stale_snapshot_falls_back_to_live_and_is_rewritten(self):
+        PageSnapshot.objects.filter(page=self.page).update(revision_id=0, payload="{}")
+        res = self.client.get("/api/services/")
+        assert res.json()[0]["description"] == "<p>Clear</p>"
+        assert PageSnapshot.objects.get(page=self.page).revision_id != 0
+
+    def with_hero(self):
+        image = get_image_model().objects.create(title="hero", file=get_test_image_file())
+        process_jobs(workers=0)
+        self.page.hero = image
+        self.page.save_revision().publish()
+        assert PageSnapshot.objects.filter(page=self.page).exists()
+        return image
+
+    def test_image_delete_drops_snapshot(self):
+        image = self.with_hero()
+        self.client.get("/api/services/")
+        image.delete()
+        assert not PageSnapshot.objects.filter(page=self.page).exists()
+        assert self.client.get("/api/services/").json()[0]["hero"] is None
+
+    def test_image_save_drops_only_pages_showing_it(self):
+        image = self.with_hero()
+        get_image_model().objects.create(title="other", file=get_test_image_file())
+        assert PageSnapshot.objects.filter(page=self.page).exists()
+        image.save()
+        assert not PageSnapshot.objects.filter(page=self.page).exists()
+
+    def test_move_drops_subtree_snapshots(self):
+        other = ServicesIndexPage(title="More services", slug="more")
+        self.root.add_child(instance=other)
+        self.idx.move(other, pos="last-child")
+        assert not PageSnapshot.objects.filter(page=self.page).exists()
+
+    def test_ancestor_rename_drops_descendant_snapshots(self):
+        self.idx.slug = "offer"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.idx.save_revision().publish()
+        assert not PageSnapshot.objects.filter(page=self.page).exists()
+        assert self.client.get("/api/services/").json()[0]["slug"] == "glass"
+        assert PageSnapshot.objects.filter(page=self.page).exists()
@@ -0,0 +1,166 @@
+import shutil
+import tempfile
+
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+from website.models import HomePage
+from website.models_local import GeoArea, ServiceCoverage
+from website.models_pages import PortfolioIndexPage, ProjectPage, ServicesIndexPage, ServicePage
+from website.serializers import (
+    HomePageSerializer,
+    ProjectPageSerializer,
+    ServiceCoverageDetailSerializer,
+    ServicePageSerializer,
+)
+from website.streams import refs, represent
+
+MEDIA = tempfile.mkdtemp()
+
+
+def block_based(stream):
+    return stream.stream_block.get_api_representation(stream)
+
+
+@override_settings(MEDIA_ROOT=MEDIA, GEOAREA_AUTO_NEIGHBORS=False)
+class TestStreamParity(TestCase):
+    """``streams.represent`` against Wagtail's block-based API representation."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        self.root = Page.get_first_root_node()
+        self.images = [
+            get_image_model().objects.create(title=f"img {i}", file=get_test_image_file()) for i in range(3)
+        ]
+        self.request = RequestFactory().get("/api/")
+
+    def reload(self, model, pk):
+        return model.objects.get(pk=pk)
+
+    def assert_parity(self, stream):
+        # Wagtail drops images that no longer exist; the raw pass leaves that to the hook
+        known = {image.pk for image in self.images}
+        raw = represent(stream, image=lambda pk: pk if pk in known else None)
+        # Fresh StreamValue so the block-based side builds its own blocks
+        assert raw == block_based(type(stream)(stream.stream_block, stream.raw_data, is_lazy=True))
+
+    def make_home(self):
+        a, b, c = (i.pk for i in self.images)
+        home = HomePage(title="Home", slug="start", body=[
+            {"type": "hero", "id": "h1", "value": {"heading": "Glass done right", "image": a}},
+            {"type": "services", "id": "s1", "value": [
+                {"type": "item", "id": "i1", "value": {"title": "Showers", "description": "Frameless", "icon": b}},
+                {"title": "Mirrors"},
+            ]},
+            {"type": "reviews", "id": "r1", "value": [
+                {"type": "item", "id": "i2", "value": {"name": "Ana", "rating": 5, "quote": "Great"}},
+            ]},
+            {"type": "gallery", "id": "g1", "value": [a, {"type": "item", "id": "i3", "value": c}, 999999]},
+            {"type": "cta", "id": "c1", "value": {"heading": "Call us", "cta_label": "Quote", "cta_href": "/contact"}},
+            {"type": "retired", "id": "x1", "value": "dropped by both"},
+            {"type": "cta", "value": {"heading": "No id", "cta_label": "Go", "cta_href": "/"}},
+        ])
+        self.root.add_child(instance=home)
+        return self.reload(HomePage, home.pk)
+
+    def make_service(self):
+        idx = ServicesIndexPage(title="Services")
+        self.root.add_child(instance=idx)
+        page = ServicePage(title="Glass", slug="glass", intro="<p>Intro</p>", body=[
+            {"type": "paragraph", "id": "p1", "value": "<p>Plain <b>text</b></p>"},
+            {"type": "image", "id": "m1", "value": self.images[0].pk},
+            {"type": "faq", "id": "f1", "value": {"q": "How long?", "a": "<p>Two days</p>"}},
+            {"type": "faq", "id": "f2", "value": {"q": "Missing answer"}},
+            {"type": "image", "id": "m2", "value": 999999},
+        ])
+        idx.add_child(instance=page)
+        return self.reload(ServicePage, page.pk)
+
+    def make_project(self):
+        portfolio = PortfolioIndexPage(title="Projects")
+        self.root.add_child(instance=portfolio)
+        page = ProjectPage(title="Kitchen", slug="kitchen", gallery=[
+            {"type": "image", "id": f"g{i}", "value": image.pk} for i, image in enumerate(self.images)
+        ] + [{"type": "image", "id": "gone", "value": 999999}])
+        portfolio.add_child(instance=page)
+        return self.reload(ProjectPage, page.pk)
+
+    def make_coverage(self):
+        service = self.make_service()
+        step = {"title": "Visit", "text": "<p>We measure</p>"}
+        coverage = ServiceCoverage.objects.create(
+            service=service, geoarea=GeoArea.objects.create(name="Miami", slug="miami"), status="ready",
+            unique_intro="<p>Local <script>x</script>intro</p>",
+            pain_points_local=[{"type": "point", "id": "pp", "value": {"title": "Humidity"}}],
+            process_steps_local=[{"type": "step", "id": f"st{i}", "value": step} for i in range(2)],
+            permits_local=[],
+            starting_price_local="$500", cta_local="Book a visit",
+        )
+        return self.reload(ServiceCoverage, coverage.pk)
+
+    def test_home_body(self):
+        self.assert_parity(self.make_home().body)
+
+    def test_service_body(self):
+        self.assert_parity(self.make_service().body)
+
+    def test_project_gallery(self):
+        self.assert_parity(self.make_project().gallery)
+
+    def test_coverage_streams(self):
+        coverage = self.make_coverage()
+        for field in ("pain_points_local", "process_steps_local", "permits_local"):
+            self.assert_parity(getattr(coverage, field))
+
+    def test_refs(self):
+        home = self.make_home()
+        a, b, c = (i.pk for i in self.images)
+        assert refs(home, "body").image_ids == [a, b, a, c, 999999]
+        service = self.make_service()
+        assert refs(service, "body").richtext == ["<p>Plain <b>text</b></p>", "<p>Two days</p>"]
+
+    def test_home_serializer_resolves_images(self):
+        home = self.make_home()
+        a, b, c = self.images
+        body = HomePageSerializer(home, context={"request": self.request}).data["body"]
+        assert [block["id"] for block in body][:5] == ["h1", "s1", "r1", "g1", "c1"]  # "retired" is skipped
+        hero = body[0]["value"]
+        assert (hero["image"]["id"], hero["image"]["alt"]) == (a.pk, "img 0")
+        assert hero["image"]["url"].startswith("http://testserver/")
+        assert body[1]["value"][0]["icon"]["id"] == b.pk
+        assert body[1]["value"][1] == {"title": "Mirrors", "description": None, "icon": None}
+        assert [g and g["id"] for g in body[3]["value"]] == [a.pk, c.pk, None]
+        assert body[2]["value"] == [{"name": "Ana", "rating": 5, "quote": "Great"}]
+        assert all(block is None for block in home.body._bound_blocks)
+
+    def test_service_serializer_body(self):
+        page = self.make_service()
+        data = ServicePageSerializer(page, context={"request": self.request}).data
+        assert [block["type"] for block in data["body"]] == ["paragraph", "image", "faq", "faq", "image"]
+        assert data["body"][0]["value"] == "<p>Plain <b>text</b></p>"
+        assert data["body"][1]["value"]["alt"] == "img 0"
+        assert data["body"][3]["value"] == {"q": "Missing answer", "a": ""}
+        assert data["body"][4]["value"] is None
+        # Legacy fields are unchanged
+        assert data["faqs"] == [{"q": "How long?", "a": "<p>Two days</p>"}, {"q": "Missing answer", "a": ""}]
+        assert len(data["gallery"]) == 1
+
+    def test_project_serializer_images(self):
+        page = self.make_project()
+        data = ProjectPageSerializer(page, context={"request": self.request}).data
+        assert [item["alt"] for item in data["images"]] == ["Kitchen"] * 3
+        assert all(item["url"].startswith("http://testserver/") for item in data["images"])
+
+    def test_coverage_detail_serializer(self):
+        data = ServiceCoverageDetailSerializer(self.make_coverage(), context={"request": self.request}).data
+        assert data["intro_html"] == "<p>Local intro</p>"
+        assert data["pain_points"] == [{"type": "point", "value": {"title": "Humidity", "text": ""}, "id": "pp"}]
+        assert [s["value"]["text"] for s in data["process_steps"]] == ["<p>We measure</p>"] * 2
+        assert data["permits"] == []
+        assert (data["starting_price_local"], data["cta_local"]) == ("$500", "Book a visit")
+
@@ -0,0 +1,51 @@
+from django.test import RequestFactory, TestCase
+from wagtail.models import Page
+from website.models_pages import ServicesIndexPage, ServicePage
+from website.serializers import ServicePageSerializer
+from website.streams import extract, walk
+
+
+class TestStreamExtract(TestCase):
+    def setUp(self):
+        root = Page.get_first_root_node()
+        idx = ServicesIndexPage(title="Services")
+        root.add_child(instance=idx)
+        self.page = ServicePage(title="Glass", slug="glass", body=[
+            {"type": "paragraph", "value": "<p>Three plain words</p>"},
+            {"type": "faq", "value": {"q": "How long?", "a": "<p>Two <b>days</b></p>"}},
+            {"type": "image", "value": 41},
+            {"type": "faq", "value": {"q": "Permits?", "a": "<p>We file them</p>"}},
+        ])
+        idx.add_child(instance=self.page)
+        self.page.save_revision()
+
+    def test_walk(self):
+        found = walk([
+            {"type": "step", "value": {"title": "Visit", "text": "<p>one two</p><img src='a.jpg' />"}},
+            {"type": "image", "value": 7},
+            {"type": "paragraph", "value": "<p>three</p>"},
+        ])
+        assert (found.module_count, found.word_count, found.inline_images) == (3, 3, 1)
+        assert found.image_ids == [7]
+        assert found.faqs == []
+
+    def test_serializer_reads_raw_stream_once(self):
+        page = ServicePage.objects.get(pk=self.page.pk)
+        request = RequestFactory().get("/api/services/")
+        data = ServicePageSerializer([page], many=True, context={"request": request}).data[0]
+        assert data["faqs"] == [
+            {"q": "How long?", "a": "<p>Two <b>days</b></p>"},
+            {"q": "Permits?", "a": "<p>We file them</p>"},
+        ]
+        assert data["gallery"] == []  # image 41 does not exist
+        assert all(block is None for block in page.body._bound_blocks)  # no block objects built
+        assert len(page._stream_extracts) == 2  # one extract and one refs walk of body
+
+    def test_memo_follows_content_and_revision(self):
+        page = ServicePage.objects.get(pk=self.page.pk)
+        first = extract(page, "body")
+        assert extract(page, "body") is first
+        page.body = [{"type": "image", "value": 5}]
+        assert extract(page, "body").image_ids == [5]
+        page.latest_revision_id = None
+        assert extract(page, "body") is not first
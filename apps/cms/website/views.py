@@ -1,22 +1,27 @@
+from django.db.models import F, Prefetch
 from rest_framework import viewsets, mixins, permissions, throttling
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
-from wagtail.models import Site as WagtailSite
+from rest_framework.views import APIView
+from rest_framework.decorators import action, api_view, permission_classes
 from .models import Testimonial, ServiceArea, Lead
-from .models_pages import ServicePage, ProjectPage
+from .models_pages import ServicePage, ProjectPage, ProjectLookup
 try:
-    from .models_local import GeoArea, ServiceCoverage
+    from .models_local import GeoArea, GeoAreaHop, ServiceCoverage
 except Exception:  # pragma: no cover
-    GeoArea = None  # type: ignore
+    GeoArea = GeoAreaHop = None  # type: ignore
     ServiceCoverage = None  # type: ignore
 from .serializers import (
     TestimonialSerializer,
     ServiceAreaSerializer,
     LeadSerializer,
-    ConfigSerializer,
     ServicePageSerializer,
     ProjectPageSerializer,
 )
+from .snapshots import SnapshotResponseMixin
+from .caching import CachedResponseMixin, ConditionalGetMixin, conditional
+from .site_config import get_site_config
+from .pagination import OptInCursorPaginationMixin
+from . import coverage_matrix, geoindex, geolocate, geometry, home, hops, landing, snapshots
 
 
 class PublicReadOnly(permissions.AllowAny):
@@ -32,12 +37,15 @@ class LeadsThrottle(throttling.SimpleRateThrottle):
         return f'leads:{ip}'
 
 
-class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(ConditionalGetMixin, CachedResponseMixin, SnapshotResponseMixin, OptInCursorPaginationMixin,
+                     viewsets.ReadOnlyModelViewSet):
     queryset = ServicePage.objects.live().public().order_by('title')
     serializer_class = ServicePageSerializer
     permission_classes = [PublicReadOnly]
     lookup_field = 'slug'
+    # Flat list capped at API_MAX_LIST_RESULTS; ?paginate=cursor for cursor pages
     pagination_class = None
+    cache_namespaces = ('services',)
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -45,12 +53,14 @@ class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
         return ctx
 
 
-class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, CachedResponseMixin, SnapshotResponseMixin, OptInCursorPaginationMixin,
+                     viewsets.ReadOnlyModelViewSet):
     queryset = ProjectPage.objects.live().public().order_by('-first_published_at')
     serializer_class = ProjectPageSerializer
     permission_classes = [PublicReadOnly]
     lookup_field = 'slug'
     pagination_class = None
+    cache_namespaces = ('projects',)
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -59,26 +69,38 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        service = self.request.query_params.get('service')
-        city = self.request.query_params.get('city')
+        params = self.request.query_params
+        service = params.get('service')
+        city = params.get('city')
+        # Semi-joins on the indexed ProjectLookup table: no row fan-out, so no DISTINCT
         if service:
-            qs = qs.filter(services__name__iexact=service) | qs.filter(services__name__icontains=service)
-        if city and GeoArea is not None:
-            qs = qs.filter(geoareas__slug=city) | qs.filter(city__iexact=city)
-        return qs.distinct()
+            contains = params.get('service_contains') in ('1', 'true')
+            qs = qs.filter(pk__in=ProjectLookup.project_ids(ProjectLookup.KIND_SERVICE, service, contains=contains))
+        if city:
+            qs = qs.filter(pk__in=ProjectLookup.project_ids(ProjectLookup.KIND_CITY, city))
+        return qs
 
 
-class TestimonialViewSet(viewsets.ReadOnlyModelViewSet):
+class TestimonialViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Testimonial.objects.all().order_by('-date')
     serializer_class = TestimonialSerializer
     permission_classes = [PublicReadOnly]
+    cache_namespaces = ('testimonials',)
 
 
-class ServiceAreaViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ServiceArea.objects.all().order_by('name')
+def neighbor_slugs(lookup):
+    """Prefetch plan loading the neighbor slugs of a whole page in one query."""
+    return Prefetch(lookup, queryset=GeoArea.objects.only('id', 'slug', 'type', 'name'))
+
+
+class ServiceAreaViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ServiceArea.objects.select_related('geo').prefetch_related(
+        neighbor_slugs('geo__neighbors')
+    ).order_by('name')
     serializer_class = ServiceAreaSerializer
     permission_classes = [PublicReadOnly]
     lookup_field = 'slug'
+    cache_namespaces = ('areas', 'geoareas')
 
 
 class LeadViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
@@ -88,41 +110,56 @@ class LeadViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     throttle_classes = [LeadsThrottle]
 
 
-class ConfigViewSet(viewsets.ViewSet):
+class ConfigViewSet(ConditionalGetMixin, viewsets.ViewSet):
     """
     Site configuration including theme colors, contact info, etc.
     """
     permission_classes = [PublicReadOnly]
+    cache_namespaces = ('config',)
     
     def list(self, request):
-        site = WagtailSite.find_for_request(request) or WagtailSite.objects.first()
-        data = ConfigSerializer.from_site(site)
-        return Response(data)
+        return Response(get_site_config(request))
 
+@conditional('config')
 @api_view(['GET'])
 @permission_classes([PublicReadOnly])
 def config_view(request):
-    site = WagtailSite.find_for_request(request) or WagtailSite.objects.first()
-    data = ConfigSerializer.from_site(site)
-    return Response(data)
+    return Response(get_site_config(request))
 
 
+@conditional('config')
 @api_view(['GET'])
 @permission_classes([PublicReadOnly])
 def themes_alias(request):
     """Alias /api/themes/ to SiteSettings tokens for backward compatibility."""
-    site = WagtailSite.find_for_request(request) or WagtailSite.objects.first()
-    data = ConfigSerializer.from_site(site)
-    return Response(data)
+    return Response(get_site_config(request))
+
+
+class HomeView(ConditionalGetMixin, CachedResponseMixin, APIView):
+    """The requesting site's HomePage, with its body blocks cached one by one."""
+    permission_classes = [PublicReadOnly]
+    cache_namespaces = home.HOME_NAMESPACES
+
+    def get(self, request):
+        data = home.build(request)
+        if data is None:
+            return Response({'detail': 'Not found'}, status=404)
+        return snapshots.render_composite(request, data)
 
 
 # ---- Local SEO Endpoints ----
 if GeoArea is not None:
-    class GeoAreaViewSet(viewsets.ReadOnlyModelViewSet):
-        queryset = GeoArea.objects.all().order_by('name')
+    class GeoAreaViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+        queryset = GeoArea.objects.select_related('parent_city').prefetch_related(
+            neighbor_slugs('neighbors')
+        ).order_by('name')
         serializer_class = __import__('website.serializers', fromlist=['GeoAreaSerializer']).GeoAreaSerializer
         permission_classes = [PublicReadOnly]
         lookup_field = 'slug'
+        # "config" because /nearby/ defaults its radius to LocalSEOSettings.service_radius_km
+        cache_namespaces = ('geoareas', 'config')
+        nearby_max_limit = 100
+        nearby_max_radius_km = 500
 
         def get_queryset(self):
             qs = super().get_queryset()
@@ -134,12 +171,99 @@ if GeoArea is not None:
                 qs = qs.filter(parent_city__slug=parent)
             return qs
 
+        @staticmethod
+        def _coordinates(params):
+            lat, lng = float(params['lat']), float(params['lng'])
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                raise ValueError('lat/lng out of range')
+            return lat, lng
+
+        @action(detail=True, methods=['get'], url_path='nearby', url_name='area-nearby')
+        def area_nearby(self, request, slug=None):
+            """Areas within ?hops= neighbor steps (default 2), by graph then geographic distance."""
+            try:
+                max_hops = max(1, min(int(request.query_params.get('hops', 2)), hops.MAX_HOPS))
+                limit = max(1, min(int(request.query_params.get('limit', 12)), self.nearby_max_limit))
+            except ValueError:
+                return Response({'detail': 'hops and limit must be integers'}, status=400)
+            area_id = GeoArea.objects.filter(slug=slug).values_list('id', flat=True).first()
+            if area_id is None:
+                return Response({'detail': 'Not found'}, status=404)
+            rows = (
+                GeoAreaHop.objects.filter(source_id=area_id, hops__lte=max_hops)
+                .select_related('target')
+                .order_by('hops', F('distance_km').asc(nulls_last=True), 'target__name')[:limit]
+            )
+            return Response({
+                'hops': max_hops,
+                'results': [
+                    {'slug': r.target.slug, 'name': r.target.name, 'type': r.target.type,
+                     'hops': r.hops, 'distance_km': r.distance_km}
+                    for r in rows
+                ],
+            })
+
+        @action(detail=True, methods=['get'])
+        def geometry(self, request, slug=None):
+            """Boundary simplified for ?zoom=, optionally clipped to ?bbox=minLng,minLat,maxLng,maxLat."""
+            params = request.query_params
+            try:
+                zoom = int(params['zoom']) if params.get('zoom') else None
+                bbox = [float(v) for v in params['bbox'].split(',')] if params.get('bbox') else None
+            except ValueError:
+                return Response({'detail': 'zoom must be an integer and bbox four numbers'}, status=400)
+            if bbox is not None and (len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+                return Response({'detail': 'bbox must be minLng,minLat,maxLng,maxLat'}, status=400)
+            data = geometry.feature(self.get_object(), zoom=zoom, bbox=bbox)
+            if data is None:
+                return Response({'detail': 'Not found'}, status=404)
+            return Response(data)
+
+        @action(detail=False, methods=['get'])
+        def locate(self, request):
+            """Neighborhood and city whose geojson polygons contain ?lat=&lng=."""
+            try:
+                lat, lng = self._coordinates(request.query_params)
+            except (KeyError, TypeError, ValueError):
+                return Response({'detail': 'lat and lng are required numbers'}, status=400)
+            return Response(geolocate.resolve(lat, lng))
+
+        @action(detail=False, methods=['get'])
+        def nearby(self, request):
+            """Areas closest to ?lat=&lng=, optionally within ?radius_km= (default: site service radius)."""
+            params = request.query_params
+            try:
+                lat, lng = self._coordinates(params)
+                limit = int(params.get('limit', 10))
+                radius_km = params.get('radius_km')
+                radius_km = float(radius_km) if radius_km not in (None, '') else None
+            except (KeyError, TypeError, ValueError):
+                return Response({'detail': 'lat and lng are required numbers'}, status=400)
+            if radius_km is not None and not (0 < radius_km < float('inf')):
+                return Response({'detail': 'radius_km must be a positive number'}, status=400)
+            if radius_km is None:
+                radius_km = get_site_config(request).get('service_radius_km') or None
+            if radius_km is not None:
+                radius_km = min(radius_km, self.nearby_max_radius_km)
+            limit = max(1, min(limit, self.nearby_max_limit))
+            return Response({
+                'radius_km': radius_km,
+                'results': geoindex.nearby(lat, lng, limit=limit, radius_km=radius_km),
+            })
+
 if ServiceCoverage is not None:
-    class ServiceCoverageViewSet(viewsets.ReadOnlyModelViewSet):
-        queryset = ServiceCoverage.objects.select_related('service', 'geoarea').all()
+    class ServiceCoverageViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+        queryset = ServiceCoverage.objects.select_related('service', 'geoarea', 'geoarea__review_stats').all()
         serializer_class = __import__('website.serializers', fromlist=['ServiceCoverageSerializer']).ServiceCoverageSerializer
         permission_classes = [PublicReadOnly]
         lookup_field = 'id'
+        cache_namespaces = ('coverage',)
+
+        def get_serializer_context(self):
+            ctx = super().get_serializer_context()
+            # ?rollup=1 reports a city's reviews including its neighborhoods
+            ctx['reviews_rollup'] = self.request.query_params.get('rollup') in ('1', 'true', 'True')
+            return ctx
 
         def get_queryset(self):
             qs = super().get_queryset()
@@ -154,21 +278,44 @@ if ServiceCoverage is not None:
             if geo:  # 🔗 NUEVO: mismo efecto que city pero más claro
                 qs = qs.filter(geoarea__slug=geo)
             if ready in ('1', 'true', 'True'):
-                ids = [c.id for c in qs if c.status == 'ready' and c.passes_quality_minimum()]
-                qs = qs.filter(id__in=ids)
+                qs = qs.filter(status='ready', quality_ok=True)
             return qs
 
+        @action(detail=False)
+        def matrix(self, request):
+            """Status/quality flags of every service x area pair (see website.coverage_matrix)."""
+            encoding = request.query_params.get('encoding', 'rle')
+            if encoding not in coverage_matrix.ENCODINGS:
+                return Response({'detail': 'encoding must be rle or bitmap'}, status=400)
+            return Response(coverage_matrix.get_matrix(encoding))
+
+    @conditional('coverage')
     @api_view(['GET'])
     @permission_classes([PublicReadOnly])
     def coverage_detail(request, service, city):
         try:
-            c = ServiceCoverage.objects.select_related('service', 'geoarea').get(service__slug=service, geoarea__slug=city)
+            c = ServiceCoverage.objects.select_related('service', 'geoarea', 'geoarea__review_stats').get(service__slug=service, geoarea__slug=city)
         except ServiceCoverage.DoesNotExist:  # type: ignore
             return Response({'detail': 'Not found'}, status=404)
         # For development: temporarily relax quality requirements
         # In production, uncomment the full check:
-        # if not (c.status == 'ready' and c.passes_quality_minimum()):
+        # if not (c.status == 'ready' and c.quality_ok):
         if not c.status == 'ready':
             return Response({'detail': 'Not found'}, status=404)
-        ser = __import__('website.serializers', fromlist=['ServiceCoverageSerializer']).ServiceCoverageSerializer(c, context={'request': request})
+        ser = __import__('website.serializers', fromlist=['ServiceCoverageDetailSerializer']).ServiceCoverageDetailSerializer(c, context={
+            'request': request,
+            'reviews_rollup': request.query_params.get('rollup') in ('1', 'true', 'True'),
+        })
         return Response(ser.data)
+
+
+    class LandingView(ConditionalGetMixin, CachedResponseMixin, APIView):
+        """Everything a /services/<service>/<city> page needs, in one response."""
+        permission_classes = [PublicReadOnly]
+        cache_namespaces = landing.LANDING_NAMESPACES
+
+        def get(self, request, service, city):
+            data = landing.build(request, service, city)
+            if data is None:
+                return Response({'detail': 'Not found'}, status=404)
+            return snapshots.render_composite(request, data)
@@ -0,0 +1,38 @@
+from django.utils.translation import gettext_lazy as _, ngettext
+from wagtail import hooks
+from wagtail.snippets.bulk_actions.snippet_bulk_action import SnippetBulkAction
+from wagtail.snippets.permissions import get_permission_name
+
+from . import coverage
+from .models_local import GeoArea, ServiceCoverage
+from .models_pages import ServicePage
+
+
+@hooks.register("register_bulk_action")
+class GenerateCoverageBulkAction(SnippetBulkAction):
+    """GeoArea listing action: draft coverage for every live service in the selected areas."""
+
+    display_name = _("Generate coverage")
+    action_type = "generate_coverage"
+    aria_label = _("Generate draft coverage for the selected areas")
+    template_name = "website/bulk_actions/confirm_generate_coverage.html"
+    action_priority = 50
+    models = [GeoArea]
+
+    def check_perm(self, snippet):
+        if getattr(self, "can_add_coverage", None) is None:
+            self.can_add_coverage = self.request.user.has_perm(get_permission_name("add", ServiceCoverage))
+        return self.can_add_coverage
+
+    @classmethod
+    def execute_action(cls, objects, **kwargs):
+        services = ServicePage.objects.live().only("id", "title")
+        created = coverage.generate(services, objects)
+        return len(objects), created
+
+    def get_success_message(self, num_parent_objects, num_child_objects):
+        return ngettext(
+            "%(count)d coverage page created.",
+            "%(count)d coverage pages created.",
+            num_child_objects,
+        ) % {"count": num_child_objects}